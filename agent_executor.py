@@ -0,0 +1,118 @@
+"""톡톡이 에이전트 실행기
+
+agent_policy.py 의 반복 예산, 완결된 도구 답변, 턴 마감 시간을 AgentExecutor 에
+적용합니다. langchain.agents 를 불러오므로 에이전트를 처음 만들 때 불러옵니다.
+"""
+import contextvars
+
+from langchain.agents import AgentExecutor
+from langchain_core.agents import AgentFinish
+
+from agent_policy import (
+    ITERATION_CUTOFF, CompleteAnswer, answers_question, get_turn_deadline, iteration_budget,
+    mark_incomplete, partial_answer, policy_stats, record_step,
+)
+from metrics import AGENT_MAX_ITERATIONS
+from router import ANSWER_TEMPLATES, is_failed
+
+STOPPED_OUTPUT = "Agent stopped due to max iterations."  # early_stopping_method="force" 의 답변
+
+# 실행 중인 턴의 질문 (공유 에이전트라 인스턴스 속성 대신 컨텍스트에 둠)
+_question = contextvars.ContextVar("talktalk_agent_question", default="")
+
+class AdaptiveAgentExecutor(AgentExecutor):
+    """턴별 반복 예산, 완결된 도구 답변에서 조기 종료, 마감 시간 처리"""
+
+    def _call(self, inputs, run_manager=None):
+        token = _question.set(inputs.get("input", ""))
+        try:
+            return super()._call(inputs, run_manager=run_manager)
+        finally:
+            _question.reset(token)
+
+    async def _acall(self, inputs, run_manager=None):
+        token = _question.set(inputs.get("input", ""))
+        try:
+            return await super()._acall(inputs, run_manager=run_manager)
+        finally:
+            _question.reset(token)
+
+    def stream(self, input, config=None, **kwargs):
+        token = _question.set(input.get("input", ""))
+        try:
+            yield from super().stream(input, config, **kwargs)
+        finally:
+            _question.reset(token)
+
+    async def astream(self, input, config=None, **kwargs):
+        token = _question.set(input.get("input", ""))
+        try:
+            async for step in super().astream(input, config, **kwargs):
+                yield step
+        finally:
+            _question.reset(token)
+
+    def _should_continue(self, iterations, time_elapsed):
+        if iterations >= iteration_budget(_question.get()):
+            return False
+        return super()._should_continue(iterations, time_elapsed)
+
+    def _perform_agent_action(self, name_to_tool_map, color_mapping, agent_action, run_manager=None):
+        step = super()._perform_agent_action(name_to_tool_map, color_mapping, agent_action, run_manager)
+        record_step(step.action, step.observation)
+        return step
+
+    async def _aperform_agent_action(self, name_to_tool_map, color_mapping, agent_action,
+                                     run_manager=None):
+        step = await super()._aperform_agent_action(
+            name_to_tool_map, color_mapping, agent_action, run_manager
+        )
+        record_step(step.action, step.observation)
+        return step
+
+    def _get_tool_return(self, next_step_output):
+        agent_action, observation = next_step_output
+        if isinstance(observation, CompleteAnswer) and answers_question(
+            _question.get(), agent_action.tool, agent_action.tool_input
+        ):
+            policy_stats.record_exit("complete")
+            template = ANSWER_TEMPLATES.get(agent_action.tool, "{output}")
+            return AgentFinish({"output": template.format(output=observation, arg="")}, "")
+        return super()._get_tool_return(next_step_output)
+
+    def _stopped(self, output, intermediate_steps):
+        """early_stopping_method="force" 의 고정 문구를 도구 결과 답변으로 바꿈
+
+        멈춘 턴, 실패한 도구 결과가 섞인 턴, 도구 없이 답한 턴은 답변 캐시(사용자
+        공유)에 넣지 않도록 표시합니다.
+        """
+        if not intermediate_steps:
+            mark_incomplete("no_tool")
+        elif any(is_failed(str(observation)) for _, observation in intermediate_steps):
+            mark_incomplete("tool_error")
+        if output.return_values.get("output") != STOPPED_OUTPUT:
+            return output
+        policy_stats.record_exit("stopped")
+        mark_incomplete("stopped")
+        return AgentFinish({"output": partial_answer(intermediate_steps)}, "")
+
+    def _return(self, output, intermediate_steps, run_manager=None):
+        return super()._return(self._stopped(output, intermediate_steps), intermediate_steps, run_manager)
+
+    async def _areturn(self, output, intermediate_steps, run_manager=None):
+        return await super()._areturn(
+            self._stopped(output, intermediate_steps), intermediate_steps, run_manager
+        )
+
+def create_adaptive_executor(agent, tools):
+    """톡톡이 기본 정책의 AgentExecutor"""
+    return AdaptiveAgentExecutor(
+        agent=agent,
+        tools=tools,
+        verbose=False,
+        max_iterations=AGENT_MAX_ITERATIONS,
+        # 새 반복을 시작하는 마감 (턴 전체 마감은 chatbot_core.answer_turn 이 강제)
+        max_execution_time=get_turn_deadline() * ITERATION_CUTOFF,
+        # 한도에 닿으면 LLM 을 다시 부르지 않음 (_stopped 가 도구 결과로 답변)
+        early_stopping_method="force",
+    )
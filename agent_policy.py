@@ -0,0 +1,150 @@
+"""톡톡이 에이전트 실행 정책
+
+AgentExecutor 의 고정 max_iterations 대신 턴마다 반복 예산을 정하고, 일찍 끝낼 수
+있으면 LLM 을 다시 부르지 않습니다.
+
+- 반복 예산: 의도가 하나인 질문은 2 (도구 호출 + 답변), 여러 의도나 비교/추천처럼
+  생각이 필요한 질문은 AGENT_MAX_ITERATIONS
+- 완결된 도구 답변: 의도가 하나인 질문에 도구가 CompleteAnswer(날씨/시세/번역 서비스가
+  만든 그대로 보여 줄 수 있는 답)를 돌려주면 두 번째 LLM 호출 없이 바로 답변
+  (내일/주말/전망처럼 현재 값이 아닌 것을 묻거나, 도구 인자가 질문의 지명/종목/언어를
+  다 다루지 않으면 LLM 이 답함)
+- 턴 마감 시간: TALKTALK_TURN_DEADLINE 초 (기본 25)
+  - 그 60% 가 지나거나 반복 예산을 다 쓰면 새 반복을 시작하지 않고 지금까지의
+    도구 결과로 답변
+  - 마감 시간이 되면 진행 중인 LLM/도구 호출을 기다리지 않고 턴을 끝냄 (chatbot_core)
+
+멈춤/마감으로 만든 답변, 도구 실패가 섞인 턴, 도구 없이 답한 턴은 tracking_outcome()
+에 표시되어 답변 캐시에 넣지 않습니다. 끝난 도구 호출도 여기에 모아 두어 답변 캐시가
+도구 인자를 확인하는 데 씁니다.
+
+인사/감사 같은 짧은 말에 대한 템플릿 답변은 router.py 의 빠른 답변이 처리합니다.
+정책을 적용하는 AgentExecutor 는 agent_executor.py 에 있습니다.
+"""
+import contextvars
+import os
+import re
+import threading
+from contextlib import contextmanager
+
+from metrics import AGENT_EARLY_EXIT, AGENT_MAX_ITERATIONS
+from router import INTENT_KEYWORDS, LANGUAGES, QUALIFIERS
+from stock_quotes import extract_listings
+from weather import extract_places
+
+SIMPLE_ITERATIONS = 2  # 도구 호출 한 번 + 답변
+TURN_DEADLINE = 25.0
+ITERATION_CUTOFF = 0.6  # 마감 시간의 이 비율이 지나면 새 반복을 시작하지 않음
+
+# 도구 결과를 그대로 보여 주기보다 LLM 의 판단이 필요한 질문
+NEEDS_REASONING = re.compile(r"비교|왜|추천|어느|어떤\s*게|나을까|좋을까|해야|할까|챙겨|우산|입을|차이")
+
+class CompleteAnswer(str):
+    """그대로 사용자 답변이 될 수 있는 도구 출력 표시"""
+
+# 도구별로 질문과 도구 인자에서 뽑아 비교하는 대상 (지명, 종목 코드, 대상 언어)
+_ENTITIES = {
+    "weather_search": lambda text: {place["name"] for place in extract_places(text)},
+    "stock_search": lambda text: {listing["ticker"] for listing in extract_listings(text)},
+    "translation_search": lambda text: set(re.findall(LANGUAGES, text)),
+}
+
+def intents(question):
+    """질문에 나온 도구 의도들 (INTENT_KEYWORDS 기준)"""
+    return [name for name, words in INTENT_KEYWORDS.items() if any(w in question for w in words)]
+
+def iteration_budget(question):
+    """이 질문에 허용할 LLM 호출(에이전트 반복) 수"""
+    if len(intents(question)) <= 1 and not NEEDS_REASONING.search(question):
+        return SIMPLE_ITERATIONS
+    return AGENT_MAX_ITERATIONS
+
+def answers_question(question, tool_name, tool_input):
+    """도구의 완결된 답변(CompleteAnswer)을 이 질문의 답으로 바로 써도 되는지
+
+    의도가 그 도구 하나이고, 판단이나 다른 시점/기간을 묻지 않고, 질문에 나온
+    지명/종목/언어를 도구 인자가 모두 다룰 때만 True.
+    """
+    if intents(question) != [tool_name]:
+        return False
+    if NEEDS_REASONING.search(question) or QUALIFIERS.search(question):
+        return False
+    extract = _ENTITIES.get(tool_name)
+    return extract is None or extract(question) <= extract(tool_input_text(tool_input))
+
+def tool_input_text(tool_input):
+    """도구 인자(문자열 또는 dict)를 한 문자열로"""
+    if isinstance(tool_input, dict):
+        return " ".join(str(value) for value in tool_input.values())
+    return str(tool_input)
+
+def get_turn_deadline():
+    return float(os.environ.get("TALKTALK_TURN_DEADLINE", TURN_DEADLINE))
+
+def partial_answer(intermediate_steps):
+    """예산/마감 시간으로 멈췄을 때 지금까지의 도구 결과로 만드는 답변"""
+    observations = []
+    for _, observation in intermediate_steps:
+        text = str(observation).strip()
+        if text and text not in observations:
+            observations.append(text)
+    if not observations:
+        return "⏱️ 답변 준비가 길어졌어요. 질문을 조금 더 간단히 해서 다시 물어봐 주세요."
+    return "⏱️ 답변 준비가 길어져 지금까지 찾은 정보를 먼저 보여 드려요.\n\n" + "\n\n".join(observations)
+
+# 실행 중인 턴이 온전한 답을 내지 못한 이유 (공유 에이전트라 컨텍스트에 둠)
+_outcome = contextvars.ContextVar("talktalk_turn_outcome", default=None)
+
+@contextmanager
+def tracking_outcome():
+    """이 블록의 에이전트 턴 결과 표시 dict
+
+    "incomplete": "stopped" | "tool_error" | "no_tool", "steps": 끝난 (AgentAction, 도구 출력) 목록
+    """
+    outcome = {}
+    token = _outcome.set(outcome)
+    try:
+        yield outcome
+    finally:
+        _outcome.reset(token)
+
+def mark_incomplete(reason):
+    """지금 턴의 답변을 재사용하면 안 된다고 표시 (tracking_outcome 밖이면 무시)"""
+    outcome = _outcome.get()
+    if outcome is not None:
+        outcome.setdefault("incomplete", reason)
+
+def record_step(action, observation):
+    """지금 턴에서 끝난 도구 호출 기록 (tracking_outcome 밖이면 무시)"""
+    outcome = _outcome.get()
+    if outcome is not None:
+        outcome.setdefault("steps", []).append((action, observation))
+
+class PolicyStats:
+    """턴당 LLM 호출 수와 일찍 끝낸 턴 수 (프로세스 전역)"""
+
+    def __init__(self):
+        self.turns = 0
+        self.llm_calls = 0
+        self.exits = {}
+        self._lock = threading.Lock()
+
+    def record_turn(self, llm_calls):
+        with self._lock:
+            self.turns += 1
+            self.llm_calls += llm_calls
+
+    def record_exit(self, reason):
+        AGENT_EARLY_EXIT.inc(reason=reason)
+        with self._lock:
+            self.exits[reason] = self.exits.get(reason, 0) + 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "turns": self.turns,
+                "llm_calls_per_turn": self.llm_calls / self.turns if self.turns else 0.0,
+                "exits": dict(self.exits),
+            }
+
+policy_stats = PolicyStats()
@@ -0,0 +1,221 @@
+"""톡톡이 HTTP/JSON API
+
+브라우저 세션 없이 프로그램에서 톡톡이를 쓰는 비동기 API 입니다 (starlette + uvicorn).
+에이전트 파이프라인은 Streamlit 화면과 같은 chatbot_core.py 를 쓰며, 같은 프로세스의 모든
+요청이 검색/답변 캐시, HTTP 연결 풀, 에이전트 캐시, 요청 한도를 공유합니다.
+
+    $ TALKTALK_API_TOKENS="app1:토큰" uvicorn api:app --host 0.0.0.0 --port 8000 --workers 4
+
+- POST /v1/chat           {"message": "...", "session_id": "..."} → 답변 JSON
+- POST /v1/chat/stream    같은 본문 → Server-Sent Events (token, tool_start, tool_end, done, error)
+- DELETE /v1/sessions/{session_id}   대화 기록 삭제
+- GET /healthz, GET /metrics (Prometheus 텍스트)
+
+인증: TALKTALK_API_TOKENS ("이름:토큰,이름:토큰") 를 설정하면 /v1 요청마다
+Authorization: Bearer <토큰> 이 필요하고, 요청 한도는 그 이름(클라이언트) 단위로 셉니다.
+설정하지 않으면 요청이 보낸 OpenAI 키가 클라이언트를 구분합니다.
+
+키는 요청마다 X-OpenAI-Key / X-SerpAPI-Key 헤더로 받습니다. 서버의 OPENAI_API_KEY /
+SERPAPI_API_KEY 는 토큰 인증을 켜고 TALKTALK_API_SERVER_KEYS=1 일 때만 대신 씁니다.
+session_id 를 빼면 새로 만들어 응답에 담아 줍니다. 대화 기록은 (클라이언트, session_id)
+별로 저장하므로 다른 클라이언트가 같은 session_id 를 보내도 읽거나 지울 수 없습니다.
+"""
+import hashlib
+import hmac
+import json
+import logging
+import os
+from contextlib import asynccontextmanager
+
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from starlette.routing import Route
+
+from chatbot_core import (
+    agent_is_broken, chat_turn, create_prefetch_tools, delete_session, get_agent_cache,
+    is_session_id, new_session_id, stream_turn,
+)
+from metrics import registry
+from prefetch import start_prefetcher
+from tool_runtime import run_blocking
+from warmup import start_warmup
+
+logger = logging.getLogger("talktalk.api")
+
+MAX_MESSAGE_CHARS = 2000  # 질문 길이 상한
+
+class BadRequest(Exception):
+    """요청 본문/헤더 오류 (status 와 함께 JSON 으로 돌려줌)"""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+# 🔐 인증
+def api_tokens():
+    """TALKTALK_API_TOKENS → [(클라이언트 이름, 토큰)]"""
+    tokens = []
+    for item in os.environ.get("TALKTALK_API_TOKENS", "").split(","):
+        name, _, token = item.strip().rpartition(":")
+        if token:
+            tokens.append((name or hashlib.sha256(token.encode()).hexdigest()[:12], token))
+    return tokens
+
+def authenticate(request):
+    """토큰 인증을 켰으면 클라이언트 이름, 꺼져 있으면 None"""
+    tokens = api_tokens()
+    if not tokens:
+        return None
+    scheme, _, given = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() == "bearer":
+        for name, token in tokens:
+            if hmac.compare_digest(given.strip().encode(), token.encode()):
+                return name
+    raise BadRequest("API 토큰이 필요합니다 (Authorization: Bearer <토큰>)", 401)
+
+def server_keys_allowed(client):
+    # 서버 키는 토큰으로 인증한 클라이언트에게만, 명시적으로 켰을 때 빌려줌
+    return client is not None and os.environ.get("TALKTALK_API_SERVER_KEYS", "0") == "1"
+
+def api_keys_from(request, client):
+    use_server_keys = server_keys_allowed(client)
+    keys = {
+        "openai": request.headers.get("x-openai-key")
+        or (os.environ.get("OPENAI_API_KEY") if use_server_keys else None),
+        "serpapi": request.headers.get("x-serpapi-key")
+        or (os.environ.get("SERPAPI_API_KEY") if use_server_keys else None),
+    }
+    if not all(keys.values()):
+        raise BadRequest("OpenAI/SerpAPI 키가 필요합니다 (X-OpenAI-Key, X-SerpAPI-Key 헤더)", 401)
+    return keys
+
+def client_id(client, api_keys):
+    """요청 한도와 대화 기록을 나누는 단위 (토큰 이름, 토큰 인증이 꺼져 있으면 OpenAI 키 해시)"""
+    if client is not None:
+        return f"client:{client}"
+    return "key:" + hashlib.sha256(api_keys["openai"].encode()).hexdigest()[:16]
+
+def history_id(user, session_id):
+    """클라이언트별 대화 기록 키 (32자리 16진수, 응답에는 클라이언트가 보낸 session_id 를 씀)"""
+    return hashlib.sha256(f"{user}:{session_id}".encode()).hexdigest()[:32]
+
+def requester(request):
+    """대화 기록 삭제처럼 키가 필요 없는 요청의 클라이언트"""
+    client = authenticate(request)
+    openai_key = request.headers.get("x-openai-key")
+    if client is None and not openai_key:
+        raise BadRequest("API 토큰 또는 OpenAI 키가 필요합니다", 401)
+    return client_id(client, {"openai": openai_key})
+
+async def read_turn(request):
+    """요청 → (API 키, 질문, session_id, 클라이언트)"""
+    client = authenticate(request)
+    api_keys = api_keys_from(request, client)
+    try:
+        body = await request.json()
+    except ValueError:
+        raise BadRequest("JSON 본문이 필요합니다")
+    message = body.get("message") if isinstance(body, dict) else None
+    if not isinstance(message, str) or not message.strip():
+        raise BadRequest("message 가 비어 있습니다")
+    if len(message) > MAX_MESSAGE_CHARS:
+        raise BadRequest(f"message 는 {MAX_MESSAGE_CHARS}자까지입니다", 413)
+    session_id = body.get("session_id") or new_session_id()
+    if not is_session_id(session_id):
+        raise BadRequest("session_id 는 32자리 16진수입니다")
+    return api_keys, message.strip(), session_id, client_id(client, api_keys)
+
+async def get_agent(api_keys):
+    # 캐시에 없으면 생성 (수백 ms, 처음에는 import 포함) → 이벤트 루프 밖에서
+    return await run_blocking(get_agent_cache().get, api_keys)
+
+def turn_response(session_id, result):
+    return {"session_id": session_id, **result}
+
+def error_response(error):
+    return JSONResponse({"error": str(error)}, status_code=getattr(error, "status", 500))
+
+# 💬 엔드포인트
+async def chat(request):
+    try:
+        api_keys, message, session_id, user = await read_turn(request)
+    except BadRequest as error:
+        return error_response(error)
+    try:
+        talktalk = await get_agent(api_keys)
+        result = await chat_turn(talktalk, message, history_id(user, session_id), user=user)
+    except Exception as error:
+        # 잘못된 키 등으로 망가진 에이전트만 다음 요청에 다시 생성
+        if agent_is_broken(error):
+            get_agent_cache().invalidate(api_keys)
+        logger.exception("chat turn failed")
+        return JSONResponse({"session_id": session_id, "error": str(error)}, status_code=502)
+    return JSONResponse(turn_response(session_id, result))
+
+def sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+async def chat_stream(request):
+    try:
+        api_keys, message, session_id, user = await read_turn(request)
+    except BadRequest as error:
+        return error_response(error)
+
+    async def events():
+        try:
+            talktalk = await get_agent(api_keys)
+            turn = stream_turn(talktalk, message, history_id(user, session_id), user=user)
+            async for kind, payload in turn:
+                if kind == "token":
+                    yield sse("token", {"text": payload})
+                elif kind == "done":
+                    yield sse("done", turn_response(session_id, payload))
+                else:
+                    yield sse(kind, payload)
+        except Exception as error:
+            if agent_is_broken(error):
+                get_agent_cache().invalidate(api_keys)
+            logger.exception("chat stream failed")
+            yield sse("error", {"session_id": session_id, "error": str(error)})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        # 프록시가 이벤트를 모아 두지 않도록
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+async def delete_history(request):
+    try:
+        user = requester(request)
+    except BadRequest as error:
+        return error_response(error)
+    session_id = request.path_params["session_id"]
+    if not is_session_id(session_id):
+        return error_response(BadRequest("session_id 는 32자리 16진수입니다"))
+    await run_blocking(delete_session, history_id(user, session_id))
+    return JSONResponse({"session_id": session_id, "deleted": True})
+
+async def healthz(request):
+    return JSONResponse({"status": "ok"})
+
+async def metrics(request):
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+@asynccontextmanager
+async def lifespan(app):
+    # 인기 질의 미리 가져오기와 LangChain/OpenAI 미리 불러오기 (각각 TALKTALK_PREFETCH=1, TALKTALK_WARMUP=1 일 때)
+    start_prefetcher(create_prefetch_tools)
+    start_warmup()
+    yield
+
+app = Starlette(
+    routes=[
+        Route("/v1/chat", chat, methods=["POST"]),
+        Route("/v1/chat/stream", chat_stream, methods=["POST"]),
+        Route("/v1/sessions/{session_id}", delete_history, methods=["DELETE"]),
+        Route("/healthz", healthz),
+        Route("/metrics", metrics),
+    ],
+    lifespan=lifespan,
+)
@@ -0,0 +1,51 @@
+"""rerun 당 에이전트 준비 시간 벤치마크 (캐시 전/후 비교)
+
+네트워크 호출 없이 객체 생성 비용만 측정합니다.
+
+    $ python benchmarks/bench_agent_cache.py --reruns 50
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+import warnings
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import chatbot_core as core  # noqa: E402
+
+warnings.filterwarnings("ignore")
+
+DUMMY_KEYS = {"openai": "sk-benchmark", "serpapi": "serpapi-benchmark"}
+
+def measure(label, prepare, reruns):
+    timings = []
+    for _ in range(reruns):
+        start = time.perf_counter()
+        prepare()
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    p95 = timings[max(0, int(len(timings) * 0.95) - 1)]
+    print(f"{label:<24} mean={statistics.mean(timings):8.3f}ms "
+          f"p50={statistics.median(timings):8.3f}ms p95={p95:8.3f}ms")
+    return statistics.mean(timings)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--reruns", type=int, default=50)
+    args = parser.parse_args()
+
+    # 모듈 import/첫 생성 비용은 양쪽에서 제외
+    core.build_agent(DUMMY_KEYS)
+
+    before = measure("before (rebuild)", lambda: core.build_agent(DUMMY_KEYS), args.reruns)
+
+    cache = core.AgentCache(max_size=8)
+    cache.get(DUMMY_KEYS)
+    after = measure("after (AgentCache)", lambda: cache.get(DUMMY_KEYS), args.reruns)
+
+    print(f"speedup: {before / after:.0f}x  cache={cache.stats()}")
+
+if __name__ == "__main__":
+    main()
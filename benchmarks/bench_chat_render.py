@@ -0,0 +1,62 @@
+"""대화 길이에 따른 rerun 렌더링 시간 벤치마크
+
+streamlit.testing 으로 대화 표시 부분만 실행해, 전체 메시지를 매번 그리는 방식과
+render_transcript (최근 CHAT_PAGE_SIZE 개만 표시) 를 비교합니다.
+
+    $ python benchmarks/bench_chat_render.py --sizes 10 100 500
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+import warnings
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from streamlit.testing.v1 import AppTest  # noqa: E402
+
+warnings.filterwarnings("ignore")
+
+def transcript_app(mode, size, root):
+    import sys
+    sys.path.insert(0, root)
+    import streamlit as st
+    import streamlit_app as app
+
+    messages = [
+        {"role": "user" if i % 2 == 0 else "assistant",
+         "content": f"**메시지 {i}** 서울 날씨는 맑고 21°C 입니다. " * 3}
+        for i in range(size)
+    ]
+    if mode == "full":
+        for message in messages:
+            with st.chat_message(message["role"]):
+                st.markdown(message["content"])
+    else:
+        app.render_transcript(messages)
+
+def measure(mode, size, reruns):
+    at = AppTest.from_function(transcript_app, args=(mode, size, ROOT), default_timeout=60)
+    at.run()  # 첫 실행 (import 비용) 제외
+    timings = []
+    for _ in range(reruns):
+        start = time.perf_counter()
+        at.run()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings), len(at.chat_message)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 500])
+    parser.add_argument("--reruns", type=int, default=5)
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        for mode in ("full", "paged"):
+            median, bubbles = measure(mode, size, args.reruns)
+            print(f"{size:5d} messages  {mode:<6} rerun p50={median:8.1f}ms  bubbles={bubbles}")
+
+if __name__ == "__main__":
+    main()
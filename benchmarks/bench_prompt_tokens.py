@@ -0,0 +1,116 @@
+"""에이전트 프롬프트 변형별 토큰 수 벤치마크
+
+LLM 호출마다 다시 보내는 고정 앞부분(도구 정의 + 시스템 프롬프트)의 토큰 수를
+변형(full, compact)별로 세고, 서로 다른 사용자/대화에서도 앞부분이 바이트까지 같은지
+(프롬프트 캐시 적용 가능 여부) 확인합니다. OpenAI 프롬프트 캐시는 1024 토큰 이상인
+앞부분에만 적용됩니다.
+
+    $ python benchmarks/bench_prompt_tokens.py
+    $ OPENAI_API_KEY=sk-... python benchmarks/bench_prompt_tokens.py --live --runs 5
+
+--live 는 실제 API 로 첫 토큰까지 걸린 시간과 캐시된 입력 토큰을 잽니다.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+import warnings
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("TALKTALK_SEARCH_BACKEND", "stub")
+
+from langchain_core.messages import AIMessage, HumanMessage  # noqa: E402
+from langchain_openai import ChatOpenAI  # noqa: E402
+
+import chatbot_core as core  # noqa: E402
+from tokens import count_tokens  # noqa: E402
+
+warnings.filterwarnings("ignore")
+
+PROMPT_CACHE_MIN_TOKENS = 1024
+SESSIONS = [
+    ([], "서울 날씨 알려줘"),
+    ([HumanMessage(content="김치찌개 레시피"), AIMessage(content="김치찌개는 ...")], "삼성전자 주가랑 AI 뉴스"),
+]
+
+def build_tools():
+    backend = core.create_search_backend("dummy")
+    return [
+        core.create_weather_tool(backend),
+        core.create_news_tool(backend),
+        core.create_recipe_tool(backend),
+        core.create_stock_tool(backend),
+        core.create_translation_tool(backend),
+        core.create_general_search_tool(backend),
+    ]
+
+def request_payload(llm, prompt, history, question):
+    """실제로 보낼 요청 본문 (네트워크 호출 없음)"""
+    messages = prompt.format_messages(chat_history=history, input=question, agent_scratchpad=[])
+    return llm.bound._get_request_payload(messages, **llm.kwargs)
+
+def static_prefix(payload):
+    """요청마다 같아야 하는 앞부분 (도구 정의 + 시스템 메시지) 직렬화"""
+    return json.dumps([payload["tools"], payload["messages"][0]], ensure_ascii=False, sort_keys=True)
+
+def measure(variant, tools):
+    llm = ChatOpenAI(api_key="sk-dummy", **core.AGENT_MODEL_SETTINGS).bind_tools(tools)
+    prompt = core.get_agent_prompt(variant)
+    payloads = [request_payload(llm, prompt, history, question) for history, question in SESSIONS]
+    prefixes = {static_prefix(payload) for payload in payloads}
+    # 메시지/도구마다 역할과 구분자 오버헤드 약 4 토큰
+    system_tokens = count_tokens(core.AGENT_PROMPTS[variant]) + 4
+    tool_tokens = sum(count_tokens(json.dumps(tool, ensure_ascii=False)) + 4 for tool in payloads[0]["tools"])
+    return {
+        "variant": variant,
+        "system": system_tokens,
+        "tools": tool_tokens,
+        "prefix": system_tokens + tool_tokens,
+        "stable": len(prefixes) == 1,
+    }
+
+def live_ttft(variant, tools, runs):
+    """실제 API 로 첫 토큰 시간과 캐시된 입력 토큰 측정"""
+    llm = ChatOpenAI(
+        model_kwargs={"prompt_cache_key": f"talktalk-agent-{variant}"}, **core.AGENT_MODEL_SETTINGS
+    ).bind_tools(tools)
+    prompt = core.get_agent_prompt(variant)
+    ttfts, cached = [], []
+    for _ in range(runs):
+        messages = prompt.format_messages(chat_history=[], input="오늘 기분 좋은 인사 한마디", agent_scratchpad=[])
+        started = time.perf_counter()
+        first, final = None, None
+        for chunk in llm.stream(messages):
+            if first is None and (chunk.content or chunk.tool_call_chunks):
+                first = time.perf_counter() - started
+            final = chunk if final is None else final + chunk
+        ttfts.append(first or time.perf_counter() - started)
+        usage = (final.usage_metadata or {}) if final is not None else {}
+        cached.append((usage.get("input_token_details") or {}).get("cache_read", 0))
+    return statistics.median(ttfts), sum(cached) / len(cached)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--live", action="store_true", help="실제 OpenAI API 로 첫 토큰 시간 측정")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    tools = build_tools()
+    print(f"{'variant':>8} {'system':>7} {'tools':>6} {'prefix':>7} {'per turn(x2)':>13} {'stable':>7} {'cacheable':>10}")
+    for variant in core.AGENT_PROMPTS:
+        row = measure(variant, tools)
+        print(
+            f"{variant:>8} {row['system']:>7} {row['tools']:>6} {row['prefix']:>7} "
+            f"{row['prefix'] * 2:>13} {'yes' if row['stable'] else 'NO':>7} "
+            f"{'yes' if row['prefix'] >= PROMPT_CACHE_MIN_TOKENS else 'no':>10}"
+        )
+    if args.live:
+        print()
+        for variant in core.AGENT_PROMPTS:
+            ttft, cached = live_ttft(variant, tools, args.runs)
+            print(f"{variant:>8} ttft p50 {ttft:.3f}s · cached input tokens {cached:.0f}")
+
+if __name__ == "__main__":
+    main()
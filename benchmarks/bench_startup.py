@@ -0,0 +1,107 @@
+"""톡톡이 시작 시간 벤치마크 (컨테이너 콜드 스타트, 첫 화면)
+
+단계마다 새 파이썬 프로세스를 띄워 모듈 캐시 없이 잽니다 (네트워크 호출 없음).
+
+- import: `import streamlit_app`
+- first screen: AppTest 로 키 입력 전 첫 화면을 그리기까지 (streamlit import 포함)
+- first agent: 첫 화면 뒤 첫 에이전트 생성 (미뤄 둔 LangChain/OpenAI import 포함)
+- first agent (warm): warmup.py 로 미리 불러온 뒤의 첫 에이전트 생성
+
+    $ python benchmarks/bench_startup.py --runs 5
+    $ python benchmarks/bench_startup.py --top 15   # 오래 걸리는 import 상위 15개
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 단계별로 새 프로세스에서 실행할 코드 (걸린 초를 마지막 줄에 출력)
+STAGES = {
+    "import": """
+import time
+started = time.perf_counter()
+import streamlit_app
+print(time.perf_counter() - started)
+""",
+    "first screen": """
+import time
+started = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+AppTest.from_file("streamlit_app.py", default_timeout=60).run()
+print(time.perf_counter() - started)
+""",
+    "first agent": """
+import time
+import chatbot_core as core
+started = time.perf_counter()
+core.build_agent({"openai": "sk-benchmark", "serpapi": "serpapi-benchmark"})
+print(time.perf_counter() - started)
+""",
+    "first agent (warm)": """
+import time
+import chatbot_core as core
+import warmup
+warmup.warm_up()
+started = time.perf_counter()
+core.build_agent({"openai": "sk-benchmark", "serpapi": "serpapi-benchmark"})
+print(time.perf_counter() - started)
+""",
+}
+
+def child_env():
+    env = dict(os.environ)
+    env.update({
+        "PYTHONPATH": ROOT,
+        "TALKTALK_PREFETCH": "0",        # 백그라운드 검색 없이
+        "TALKTALK_WARMUP": "0",          # 미리 불러오기는 "warm" 단계에서만
+        "TALKTALK_SEARCH_BACKEND": "stub",
+        "PYTHONWARNINGS": "ignore",
+    })
+    return env
+
+def run_stage(code):
+    result = subprocess.run(
+        [sys.executable, "-c", code], cwd=ROOT, env=child_env(),
+        capture_output=True, text=True, check=True,
+    )
+    return float(result.stdout.strip().splitlines()[-1])
+
+def slowest_imports(limit):
+    """-X importtime 으로 `import streamlit_app` 에서 누적 시간이 긴 최상위 import"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import streamlit_app"],
+        cwd=ROOT, env=child_env(), capture_output=True, text=True, check=True,
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if not cumulative.strip().isdigit():
+            continue
+        depth = (len(name) - len(name.lstrip())) // 2
+        if depth <= 1:  # streamlit_app 자신과 그 바로 아래
+            rows.append((int(cumulative) / 1e6, name.strip()))
+    return sorted(rows, reverse=True)[:limit]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10, help="오래 걸리는 import 몇 개를 보여 줄지 (0 이면 생략)")
+    args = parser.parse_args()
+
+    print(f"{'stage':<20} {'p50':>7} {'min':>7} {'max':>7}")
+    for stage, code in STAGES.items():
+        timings = [run_stage(code) for _ in range(args.runs)]
+        print(f"{stage:<20} {statistics.median(timings):6.2f}s {min(timings):6.2f}s {max(timings):6.2f}s")
+
+    if args.top:
+        print("\nslowest imports (cumulative)")
+        for seconds, name in slowest_imports(args.top):
+            print(f"  {seconds:6.3f}s  {name}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""rerun 당 테마 CSS 전송량 벤치마크 (웹소켓 ForwardMsg 바이트 기준)
+
+Streamlit 은 10KB 이상이고 내용이 같은 요소를 브라우저에 캐시해 두고, 다음 rerun 부터는
+해시 참조만 보냅니다. 이전 방식은 --baseline 커밋(기본: 테마 CSS 를 고정하기 직전)의
+streamlit_app.py 를 git 에서 읽어 main() 의 테마 부분을 그대로 실행해 얻고,
+현재 방식(고정 스타일시트 + 테마 표시 요소)과 같은 규칙으로 비교합니다.
+
+    $ python benchmarks/bench_theme_bytes.py --reruns 20
+"""
+import argparse
+import ast
+import os
+import subprocess
+import sys
+import warnings
+from types import SimpleNamespace
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg  # noqa: E402
+from streamlit.runtime.forward_msg_cache import create_reference_msg, populate_hash_if_needed  # noqa: E402
+from streamlit.string_util import clean_text  # noqa: E402
+
+import streamlit_app as app  # noqa: E402
+
+warnings.filterwarnings("ignore")
+
+# 테마 CSS 를 고정하기 직전 커밋
+BASELINE = "3364a0f^"
+
+def baseline_renderer(rev):
+    """rev 의 main() 에서 테마 스타일을 그리는 부분만 꺼내 (theme, rerun) -> 요소 목록 함수로"""
+    source = subprocess.run(
+        ["git", "show", f"{rev}:streamlit_app.py"],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    ).stdout
+    functions = {node.name: node for node in ast.parse(source).body if isinstance(node, ast.FunctionDef)}
+
+    # cache_buster 를 만드는 줄부터 테마별 강제 스타일(if st.session_state.theme ...)까지
+    body = functions["main"].body
+    start = next(i for i, node in enumerate(body) if "cache_buster" in ast.unparse(node))
+    end = next(i for i in range(start, len(body))
+               if isinstance(body[i], ast.If) and "session_state.theme" in ast.unparse(body[i].test))
+    theme_block = compile(ast.Module(body=body[start:end + 1], type_ignores=[]), rev, "exec")
+
+    namespace = {}
+    exec(compile(ast.Module(body=[functions["apply_theme_styles"]], type_ignores=[]), rev, "exec"),
+         namespace)
+
+    def render(theme, rerun):
+        elements = []
+        st = SimpleNamespace(
+            session_state=SimpleNamespace(theme=theme),
+            markdown=lambda body, **kwargs: elements.append(body),
+        )
+        # 밀리초 타임스탬프는 rerun 마다 달라지므로 rerun 번호로 고정
+        clock = SimpleNamespace(time=lambda: 1700000000 + rerun)
+        exec(theme_block, {**namespace, "st": st, "time": clock})
+        return elements
+
+    return render
+
+def markdown_msg(body):
+    msg = ForwardMsg()
+    msg.delta.new_element.markdown.body = clean_text(body)
+    msg.delta.new_element.markdown.allow_html = True
+    populate_hash_if_needed(msg)
+    return msg
+
+def simulate(reruns, elements_for_rerun):
+    """rerun 별 전송 바이트 (브라우저 메시지 캐시 반영)"""
+    client_cache = set()
+    sent = []
+    for rerun in range(reruns):
+        total = 0
+        for body in elements_for_rerun(rerun):
+            msg = markdown_msg(body)
+            if msg.metadata.cacheable and msg.hash in client_cache:
+                msg = create_reference_msg(msg)
+            elif msg.metadata.cacheable:
+                client_cache.add(msg.hash)
+            total += len(msg.SerializeToString())
+        sent.append(total)
+    return sent
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--reruns", type=int, default=20)
+    parser.add_argument("--baseline", default=BASELINE, help="비교할 이전 커밋")
+    args = parser.parse_args()
+
+    css = app.build_theme_css()
+    render_baseline = baseline_renderer(args.baseline)
+    themes = ["light", "dark"]
+
+    # 두 방식 모두 4 rerun 마다 테마 전환
+    def theme_at(rerun):
+        return themes[(rerun // 4) % 2]
+
+    def before(rerun):
+        return render_baseline(theme_at(rerun), rerun)
+
+    def after(rerun):
+        return [css, app.theme_marker(theme_at(rerun))]
+
+    for label, elements in (("before (cache-busted)", before), ("after (stable)", after)):
+        sent = simulate(args.reruns, elements)
+        warm = sent[1:] or sent
+        print(f"{label:<22} first={sent[0]:6d}B  warm avg={sum(warm) / len(warm):8.1f}B  "
+              f"total={sum(sent):7d}B over {args.reruns} reruns")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+"""벤치마크용 로컬 OpenAI / SerpAPI 대역 서버
+
+실제 키나 네트워크 없이 에이전트 전체 흐름을 돌리기 위한 HTTP 서버입니다.
+지연 시간과 응답 크기를 조절할 수 있습니다.
+
+- OpenAI: POST /v1/chat/completions (일반 응답과 stream=true SSE 모두 지원)
+  사용자 질문의 키워드로 도구 호출을 만들고, 도구 결과를 받으면 최종 답변을 돌려줍니다.
+- SerpAPI: GET /search (organic_results 형식)
+"""
+import json
+import sys
+import threading
+import time
+import os
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tokens import count_tokens  # noqa: E402
+from router import INTENT_KEYWORDS  # noqa: E402
+
+class _Handler(BaseHTTPRequestHandler):
+    server_version = "TalkTalkFake/1.0"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, payload, status=200):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+class FakeServer:
+    """백그라운드 스레드에서 도는 HTTP 서버"""
+
+    handler = _Handler
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.requests = 0
+        self._lock = threading.Lock()
+        handler = type("Handler", (self.handler,), {"fake": self})
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        self.httpd.daemon_threads = True
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def count_request(self):
+        with self._lock:
+            self.requests += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+# 🤖 OpenAI 대역
+class _OpenAIHandler(_Handler):
+    def do_POST(self):
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send_json({"error": {"message": "not found"}}, status=404)
+            return
+        request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+        self.fake.count_request()
+        message, finish_reason = self.fake.reply(request)
+        prompt_tokens = sum(count_tokens(json.dumps(m, ensure_ascii=False)) for m in request["messages"])
+        completion_tokens = count_tokens(message.get("content") or "") + 10 * len(message.get("tool_calls", []))
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        }
+        if request.get("stream"):
+            self._send_stream(request, message, finish_reason, usage)
+        else:
+            self._send_json({
+                "id": "chatcmpl-fake",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": request.get("model", "fake"),
+                "choices": [{"index": 0, "message": message, "finish_reason": finish_reason}],
+                "usage": usage,
+            })
+
+    def _send_stream(self, request, message, finish_reason, usage):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.end_headers()
+
+        def chunk(delta, finish=None, extra=None):
+            payload = {
+                "id": "chatcmpl-fake",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": request.get("model", "fake"),
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish}],
+            }
+            payload.update(extra or {})
+            self.wfile.write(f"data: {json.dumps(payload, ensure_ascii=False)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+
+        chunk({"role": "assistant", "content": ""})
+        for index, call in enumerate(message.get("tool_calls", [])):
+            chunk({"tool_calls": [dict(call, index=index)]})
+        words = (message.get("content") or "").split(" ")
+        for i, word in enumerate(words):
+            chunk({"content": word if i == 0 else " " + word})
+            if self.fake.token_delay:
+                time.sleep(self.fake.token_delay)
+        chunk({}, finish=finish_reason)
+        if (request.get("stream_options") or {}).get("include_usage"):
+            payload = {"id": "chatcmpl-fake", "object": "chat.completion.chunk",
+                       "created": int(time.time()), "model": request.get("model", "fake"),
+                       "choices": [], "usage": usage}
+            self.wfile.write(f"data: {json.dumps(payload)}\n\n".encode("utf-8"))
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+class FakeOpenAIServer(FakeServer):
+    """키워드로 도구를 고르는 가짜 Chat Completions 서버"""
+
+    handler = _OpenAIHandler
+
+    def __init__(self, latency=0.3, answer_tokens=120, token_delay=0.0):
+        super().__init__(latency)
+        self.answer_tokens = answer_tokens
+        self.token_delay = token_delay
+
+    def reply(self, request):
+        messages = request["messages"]
+        tool_names = {tool["function"]["name"] for tool in request.get("tools", [])}
+        question = next(
+            (m.get("content") or "" for m in reversed(messages) if m["role"] == "user"), ""
+        )
+        if tool_names and messages[-1]["role"] != "tool":
+            calls = [
+                {
+                    "id": f"call_{i}",
+                    "type": "function",
+                    "function": {"name": name, "arguments": json.dumps({"__arg1": question}, ensure_ascii=False)},
+                }
+                for i, name in enumerate(
+                    name for name, words in INTENT_KEYWORDS.items()
+                    if name in tool_names and any(word in question for word in words)
+                )
+            ]
+            if calls:
+                return {"role": "assistant", "content": None, "tool_calls": calls}, "tool_calls"
+        words = ["톡톡이의", "답변입니다."] + ["정보를"] * max(0, self.answer_tokens - 2)
+        return {"role": "assistant", "content": " ".join(words[:self.answer_tokens])}, "stop"
+
+# 🔍 SerpAPI 대역
+class _SerpAPIHandler(_Handler):
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path.rstrip("/") not in ("/search", "/search.json"):
+            self._send_json({"error": "not found"}, status=404)
+            return
+        query = parse_qs(url.query).get("q", [""])[0]
+        self.fake.count_request()
+        self._send_json(self.fake.results(query))
+
+class FakeSerpAPIServer(FakeServer):
+    """organic_results 를 돌려주는 가짜 검색 서버"""
+
+    handler = _SerpAPIHandler
+
+    def __init__(self, latency=0.2, num_results=3, snippet_chars=160):
+        super().__init__(latency)
+        self.num_results = num_results
+        self.snippet_chars = snippet_chars
+
+    def results(self, query):
+        snippet = (f"{query} 관련 정보: 현재 기온 21°C, 주가 71,000원. " * 20)[:self.snippet_chars]
+        return {
+            "search_metadata": {"status": "Success"},
+            "organic_results": [
+                {
+                    "position": i + 1,
+                    "title": f"{query} 레시피 만들기 결과 {i + 1}",
+                    "snippet": snippet,
+                    "link": f"https://example.com/{i + 1}?utm_source=fake",
+                }
+                for i in range(self.num_results)
+            ],
+        }
@@ -0,0 +1,178 @@
+"""오프라인 부하 테스트 / 턴 지연 벤치마크
+
+로컬 가짜 OpenAI·SerpAPI 서버(fake_servers.py)를 띄우고, 한국어 질문 모음을
+동시 사용자 수별로 재생해 턴 지연(p50/p95/p99), 턴당 토큰·LLM 호출·도구 호출 수를
+보고합니다. --render 를 주면 AppTest 로 main() 을 실제로 돌려 rerun 렌더링 시간도 잽니다.
+
+    $ python benchmarks/load_test.py --concurrency 1 4 16 --turns 80
+    $ python benchmarks/load_test.py --llm-latency 0.5 --search-latency 0.3 --render
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+import warnings
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# 대화 기록은 프로세스 내부 저장소 사용 (파일을 남기지 않도록)
+os.environ.setdefault("TALKTALK_HISTORY_BACKEND", "fakeredis")
+os.environ.pop("TALKTALK_SEARCH_BACKEND", None)
+os.environ.setdefault("TALKTALK_QUOTE_PROVIDER", "fixture")
+os.environ.setdefault("TALKTALK_WEATHER_PROVIDER", "fake")
+# 미리 가져오기 스레드가 결과를 흔들지 않도록 끔
+os.environ.setdefault("TALKTALK_PREFETCH", "0")
+# 요청 한도는 사용량만 셈 (TALKTALK_RATE_LIMIT=1 이면 한도 아래에서 측정)
+os.environ.setdefault("TALKTALK_RATE_LIMIT", "0")
+
+from langchain_core.callbacks import BaseCallbackHandler  # noqa: E402
+
+from fake_servers import FakeOpenAIServer, FakeSerpAPIServer  # noqa: E402
+
+warnings.filterwarnings("ignore")
+
+DUMMY_KEYS = {"openai": "sk-loadtest", "serpapi": "serpapi-loadtest"}
+
+class TurnCounter(BaseCallbackHandler):
+    """턴 하나의 LLM 호출, 토큰, 도구 호출 수"""
+
+    run_inline = True
+
+    def __init__(self):
+        self.llm_calls = 0
+        self.tokens = 0
+        self.tool_calls = 0
+
+    def on_chat_model_start(self, serialized, messages, **kwargs):
+        self.llm_calls += 1
+
+    def on_llm_end(self, response, **kwargs):
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+                if usage:
+                    self.tokens += usage.get("total_tokens", 0)
+
+    def on_tool_start(self, serialized, input_str, **kwargs):
+        self.tool_calls += 1
+
+def percentile(values, q):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(q / 100 * len(ordered) + 0.5) - 1))
+    return ordered[index]
+
+def load_corpus(path):
+    with open(path, encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip() and not line.startswith("#")]
+
+async def run_level(core, talktalk, queries, concurrency, turns, seed):
+    rng = random.Random(seed)
+    schedule = [rng.choice(queries) for _ in range(turns)]
+    semaphore = asyncio.Semaphore(concurrency)
+    results = []
+
+    async def one(turn, query):
+        async with semaphore:
+            counter = TurnCounter()
+            started = time.perf_counter()
+            _, path, _ = await core.answer_turn(
+                talktalk, query, f"loadtest-{turn % concurrency}", callbacks=[counter]
+            )
+            results.append((time.perf_counter() - started, counter, path))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i, q) for i, q in enumerate(schedule)))
+    return results, time.perf_counter() - started
+
+def measure_render(queries, turns):
+    """AppTest 로 main() 을 돌려 턴 처리 + rerun 렌더링 시간 측정"""
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(os.path.join(ROOT, "streamlit_app.py"), default_timeout=120)
+    at.run()
+    at.sidebar.text_input[0].input(DUMMY_KEYS["openai"])
+    at.sidebar.text_input[1].input(DUMMY_KEYS["serpapi"])
+    at.run()
+    turn_times, rerun_times = [], []
+    for query in queries[:turns]:
+        started = time.perf_counter()
+        at.chat_input[0].set_value(query).run()
+        turn_times.append(time.perf_counter() - started)
+        started = time.perf_counter()
+        at.run()
+        rerun_times.append(time.perf_counter() - started)
+    return turn_times, rerun_times
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--turns", type=int, default=80, help="동시성 수준별 턴 수")
+    parser.add_argument("--corpus", default=os.path.join(os.path.dirname(__file__), "queries_ko.txt"))
+    parser.add_argument("--llm-latency", type=float, default=0.3)
+    parser.add_argument("--search-latency", type=float, default=0.2)
+    parser.add_argument("--answer-tokens", type=int, default=120)
+    parser.add_argument("--results", type=int, default=3, help="검색 결과 수")
+    parser.add_argument("--snippet-chars", type=int, default=160)
+    parser.add_argument("--warm", action="store_true", help="동시성 수준 사이에 캐시를 비우지 않음")
+    parser.add_argument("--render", action="store_true", help="AppTest 로 main() 렌더링 시간 측정")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    llm = FakeOpenAIServer(args.llm_latency, args.answer_tokens).start()
+    search = FakeSerpAPIServer(args.search_latency, args.results, args.snippet_chars).start()
+    os.environ["OPENAI_BASE_URL"] = llm.base_url + "/v1"
+    os.environ["TALKTALK_SEARCH_URL"] = search.base_url
+
+    import chatbot_core as core
+    import tool_cache
+    from semantic_cache import semantic_cache
+
+    queries = load_corpus(args.corpus)
+    talktalk = core.build_agent(DUMMY_KEYS)
+    print(f"corpus={len(queries)} queries  llm={args.llm_latency}s  search={args.search_latency}s  "
+          f"answer={args.answer_tokens} tokens  results={args.results}")
+    print(f"{'conc':>4} {'turns':>5} {'turn/s':>7} {'p50':>7} {'p95':>7} {'p99':>7} "
+          f"{'tokens':>7} {'llm':>5} {'tools':>5} {'quick':>6} {'llm req':>7} {'search req':>10}")
+
+    for concurrency in args.concurrency:
+        if not args.warm:
+            tool_cache.get_tool_cache().clear()
+            semantic_cache.clear()
+        llm_before, search_before = llm.requests, search.requests
+        results, wall = asyncio.run(
+            run_level(core, talktalk, queries, concurrency, args.turns, args.seed)
+        )
+        latencies = [r[0] for r in results]
+        counters = [r[1] for r in results]
+        quick = sum(1 for r in results if r[2] == "quick") / len(results)
+        print(f"{concurrency:>4} {len(results):>5} {len(results) / wall:>7.2f} "
+              f"{percentile(latencies, 50):>6.3f}s {percentile(latencies, 95):>6.3f}s "
+              f"{percentile(latencies, 99):>6.3f}s "
+              f"{statistics.mean(c.tokens for c in counters):>7.0f} "
+              f"{statistics.mean(c.llm_calls for c in counters):>5.2f} "
+              f"{statistics.mean(c.tool_calls for c in counters):>5.2f} "
+              f"{quick:>6.0%} {llm.requests - llm_before:>7} {search.requests - search_before:>10}")
+
+    # 동시에 들어온 같은 검색을 합쳐 절약한 호출 수 (도구별, 전체 실행 누적)
+    flights = tool_cache.get_single_flight().stats()
+    if flights:
+        print("single-flight  " + "  ".join(
+            f"{name}={stat['upstream']}+{stat['saved']} saved" for name, stat in sorted(flights.items())
+        ))
+
+    if args.render:
+        turn_times, rerun_times = measure_render(queries, 10)
+        print(f"main() turn p50={statistics.median(turn_times):.3f}s  "
+              f"rerun render p50={statistics.median(rerun_times) * 1000:.1f}ms "
+              f"p95={percentile(rerun_times, 95) * 1000:.1f}ms")
+
+    llm.stop()
+    search.stop()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,33 @@
+"""톡톡이 OpenAI 채팅 모델
+
+langchain_openai 는 불러오는 데 오래 걸리므로 (openai SDK 포함 약 2초) 에이전트를
+처음 만들 때 이 모듈을 불러옵니다.
+"""
+from langchain_openai import ChatOpenAI
+
+from rate_limit import get_limiter
+
+class RateLimitedChatOpenAI(ChatOpenAI):
+    """호출마다 OpenAI 요청 한도를 거치는 ChatOpenAI (한도 초과 시 QuotaExceeded)"""
+
+    def _generate(self, *args, **kwargs):
+        if self.streaming:
+            # streaming=True 면 _stream 을 거치므로 거기서 한도를 잡음
+            return super()._generate(*args, **kwargs)
+        with get_limiter("openai").limit():
+            return super()._generate(*args, **kwargs)
+
+    async def _agenerate(self, *args, **kwargs):
+        if self.streaming:
+            return await super()._agenerate(*args, **kwargs)
+        async with get_limiter("openai").alimit():
+            return await super()._agenerate(*args, **kwargs)
+
+    def _stream(self, *args, **kwargs):
+        with get_limiter("openai").limit():
+            yield from super()._stream(*args, **kwargs)
+
+    async def _astream(self, *args, **kwargs):
+        async with get_limiter("openai").alimit():
+            async for chunk in super()._astream(*args, **kwargs):
+                yield chunk
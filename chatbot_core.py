@@ -0,0 +1,676 @@
+"""톡톡이 챗봇 코어
+
+Streamlit 화면(streamlit_app.py)과 HTTP API(api.py)가 함께 쓰는 에이전트 파이프라인입니다.
+도구, 에이전트 생성과 캐시, 대화 기록, 한 턴 처리(빠른 답변 → 에이전트 → 한도 초과 대체
+답변)를 UI 없이 제공합니다. 검색/답변 캐시, HTTP 연결 풀, 요청 한도, 에이전트 캐시는
+모두 프로세스 전역이라 같은 프로세스의 모든 사용자와 요청이 공유합니다.
+
+    talktalk = get_agent_cache().get({"openai": "sk-...", "serpapi": "..."})
+    result = await chat_turn(talktalk, "서울 날씨 알려줘", new_session_id())
+"""
+import asyncio
+import functools
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from agent_policy import (
+    CompleteAnswer, get_turn_deadline, iteration_budget, partial_answer, policy_stats,
+    tool_input_text, tracking_outcome,
+)
+from compaction import budgeted
+from metrics import TurnTracer
+from prefetch import prefetcher
+from rate_limit import QuotaExceeded, acting_as
+from router import IntentRouter, router_stats
+from semantic_cache import semantic_cache
+from session_store import get_history_store
+from stock_quotes import extract_listings, format_quote, get_quote_service
+from tool_cache import CachedSearch, StubSearchBackend, create_search_backend
+from tool_runtime import make_async_tool, run_blocking, tool_slots
+from translation import (
+    TRANSLATION_MAX_TOKENS, Translator, create_translation_backend, format_translations, parse_request,
+)
+from weather import extract_places, format_weather, get_weather_service
+
+# 🎯 다양한 도구들 정의
+def make_tool(name, func, description):
+    """모든 도구의 공통 단계: 출력을 토큰 예산 안으로 줄이고 비동기 실행 구현을 붙임"""
+    from langchain_core.tools import Tool
+
+    func = budgeted(name, func)
+    return Tool(name=name, func=func, coroutine=make_async_tool(func), description=description)
+
+def create_weather_tool(backend=None, weather=None):
+    """날씨 도구 (지명 사전에 있는 곳은 날씨 조회, 없으면 웹 검색)"""
+    search = CachedSearch("weather_search", backend)
+    
+    def search_weather(location):
+        results = search.results(f"{location} 날씨 오늘 섭씨 celsius temperature")
+        organic = results.get("organic_results", [])
+        if organic:
+            weather_info = organic[0].get("snippet", "날씨 정보를 찾을 수 없습니다.")
+            # 화씨를 섭씨로 변환하는 안내 포함
+            return f"🌤️ {location} 날씨: {weather_info}\n\n📌 온도는 섭씨(°C) 기준으로 표시됩니다."
+        return "날씨 정보를 찾을 수 없습니다."
+    
+    def get_weather(location: str) -> str:
+        prefetcher.observe("weather_search", location)
+        try:
+            # 쉼표로 나눈 지역마다 사전의 지명, 사전에 없으면 ("광주" 처럼 여러 곳이면) 웹 검색
+            names = [name.strip() for name in location.split(",") if name.strip()] or [location]
+            matches = [extract_places(name) for name in names]
+            places = [place for matched in matches for place in matched]
+            found = {}
+            if places:
+                # 여러 지역도 날씨 요청 한 번으로 조회
+                service = weather if weather is not None else get_weather_service()
+                try:
+                    found = service.get_weather(places)
+                except Exception:
+                    pass  # 날씨 조회 실패 → 지역마다 웹 검색
+            lines = []
+            for name, matched in zip(names, matches):
+                if not matched:
+                    lines.append(search_weather(name))
+                for place in matched:
+                    lines.append(
+                        format_weather(place["name"], found[place["name"]]) if place["name"] in found
+                        else search_weather(place["name"])
+                    )
+            answer = "\n".join(dict.fromkeys(lines))
+            # 모든 지역을 날씨 서비스로 답했으면 그대로 사용자 답변이 될 수 있음
+            complete = all(matches) and all(place["name"] in found for place in places)
+            return CompleteAnswer(answer) if complete else answer
+        except Exception as e:
+            return f"날씨 검색 중 오류 발생: {str(e)}"
+    
+    return make_tool(
+        name="weather_search",
+        func=get_weather,
+        description="지역의 현재 날씨를 조회합니다. 여러 지역은 한 번에 넘기세요. 사용법: weather_search('서울, 부산')"
+    )
+
+def create_news_tool(backend=None):
+    """최신 뉴스 검색 도구"""
+    search = CachedSearch("news_search", backend)
+    
+    def get_news(topic: str) -> str:
+        prefetcher.observe("news_search", topic)
+        try:
+            results = search.results(f"{topic} 최신 뉴스")
+            organic = results.get("organic_results", [])
+            news_list = []
+            
+            for i, result in enumerate(organic[:3]):
+                title = result.get("title", "제목 없음")
+                snippet = result.get("snippet", "내용 없음")
+                link = result.get("link", "")
+                news_list.append(f"{i+1}. {title}\n{snippet}\n{link}")
+            
+            return "\n\n".join(news_list) if news_list else "뉴스를 찾을 수 없습니다."
+        except Exception as e:
+            return f"뉴스 검색 중 오류 발생: {str(e)}"
+    
+    return make_tool(
+        name="news_search",
+        func=get_news,
+        description="최신 뉴스를 검색합니다. 사용법: news_search('AI 기술')"
+    )
+
+def create_recipe_tool(backend=None):
+    """요리 레시피 검색 도구"""
+    search = CachedSearch("recipe_search", backend)
+    
+    def get_recipe(dish: str) -> str:
+        try:
+            results = search.results(f"{dish} 레시피 만들기 요리법")
+            organic = results.get("organic_results", [])
+            recipes = []
+            
+            for result in organic[:2]:
+                title = result.get("title", "")
+                snippet = result.get("snippet", "")
+                if "레시피" in title or "만들기" in title:
+                    recipes.append(f"🍳 {title}\n{snippet}")
+            
+            return "\n\n".join(recipes) if recipes else f"{dish} 레시피를 찾을 수 없습니다."
+        except Exception as e:
+            return f"레시피 검색 중 오류 발생: {str(e)}"
+    
+    return make_tool(
+        name="recipe_search",
+        func=get_recipe,
+        description="요리 레시피를 검색합니다. 사용법: recipe_search('김치찌개')"
+    )
+
+def create_stock_tool(backend=None, quotes=None):
+    """주식 시세 도구 (색인에 있는 종목은 시세 조회, 없으면 웹 검색)"""
+    search = CachedSearch("stock_search", backend)
+    
+    def search_stock(company):
+        results = search.results(f"{company} 주식 주가 현재가")
+        organic = results.get("organic_results", [])
+        if organic:
+            stock_info = organic[0].get("snippet", "주식 정보를 찾을 수 없습니다.")
+            return f"📈 {company} 주식 정보: {stock_info}"
+        return f"{company} 주식 정보를 찾을 수 없습니다."
+    
+    def get_stock_info(company: str) -> str:
+        prefetcher.observe("stock_search", company)
+        try:
+            # 쉼표로 나눈 이름마다 색인의 종목, 색인에 없으면 그 이름 그대로 웹 검색
+            names = [name.strip() for name in company.split(",") if name.strip()] or [company]
+            matches = [extract_listings(name) for name in names]
+            listings = [listing for matched in matches for listing in matched]
+            service = quotes if quotes is not None else get_quote_service()
+            found = {}
+            if service is not None and listings:
+                # 여러 종목도 시세 요청 한 번으로 조회
+                try:
+                    found = service.get_quotes(listings)
+                except Exception:
+                    pass  # 시세 조회 실패 → 종목마다 웹 검색
+            lines = []
+            for name, matched in zip(names, matches):
+                if not matched:
+                    lines.append(search_stock(name))
+                for listing in matched:
+                    ticker = listing["ticker"]
+                    lines.append(format_quote(found[ticker]) if ticker in found else search_stock(listing["name"]))
+            answer = "\n".join(dict.fromkeys(lines))
+            complete = all(matches) and all(listing["ticker"] in found for listing in listings)
+            return CompleteAnswer(answer) if complete else answer
+        except Exception as e:
+            return f"주식 정보 검색 중 오류 발생: {str(e)}"
+    
+    return make_tool(
+        name="stock_search",
+        func=get_stock_info,
+        description="주식 시세를 조회합니다. 여러 종목은 한 번에 넘기세요. 사용법: stock_search('삼성전자, SK하이닉스')"
+    )
+
+def create_translation_tool(backend=None, translator=None):
+    """번역 도구 (번역 백엔드 직접 호출, 번역기가 없거나 실패하면 웹 검색)"""
+    search = CachedSearch("translation_search", backend)
+    
+    def search_translation(text_and_lang):
+        results = search.results(f"번역 {text_and_lang}")
+        organic = results.get("organic_results", [])
+        if organic:
+            translation = organic[0].get("snippet", "번역을 찾을 수 없습니다.")
+            return f"🔤 번역 결과: {translation}"
+        return "번역을 찾을 수 없습니다."
+    
+    def translate_text(text_and_lang: str) -> str:
+        try:
+            texts, target = parse_request(text_and_lang)
+            if not texts or translator is None:
+                return search_translation(text_and_lang)
+            try:
+                translations = translator.translate(texts, target)
+            except Exception:
+                return search_translation(text_and_lang)
+            if not all(translations):
+                return search_translation(text_and_lang)
+            return CompleteAnswer(format_translations(texts, translations, target))
+        except Exception as e:
+            return f"번역 중 오류 발생: {str(e)}"
+    
+    return make_tool(
+        name="translation_search",
+        func=translate_text,
+        description="텍스트를 번역합니다. 여러 문장은 따옴표로 감싸 한 번에 넘기세요. "
+                    "사용법: translation_search('안녕하세요를 영어로'), translation_search(\"'감사합니다', '사랑해요' 일본어로\")"
+    )
+
+def create_general_search_tool(backend=None):
+    """일반 검색 도구"""
+    search = CachedSearch("general_search", backend)
+    
+    def general_search(query: str) -> str:
+        try:
+            results = search.results(query)
+            organic = results.get("organic_results", [])
+            search_results = []
+            
+            for i, result in enumerate(organic[:3]):
+                title = result.get("title", "제목 없음")
+                snippet = result.get("snippet", "내용 없음")
+                link = result.get("link", "")
+                search_results.append(f"{i+1}. {title}\n{snippet}\n{link}")
+            
+            return "\n\n".join(search_results) if search_results else "검색 결과를 찾을 수 없습니다."
+        except Exception as e:
+            return f"검색 중 오류 발생: {str(e)}"
+    
+    return make_tool(
+        name="general_search",
+        func=general_search,
+        description="일반적인 정보를 검색합니다. 다른 도구로 해결되지 않는 질문에 사용합니다."
+    )
+
+def create_prefetch_tools():
+    """미리 가져오기 전용 도구 (사용자 키가 아닌 서버 설정의 SERPAPI_API_KEY 사용)
+
+    서버 키가 없으면 웹 검색으로만 답하는 도구(뉴스, 시세 제공자가 없을 때의 주식)는 빼고,
+    날씨는 날씨 서비스로 답하는 지역만 가져옵니다 (검색 백엔드가 키 없이는 요청하지 않음).
+    """
+    server_key = os.environ.get("SERPAPI_API_KEY")
+    backend = create_search_backend(server_key)
+    searchable = bool(server_key) or isinstance(backend, StubSearchBackend)
+    tools = [create_weather_tool(backend)]
+    if searchable or get_quote_service() is not None:
+        tools.append(create_stock_tool(backend))
+    if searchable:
+        tools.append(create_news_tool(backend))
+    return tools
+
+# 🤖 AI 에이전트 생성
+AGENT_MODEL_SETTINGS = {
+    "model": "gpt-4o-mini",
+    "temperature": 0.7,
+    "max_tokens": 2000,
+    "stream_usage": True,  # 스트리밍 응답에도 토큰 사용량 포함 (턴 추적용)
+}
+
+# 📝 에이전트 프롬프트
+# 요청 앞부분(도구 정의 + 시스템 프롬프트)은 사용자/턴과 무관하게 바이트까지 같아야
+# OpenAI 프롬프트 캐시가 적용됨 → 날짜, 사용자 이름 같은 가변 값은 넣지 않음
+# (캐시는 1024 토큰 이상인 요청에만 적용: 앞부분만으로는 모자라고 대화 기록이 쌓이면 적용)
+AGENT_SYSTEM_PROMPT = """
+안녕하세요! 저는 AI 비서 톡톡이입니다! 🤖✨
+
+저는 다양한 기능을 가진 만능 AI 비서예요:
+
+🌤️ **날씨 정보**: 전국 어디든 실시간 날씨를 섭씨(°C) 온도로 알려드려요
+📰 **최신 뉴스**: 궁금한 분야의 최신 소식을 전해드려요  
+🍳 **요리 레시피**: 맛있는 요리법을 찾아드려요
+📈 **주식 정보**: 관심 있는 기업의 주가를 확인해드려요
+🔤 **번역 서비스**: 다양한 언어로 번역해드려요
+🔍 **통합 검색**: 모든 궁금한 것을 검색해드려요
+
+**사용 팁:**
+- 구체적으로 질문해주세요! (예: "서울 날씨", "김치찌개 레시피")
+- 최신 정보가 필요하면 "최신", "현재", "오늘" 등을 포함해주세요
+- 날씨 정보는 항상 섭씨(°C) 온도로 제공됩니다
+- 여러 질문도 한번에 물어보셔도 돼요!
+
+친근하고 도움이 되는 답변을 드릴게요! 😊
+어떤 도움이 필요하신가요?
+"""
+
+# 같은 지시를 짧게 줄인 프롬프트 (LLM 호출마다 다시 보내는 입력 토큰을 줄임, 기본값)
+AGENT_COMPACT_PROMPT = """당신은 AI 비서 톡톡이입니다. 친근한 존댓말로 간결하게 답하세요.
+- 날씨, 뉴스, 레시피, 주가, 번역, 최신 정보는 도구로 확인한 뒤 답하세요.
+- 질문에 여러 정보가 필요하면 필요한 도구를 한 번에 모두 호출하세요.
+- 온도는 섭씨(°C)로 알려 주세요.
+- 도구 결과에 없는 사실은 지어내지 마세요."""
+
+AGENT_PROMPTS = {"full": AGENT_SYSTEM_PROMPT, "compact": AGENT_COMPACT_PROMPT}
+DEFAULT_PROMPT_VARIANT = "compact"
+
+def get_prompt_variant():
+    """TALKTALK_PROMPT=full|compact (기본 compact)"""
+    variant = os.environ.get("TALKTALK_PROMPT", DEFAULT_PROMPT_VARIANT)
+    return variant if variant in AGENT_PROMPTS else DEFAULT_PROMPT_VARIANT
+
+@functools.lru_cache(maxsize=None)
+def get_agent_prompt(variant=DEFAULT_PROMPT_VARIANT):
+    """에이전트 프롬프트 (모든 사용자가 공유하는 불변 객체, 변형별로 하나)"""
+    from langchain_core.prompts import ChatPromptTemplate
+
+    return ChatPromptTemplate.from_messages([
+        ("system", AGENT_PROMPTS[variant]),
+        ("placeholder", "{chat_history}"),
+        ("human", "{input}"),
+        ("placeholder", "{agent_scratchpad}"),
+    ])
+
+def create_ai_agent(api_keys, model_settings=None):
+    """톡톡이 AI 에이전트 생성
+
+    키는 이 에이전트의 클라이언트에만 넘기고 os.environ 은 건드리지 않습니다.
+    (HTTP 연결 풀, 캐시, 프롬프트는 프로세스 전체가 공유)
+    """
+    from langchain.agents import create_tool_calling_agent
+    from agent_executor import create_adaptive_executor
+    from chat_models import RateLimitedChatOpenAI
+
+    model_settings = model_settings or AGENT_MODEL_SETTINGS
+    variant = get_prompt_variant()
+    
+    # LLM 설정 (같은 앞부분의 요청이 같은 캐시로 가도록 prompt_cache_key 지정)
+    llm = RateLimitedChatOpenAI(
+        api_key=api_keys["openai"],
+        model_kwargs={"prompt_cache_key": f"talktalk-agent-{variant}"},
+        **model_settings,
+    )
+    # 번역은 에이전트를 거치지 않고 짧은 프롬프트로 직접 호출
+    translation_llm = RateLimitedChatOpenAI(
+        api_key=api_keys["openai"],
+        **{**model_settings, "temperature": 0, "max_tokens": TRANSLATION_MAX_TOKENS},
+    )
+    translator = Translator(create_translation_backend(translation_llm))
+    
+    # 도구들 생성 (여섯 도구가 이 사용자의 키를 가진 검색 백엔드 하나를 공유)
+    search_backend = create_search_backend(api_keys["serpapi"])
+    tools = [
+        create_weather_tool(search_backend),
+        create_news_tool(search_backend),
+        create_recipe_tool(search_backend),
+        create_stock_tool(search_backend),
+        create_translation_tool(search_backend, translator=translator),
+        create_general_search_tool(search_backend)
+    ]
+    
+    # 에이전트 생성
+    agent = create_tool_calling_agent(llm, tools, get_agent_prompt(variant))
+    # 턴별 반복 예산, 완결된 도구 답변에서 조기 종료, 턴 마감 시간 (agent_policy.py, agent_executor.py)
+    agent_executor = create_adaptive_executor(agent, tools)
+    
+    return agent_executor
+
+class TalkTalkAgent:
+    """캐시 단위: 대화 기록이 연결된 에이전트 + 빠른 의도 라우터"""
+
+    def __init__(self, agent_with_history, router):
+        self.agent_with_history = agent_with_history
+        self.router = router
+
+def build_agent(api_keys, model_settings=None):
+    """대화 기록 에이전트와 라우터 생성"""
+    from langchain_core.runnables.history import RunnableWithMessageHistory
+    from chat_models import RateLimitedChatOpenAI
+    from history import make_llm_summarizer
+
+    agent_executor = create_ai_agent(api_keys, model_settings)
+    # 오래된 턴 요약용 (짧은 출력, 결정적 응답)
+    summarizer = make_llm_summarizer(RateLimitedChatOpenAI(
+        api_key=api_keys["openai"],
+        **{**(model_settings or AGENT_MODEL_SETTINGS), "temperature": 0, "max_tokens": 300},
+    ))
+    agent_with_history = RunnableWithMessageHistory(
+        agent_executor,
+        lambda session_id: get_session_history(session_id, summarizer),
+        input_messages_key="input",
+        history_messages_key="chat_history",
+    )
+    # 라우터는 에이전트와 같은 도구 객체를 공유
+    return TalkTalkAgent(agent_with_history, IntentRouter(agent_executor.tools))
+
+# ⚡ 에이전트 캐시 (턴/요청마다 재생성하지 않도록)
+def make_agent_cache_key(api_keys, model_settings=None):
+    """API 키 원문 대신 해시로 캐시 키 생성"""
+    payload = json.dumps(
+        {"keys": api_keys, "settings": model_settings or AGENT_MODEL_SETTINGS},
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+class AgentCache:
+    """API 키/모델 설정별 에이전트를 보관하는 LRU 캐시"""
+
+    def __init__(self, max_size=8, factory=build_agent):
+        self.max_size = max_size
+        self.factory = factory
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, api_keys, model_settings=None):
+        """캐시된 에이전트 반환 (없으면 생성 후 저장)"""
+        key = make_agent_cache_key(api_keys, model_settings)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+
+        # 생성은 잠금 밖에서 (다른 키의 요청을 막지 않도록)
+        agent = self.factory(api_keys, model_settings)
+        with self._lock:
+            agent = self._entries.setdefault(key, agent)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return agent
+
+    def invalidate(self, api_keys=None, model_settings=None):
+        """특정 키의 에이전트 제거 (api_keys 가 없으면 전체 제거)"""
+        with self._lock:
+            if api_keys is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(make_agent_cache_key(api_keys, model_settings), None)
+
+    def stats(self):
+        with self._lock:
+            return {"size": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+# 프로세스 전역 에이전트 캐시
+_agent_cache = AgentCache(max_size=int(os.environ.get("TALKTALK_AGENT_CACHE_SIZE", 8)))
+
+def get_agent_cache():
+    """프로세스 전역에서 공유되는 에이전트 캐시"""
+    return _agent_cache
+
+def agent_is_broken(error):
+    """에이전트를 다시 만들어야 하는 오류인지 (잘못된 키, 권한 없는 모델)
+
+    요청 한도 초과, 일시적인 네트워크 오류, 연결 끊김은 캐시된 에이전트를 그대로 씁니다.
+    """
+    import openai
+
+    return isinstance(error, (openai.AuthenticationError, openai.PermissionDeniedError, openai.NotFoundError))
+
+# 💬 채팅 기록 관리
+SESSION_ID_PATTERN = re.compile(r"[0-9a-f]{32}")
+MAX_TRACKED_HISTORIES = 1024  # 마지막 턴 토큰 통계를 기억할 세션 수
+
+def new_session_id():
+    return uuid.uuid4().hex
+
+def is_session_id(value):
+    return isinstance(value, str) and SESSION_ID_PATTERN.fullmatch(value) is not None
+
+# 세션별 마지막 대화 기록 객체 (토큰 통계 표시용, 오래 안 쓴 세션부터 버림)
+_histories = OrderedDict()
+_histories_lock = threading.Lock()
+
+def get_session_history(session_id: str, summarizer=None):
+    from history import WindowedChatMessageHistory
+
+    # 매 턴 저장소에서 최근 창만 읽어 옴 (다른 인스턴스가 이어 쓴 대화도 반영)
+    history = WindowedChatMessageHistory(
+        session_id, store=get_history_store(), summarizer=summarizer
+    )
+    with _histories_lock:
+        _histories[session_id] = history
+        _histories.move_to_end(session_id)
+        while len(_histories) > MAX_TRACKED_HISTORIES:
+            _histories.popitem(last=False)
+    return history
+
+def last_history_stats(session_id):
+    """이 세션의 마지막 턴에서 프롬프트에 들어간 대화 기록 토큰 (없으면 None)"""
+    with _histories_lock:
+        history = _histories.get(session_id)
+    if history is None or not history.turn_stats:
+        return None
+    return history.turn_stats[-1]
+
+def delete_session(session_id):
+    """저장된 대화와 통계 삭제"""
+    with _histories_lock:
+        _histories.pop(session_id, None)
+    get_history_store().delete(session_id)
+
+def load_transcript(session_id):
+    """저장된 최근 대화를 화면 표시용 메시지로 변환"""
+    from history import WindowedChatMessageHistory
+
+    history = WindowedChatMessageHistory(session_id, store=get_history_store())
+    return [
+        {"role": "user" if message.type == "human" else "assistant", "content": message.content}
+        for message in history.recent
+        if message.type in ("human", "ai") and message.content
+    ]
+
+# ⚡ 스트리밍 응답
+async def stream_agent_turn(agent_with_history, user_input, session_id, on_update, callbacks=None):
+    """에이전트 이벤트 스트림을 따라가며 on_update(kind, payload) 호출
+
+    kind 는 "token", "tool_start", "tool_end" 중 하나이며,
+    (최종 답변, 첫 토큰까지 걸린 시간(초)) 을 반환합니다.
+    """
+    started = time.perf_counter()
+    ttft = None
+    streamed = []
+    final_output = None
+
+    async for event in agent_with_history.astream_events(
+        {"input": user_input},
+        config={"configurable": {"session_id": session_id}, "callbacks": callbacks or []},
+        version="v2",
+    ):
+        kind = event["event"]
+        if kind == "on_chat_model_stream":
+            token = event["data"]["chunk"].content
+            if isinstance(token, str) and token:
+                if ttft is None:
+                    ttft = time.perf_counter() - started
+                streamed.append(token)
+                on_update("token", token)
+        elif kind == "on_tool_start":
+            on_update("tool_start", {"name": event["name"], "input": event["data"].get("input")})
+        elif kind == "on_tool_end":
+            on_update("tool_end", {"name": event["name"]})
+        elif kind == "on_chain_end" and not event.get("parent_ids"):
+            output = event["data"].get("output")
+            if isinstance(output, dict):
+                final_output = output.get("output")
+
+    if final_output is None:
+        final_output = "".join(streamed)
+    return final_output, ttft
+
+# 🔁 한 턴 처리 (UI 없이)
+DEGRADED_SIMILARITY = 0.85  # 한도 초과 때는 조금 덜 비슷한 질문의 답변도 재사용
+def quick_answer(talktalk, user_input, session_id):
+    """LLM 없이 답할 수 있으면 답변, 아니면 None
+
+    거의 같은 질문의 답변이 있으면 재사용하고,
+    분명한 단일 도구 질문은 라우터가 도구를 바로 호출합니다.
+    """
+    ai_response = semantic_cache.lookup(user_input)
+    if ai_response is None:
+        ai_response = talktalk.router.answer(user_input)
+    if ai_response is not None:
+        from langchain_core.messages import AIMessage, HumanMessage
+
+        get_session_history(session_id).add_messages(
+            [HumanMessage(content=user_input), AIMessage(content=ai_response)]
+        )
+    return ai_response
+
+def degraded_answer(user_input, error):
+    """요청 한도를 넘었을 때의 대체 답변 (비슷한 질문의 지난 답변 또는 안내 문구)"""
+    cached = semantic_cache.lookup(user_input, threshold=DEGRADED_SIMILARITY, allow_stale=True)
+    if cached is not None:
+        return f"{cached}\n\n⏳ 지금은 요청이 많아 이전에 드린 답변을 보여 드려요."
+    return f"⏳ 죄송해요! {error}. 잠시 후 다시 물어봐 주세요."
+
+async def ainvoke_agent(talktalk, user_input, session_id, callbacks=None):
+    # 비동기 경로: 한 단계의 여러 도구 호출을 동시에 실행
+    response = await talktalk.agent_with_history.ainvoke(
+        {"input": user_input},
+        config={"configurable": {"session_id": session_id}, "callbacks": callbacks or []},
+    )
+    return response["output"]
+
+def finish_agent_turn(user_input, ai_response, elapsed, outcome):
+    """에이전트 턴 결과를 라우터 통계와 답변 캐시에 반영
+
+    멈춤/도구 실패나 도구 없이 만든 답변(outcome["incomplete"])은 캐시에 넣지 않고,
+    도구 인자는 답변 캐시가 질문에 없는 지명/종목/언어를 걸러 내는 데 씁니다.
+    """
+    router_stats.record_agent(elapsed)
+    if not outcome.get("incomplete"):
+        tool_inputs = [tool_input_text(action.tool_input) for action, _ in outcome.get("steps", [])]
+        semantic_cache.store(user_input, ai_response, tool_inputs)
+
+async def answer_turn(talktalk, user_input, session_id, callbacks=None, on_update=None):
+    """한 턴 처리, (답변, 처리 경로 "quick" | "agent" | "timeout", 첫 토큰 시간) 반환
+
+    on_update 가 있으면 에이전트 답변을 stream_agent_turn 으로 흘려보냅니다.
+    라우터 도구 호출은 도구 스레드 풀에서 실행해 이벤트 루프를 막지 않습니다.
+    턴 마감 시간(TALKTALK_TURN_DEADLINE)이 지나면 진행 중인 LLM/도구 호출을 취소하고
+    그때까지 끝난 도구 결과(없으면 안내 문구)로 답합니다.
+    """
+    started = time.perf_counter()
+    ai_response = await run_blocking(quick_answer, talktalk, user_input, session_id)
+    if ai_response is not None:
+        return ai_response, "quick", None
+    if on_update is None:
+        agent_turn = ainvoke_agent(talktalk, user_input, session_id, callbacks)
+    else:
+        agent_turn = stream_agent_turn(
+            talktalk.agent_with_history, user_input, session_id, on_update, callbacks
+        )
+    remaining = get_turn_deadline() - (time.perf_counter() - started)
+    with tracking_outcome() as outcome, tool_slots():
+        try:
+            result = await asyncio.wait_for(agent_turn, max(remaining, 0.0))
+        except asyncio.TimeoutError:
+            # 그때까지 끝난 도구 결과로 답하고, 캐시에는 넣지 않음
+            policy_stats.record_exit("deadline")
+            return partial_answer(outcome.get("steps", [])), "timeout", None
+    ai_response, ttft = result if on_update is not None else (result, None)
+    finish_agent_turn(user_input, ai_response, time.perf_counter() - started, outcome)
+    return ai_response, "agent", ttft
+
+async def chat_turn(talktalk, user_input, session_id, on_update=None, tracer=None, user=None):
+    """추적과 요청 한도까지 포함한 한 턴 (Streamlit 과 HTTP API 공통)
+
+    요청 한도는 user(없으면 session_id) 단위로 세고, 한도를 넘으면 대체 답변(경로
+    "degraded")을 돌려줍니다. {"answer", "path", "ttft", "trace"} 반환.
+    """
+    tracer = tracer or TurnTracer()
+    with tracer.activate(), acting_as(user or session_id):
+        try:
+            answer, path, ttft = await answer_turn(
+                talktalk, user_input, session_id, [tracer.callback()], on_update
+            )
+        except QuotaExceeded as error:
+            # 한도 초과는 에이전트 문제가 아니므로 캐시를 지우지 않고 대체 답변
+            answer, path, ttft = degraded_answer(user_input, error), "degraded", None
+    trace = tracer.finish(path, iteration_budget(user_input))
+    policy_stats.record_turn(trace["iterations"])
+    return {"answer": answer, "path": path, "ttft": ttft, "trace": trace}
+
+async def stream_turn(talktalk, user_input, session_id, user=None):
+    """chat_turn 을 (kind, payload) 이벤트로 흘려보내는 비동기 제너레이터
+
+    kind 는 "token", "tool_start", "tool_end" 이고 마지막은 ("done", chat_turn 결과) 입니다.
+    도중에 멈추면(클라이언트 연결 끊김 등) 진행 중인 턴도 취소합니다.
+    """
+    queue = asyncio.Queue()
+    task = asyncio.ensure_future(chat_turn(
+        talktalk, user_input, session_id,
+        on_update=lambda kind, payload: queue.put_nowait((kind, payload)), user=user,
+    ))
+    task.add_done_callback(lambda _: queue.put_nowait(None))
+    try:
+        while (event := await queue.get()) is not None:
+            yield event
+        yield "done", task.result()
+    finally:
+        task.cancel()
@@ -0,0 +1,99 @@
+"""톡톡이 도구 결과 압축
+
+도구 출력은 에이전트 스크래치패드로 들어가 다음 LLM 호출의 입력 토큰이 됩니다.
+모든 도구가 같은 단계를 거쳐 결과를 줄입니다.
+
+- project(): SerpAPI 응답에서 도구마다 필요한 필드만 남김 (캐시에도 이 형태로 저장되어
+  매 호출마다 원본 JSON 을 다시 훑지 않음)
+  - 링크의 추적 파라미터(utm_*, gclid 등) 제거
+  - 거의 같은 스니펫은 하나만 남김
+- budgeted(): 도구 출력을 도구별 토큰 예산으로 자름
+"""
+import functools
+import re
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from tokens import count_tokens, truncate_to_tokens
+
+# 도구별로 쓰는 검색 결과 필드와 개수
+TOOL_FIELDS = {
+    "weather_search": (("snippet",), 1),
+    "stock_search": (("snippet",), 1),
+    "translation_search": (("snippet",), 1),
+    "recipe_search": (("title", "snippet"), 4),  # 제목에 "레시피"가 있는 것만 골라 쓰므로 넉넉히
+    "news_search": (("title", "snippet", "link"), 3),
+    "general_search": (("title", "snippet", "link"), 3),
+}
+DEFAULT_FIELDS = (("title", "snippet", "link"), 3)
+
+# 도구 출력 토큰 예산
+TOOL_TOKEN_BUDGETS = {
+    "weather_search": 200,
+    "stock_search": 200,
+    "translation_search": 300,
+    "recipe_search": 250,
+    "news_search": 300,
+    "general_search": 300,
+}
+DEFAULT_TOKEN_BUDGET = 300
+SNIPPET_SIMILARITY = 0.8  # 글자 3-gram 자카드 유사도가 이 이상이면 같은 스니펫으로 봄
+
+_TRACKING_PARAMS = re.compile(
+    r"^(?:utm_\w+|gclid|fbclid|msclkid|yclid|dclid|igshid|mc_[ce]id|ref|ref_src|ved|usg|ei|sa|sca_esv)$",
+    re.IGNORECASE,
+)
+
+def clean_link(url):
+    """추적 파라미터와 #fragment 를 뺀 링크"""
+    if not url:
+        return url
+    parts = urlsplit(url)
+    query = [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+             if not _TRACKING_PARAMS.match(k)]
+    return urlunsplit((parts.scheme, parts.netloc, parts.path, urlencode(query), ""))
+
+def _shingles(text):
+    text = re.sub(r"\W+", "", text.lower())
+    return {text[i:i + 3] for i in range(max(len(text) - 2, 1))}
+
+def dedupe(results, key="snippet", threshold=SNIPPET_SIMILARITY):
+    """앞선 결과와 거의 같은 스니펫을 가진 결과 제거"""
+    kept, seen = [], []
+    for result in results:
+        shingles = _shingles(result.get(key) or result.get("title") or "")
+        if any(len(shingles & other) / len(shingles | other) >= threshold for other in seen):
+            continue
+        seen.append(shingles)
+        kept.append(result)
+    return kept
+
+def project(tool_name, payload):
+    """SerpAPI 응답 → {"organic_results": [도구가 쓰는 필드만 담은 결과, ...]}
+
+    오류 응답({"error": ...})이나 dict 가 아닌 값은 그대로 돌려줍니다.
+    """
+    if not isinstance(payload, dict) or "error" in payload:
+        return payload
+    fields, limit = TOOL_FIELDS.get(tool_name, DEFAULT_FIELDS)
+    results = []
+    for item in payload.get("organic_results") or ():
+        result = {field: item[field] for field in fields if item.get(field)}
+        if "link" in result:
+            result["link"] = clean_link(result["link"])
+        if result:
+            results.append(result)
+    return {"organic_results": dedupe(results)[:limit]}
+
+def budgeted(tool_name, func):
+    """도구 함수의 출력을 도구별 토큰 예산 안으로 자르는 래퍼"""
+    budget = TOOL_TOKEN_BUDGETS.get(tool_name, DEFAULT_TOKEN_BUDGET)
+
+    @functools.wraps(func)
+    def run(*args, **kwargs):
+        output = func(*args, **kwargs)
+        if not isinstance(output, str) or count_tokens(output) <= budget:
+            return output
+        # 잘린 출력은 더 이상 완결된 답(CompleteAnswer)이 아니므로 일반 문자열로
+        return truncate_to_tokens(output, budget)
+
+    return run
@@ -0,0 +1,186 @@
+"""톡톡이 대화 기록 관리
+
+프롬프트에 들어가는 대화 기록을 토큰 예산 안으로 유지합니다.
+- 최근 N 턴은 그대로 유지
+- 창 밖으로 밀려난 오래된 턴은 요약에 한 번만 합쳐서 재사용
+  (LLM 요약은 응답을 막지 않도록 백그라운드에서, 그동안은 간단 요약으로)
+- 저장소(session_store)가 있으면 메시지를 추가만 하고, 요약되지 않은 최근 창만 읽어 옴
+"""
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from langchain_core.chat_history import BaseChatMessageHistory
+from langchain_core.messages import HumanMessage, SystemMessage, get_buffer_string
+
+from metrics import SUMMARY_TAG, trace_span
+from tokens import count_tokens
+
+HISTORY_MAX_TURNS = 6          # 그대로 유지할 최근 턴 수
+HISTORY_TOKEN_BUDGET = 1500    # 요약 + 최근 턴 토큰 상한
+SUMMARY_MAX_CHARS = 1200
+
+# LLM 요약 전용 스레드 (턴 응답 경로 밖에서 실행)
+_summary_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="talktalk-summary")
+_summary_lock = threading.Lock()
+
+# 🔢 토큰 계산
+def count_message_tokens(messages):
+    # 메시지마다 역할/구분자 오버헤드 약 4 토큰
+    return sum(count_tokens(_content_text(message)) + 4 for message in messages)
+
+def _content_text(message):
+    content = message.content
+    if isinstance(content, str):
+        return content
+    return " ".join(part.get("text", "") if isinstance(part, dict) else str(part) for part in content)
+
+# 📝 요약
+def simple_summarize(previous_summary, messages):
+    """LLM 없이 동작하는 요약 (각 메시지 앞부분만 남김)"""
+    lines = [previous_summary] if previous_summary else []
+    for message in messages:
+        speaker = "사용자" if isinstance(message, HumanMessage) else "톡톡이"
+        lines.append(f"- {speaker}: {_content_text(message)[:80]}")
+    return "\n".join(lines)[-SUMMARY_MAX_CHARS:]
+
+def make_llm_summarizer(llm):
+    """기존 요약 + 새로 밀려난 메시지만 LLM 에 넘기는 점진적 요약기"""
+
+    def summarize(previous_summary, messages):
+        prompt = (
+            "다음은 사용자와 AI 비서 톡톡이의 대화 요약과 이어지는 대화입니다. "
+            "중요한 사실과 사용자의 관심사만 남겨 한국어 5문장 이내로 다시 요약하세요.\n\n"
+            f"[기존 요약]\n{previous_summary or '(없음)'}\n\n"
+            f"[이어지는 대화]\n{get_buffer_string(messages, human_prefix='사용자', ai_prefix='톡톡이')}"
+        )
+        try:
+            # 태그로 구분해 턴 추적에서 에이전트 반복 횟수에 세지 않음
+            return llm.invoke(prompt, config={"tags": [SUMMARY_TAG]}).content[:SUMMARY_MAX_CHARS]
+        except Exception:
+            return simple_summarize(previous_summary, messages)
+
+    return summarize
+
+# 💬 토큰 예산 대화 기록
+class WindowedChatMessageHistory(BaseChatMessageHistory):
+    """최근 턴 + 누적 요약만 프롬프트에 넣는 대화 기록"""
+
+    def __init__(self, session_id=None, store=None, max_turns=HISTORY_MAX_TURNS,
+                 token_budget=HISTORY_TOKEN_BUDGET, summarizer=None):
+        self.session_id = session_id
+        self.store = store
+        self.max_turns = max_turns
+        self.token_budget = token_budget
+        self.summarizer = summarizer
+        self.summary = ""
+        self.summarized_count = 0  # 요약에 합쳐진 메시지 수
+        self.recent = []
+        self.total_tokens = 0  # 창 없이 전부 보냈을 때의 토큰 수
+        self.turn_stats = []
+        self._loaded = store is None
+
+    @property
+    def messages(self):
+        self._load()
+        if not self.summary:
+            return list(self.recent)
+        return [SystemMessage(content=f"이전 대화 요약:\n{self.summary}")] + self.recent
+
+    def add_messages(self, messages):
+        self._load()
+        added = []
+        for message in messages:
+            self.total_tokens += count_message_tokens([message])
+            added.append(message)
+        self.recent.extend(added)
+        if self.store is not None:
+            self.store.append(self.session_id, added)
+        self._compact()
+        self._save_state()
+        self.turn_stats.append(self.stats())
+
+    def _save_state(self):
+        if self.store is not None:
+            self.store.set_state(self.session_id, {
+                "summary": self.summary,
+                "summarized_count": self.summarized_count,
+                "total_tokens": self.total_tokens,
+            })
+
+    def clear(self):
+        self.summary = ""
+        self.summarized_count = 0
+        self.recent = []
+        self.total_tokens = 0
+        self.turn_stats = []
+        if self.store is not None:
+            self.store.delete(self.session_id)
+
+    def _load(self):
+        # 처음 필요할 때 요약 상태와 요약되지 않은 최근 메시지만 읽어 옴
+        if self._loaded:
+            return
+        self._loaded = True
+        with trace_span("history_load"):
+            state = self.store.get_state(self.session_id)
+            self.summary = state.get("summary", "")
+            self.summarized_count = state.get("summarized_count", 0)
+            self.total_tokens = state.get("total_tokens", 0)
+            self.recent = self.store.load(self.session_id, start=self.summarized_count)
+
+    def stats(self):
+        prompt_tokens = count_message_tokens(self.messages)
+        return {
+            "prompt_tokens": prompt_tokens,
+            "full_tokens": self.total_tokens,
+            "saved_tokens": max(0, self.total_tokens - prompt_tokens),
+            "recent_messages": len(self.recent),
+        }
+
+    def _turn_starts(self):
+        return [i for i, message in enumerate(self.recent) if isinstance(message, HumanMessage)]
+
+    def _compact(self):
+        evicted = []
+        while True:
+            starts = self._turn_starts()
+            over_turns = len(starts) > self.max_turns
+            over_budget = (
+                count_message_tokens(self.recent) + count_tokens(self.summary) > self.token_budget
+            )
+            # 마지막 한 턴은 예산을 넘어도 남겨 둠
+            if len(starts) <= 1 or not (over_turns or over_budget):
+                break
+            evicted.extend(self.recent[:starts[1]])
+            self.recent = self.recent[starts[1]:]
+            self.summarized_count += starts[1]
+
+        if not evicted:
+            return
+        previous = self.summary
+        # 프롬프트에는 바로 간단 요약을 쓰고, LLM 요약은 끝나는 대로 바꿔 넣음
+        self.summary = simple_summarize(previous, evicted)
+        if self.summarizer is not None:
+            context = contextvars.copy_context()  # 요청 한도를 같은 사용자로 세도록
+            _summary_executor.submit(
+                context.run, self._summarize_later, previous, evicted, self.summarized_count
+            )
+
+    def _summarize_later(self, previous, evicted, summarized_count):
+        if self._superseded(summarized_count):
+            return
+        summary = self.summarizer(previous, evicted)
+        with _summary_lock:
+            if self._superseded(summarized_count):
+                return
+            self.summary = summary
+            self._save_state()
+
+    def _superseded(self, summarized_count):
+        # 그사이 더 요약된 기록(다음 턴)이 있으면 오래된 요약으로 덮어쓰지 않음
+        if self.summarized_count != summarized_count:
+            return True
+        if self.store is None:
+            return False
+        return self.store.get_state(self.session_id).get("summarized_count", 0) != summarized_count
@@ -0,0 +1,386 @@
+"""톡톡이 턴 추적과 지표
+
+- TurnTracer: 턴 하나의 구간(span)을 기록. tracer.callback() 을 AgentExecutor/도구에
+  콜백으로 붙임
+  (LLM 호출 시간과 토큰, 도구 이름과 지연, 검색 캐시 적중, 에이전트 반복 횟수,
+  대화 기록 로드, 화면 렌더링)
+- 프로세스 전역 지표를 Prometheus 텍스트 형식으로 내보냄
+  (TALKTALK_METRICS_PORT 를 설정하면 http://0.0.0.0:<port>/metrics 로 제공)
+"""
+import contextvars
+import functools
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from tokens import count_tokens
+
+AGENT_MAX_ITERATIONS = 3
+SUMMARY_TAG = "history_summary"  # 대화 기록 요약용 LLM 호출
+TRANSLATION_TAG = "translation"   # 번역 도구 안의 LLM 호출
+# 이 태그가 붙은 LLM 호출은 에이전트 반복으로 세지 않음
+AUXILIARY_LLM_TAGS = (SUMMARY_TAG, TRANSLATION_TAG)
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 30)
+
+# 📊 지표 저장소
+class _Metric:
+    def __init__(self, name, help_text, kind):
+        self.name = name
+        self.help = help_text
+        self.kind = kind
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _labels(labels):
+        if not labels:
+            return ""
+        return "{" + ",".join(f'{k}="{v}"' for k, v in sorted(labels.items())) + "}"
+
+class Counter(_Metric):
+    def __init__(self, name, help_text):
+        super().__init__(name, help_text, "counter")
+        self._values = {}
+
+    def inc(self, amount=1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(tuple(sorted(labels.items())), 0)
+
+    def render(self):
+        with self._lock:
+            return [f"{self.name}{self._labels(dict(k))} {v}" for k, v in self._values.items()]
+
+class Gauge(_Metric):
+    def __init__(self, name, help_text):
+        super().__init__(name, help_text, "gauge")
+        self._values = {}
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[tuple(sorted(labels.items()))] = value
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(tuple(sorted(labels.items())), 0)
+
+    def render(self):
+        with self._lock:
+            return [f"{self.name}{self._labels(dict(k))} {v}" for k, v in self._values.items()]
+
+class Histogram(_Metric):
+    def __init__(self, name, help_text, buckets=LATENCY_BUCKETS):
+        super().__init__(name, help_text, "histogram")
+        self.buckets = buckets
+        self._values = {}  # labels -> [버킷별 개수..., 합계, 개수]
+
+    def observe(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            data = self._values.setdefault(key, [0] * len(self.buckets) + [0.0, 0])
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    data[i] += 1
+            data[-2] += value
+            data[-1] += 1
+
+    def render(self):
+        lines = []
+        with self._lock:
+            for key, data in self._values.items():
+                labels = dict(key)
+                for bound, count in zip(self.buckets, data):
+                    lines.append(f"{self.name}_bucket{self._labels({**labels, 'le': bound})} {count}")
+                lines.append(f"{self.name}_bucket{self._labels({**labels, 'le': '+Inf'})} {data[-1]}")
+                lines.append(f"{self.name}_sum{self._labels(labels)} {data[-2]:.6f}")
+                lines.append(f"{self.name}_count{self._labels(labels)} {data[-1]}")
+        return lines
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+        self._lock = threading.Lock()
+
+    def counter(self, name, help_text):
+        return self._add(Counter(name, help_text))
+
+    def gauge(self, name, help_text):
+        return self._add(Gauge(name, help_text))
+
+    def histogram(self, name, help_text, buckets=LATENCY_BUCKETS):
+        return self._add(Histogram(name, help_text, buckets))
+
+    def _add(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        with self._lock:
+            metrics = list(self._metrics)
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+registry = Registry()
+TURNS = registry.counter("talktalk_turns_total", "처리한 턴 수 (경로별)")
+TURN_SECONDS = registry.histogram("talktalk_turn_seconds", "턴 처리 시간")
+LLM_SECONDS = registry.histogram("talktalk_llm_seconds", "LLM 호출 시간")
+LLM_TOKENS = registry.counter("talktalk_llm_tokens_total", "LLM 토큰 수 (prompt/completion)")
+TOOL_SECONDS = registry.histogram("talktalk_tool_seconds", "도구 호출 시간")
+TOOL_CALLS = registry.counter("talktalk_tool_calls_total", "도구 호출 수 (도구/결과별)")
+CACHE_LOOKUPS = registry.counter("talktalk_tool_cache_total", "검색 캐시 조회 수 (적중/미스)")
+AGENT_ITERATIONS = registry.histogram(
+    "talktalk_agent_iterations", "턴당 에이전트 반복 횟수", buckets=(0, 1, 2, 3, 4)
+)
+ITERATION_LIMIT_HITS = registry.counter(
+    "talktalk_agent_iteration_limit_total", "그 턴의 반복 예산을 다 쓴 턴 수"
+)
+AGENT_EARLY_EXIT = registry.counter(
+    "talktalk_agent_early_exit_total", "LLM 을 더 부르지 않고 끝낸 턴 수 (complete: 완결된 도구 답변, stopped: 예산/마감)"
+)
+TOOL_UPSTREAM = registry.counter(
+    "talktalk_tool_upstream_total", "캐시 미스 검색 수 (upstream: 실제 호출, shared: 합쳐져 절약)"
+)
+SEARCH_REQUESTS = registry.counter("talktalk_search_requests_total", "검색 HTTP 요청 수 (결과별)")
+SEARCH_SECONDS = registry.histogram("talktalk_search_seconds", "검색 HTTP 요청 시간")
+SCRATCHPAD_TOKENS = registry.histogram(
+    "talktalk_scratchpad_tokens", "턴당 에이전트 스크래치패드에 들어간 도구 출력 토큰 수",
+    buckets=(100, 250, 500, 1000, 2000, 4000),
+)
+SPAN_SECONDS = registry.histogram("talktalk_span_seconds", "기타 구간 시간 (대화 기록, 렌더링)")
+RATE_LIMIT = registry.counter(
+    "talktalk_rate_limit_total", "요청 한도 판정 수 (자원/결과별: admitted, queued, rejected)"
+)
+RATE_LIMIT_WAIT = registry.histogram("talktalk_rate_limit_wait_seconds", "요청 한도 대기 시간")
+QUOTA_USED = registry.gauge("talktalk_quota_used", "현재 할당량 기간에 쓴 호출 수 (자원별)")
+IN_FLIGHT = registry.gauge("talktalk_in_flight", "진행 중인 호출 수 (자원별)")
+
+# 🧵 턴 추적
+_current_tracer = contextvars.ContextVar("talktalk_tracer", default=None)
+
+class TurnTracer:
+    """턴 하나의 구간을 기록 (LangChain 콜백은 callback())"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.spans = []
+        self.cache_events = []
+        self._open = {}
+        self._lock = threading.Lock()
+
+    # LLM
+    def on_chat_model_start(self, serialized, messages, *, run_id, tags=None, **kwargs):
+        tag = next((t for t in tags or () if t in AUXILIARY_LLM_TAGS), None)
+        if tag is not None:
+            self._open[run_id] = ("aux", tag, time.perf_counter())
+        else:
+            self._open[run_id] = ("llm", kwargs.get("name") or "llm", time.perf_counter())
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        span = self._close(run_id)
+        if span is None:
+            return
+        prompt = completion = cached = 0
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+                prompt += usage.get("input_tokens", 0)
+                completion += usage.get("output_tokens", 0)
+                # 프롬프트 캐시에서 읽은 입력 토큰 (앞부분이 같은 이전 요청이 있었을 때)
+                cached += (usage.get("input_token_details") or {}).get("cache_read", 0) or 0
+        span.update(prompt_tokens=prompt, completion_tokens=completion, cached_tokens=cached)
+        LLM_SECONDS.observe(span["duration"], kind=span["kind"])
+        LLM_TOKENS.inc(prompt, kind=span["kind"], type="prompt")
+        LLM_TOKENS.inc(completion, kind=span["kind"], type="completion")
+        LLM_TOKENS.inc(cached, kind=span["kind"], type="cached")
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        span = self._close(run_id)
+        if span is not None:
+            span["error"] = str(error)
+
+    # 도구
+    def on_tool_start(self, serialized, input_str, *, run_id, **kwargs):
+        name = kwargs.get("name") or (serialized or {}).get("name", "tool")
+        self._open[run_id] = ("tool", name, time.perf_counter())
+
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        span = self._close(run_id)
+        if span is not None:
+            span["tokens"] = count_tokens(str(getattr(output, "content", output)))
+            TOOL_SECONDS.observe(span["duration"], tool=span["name"])
+            TOOL_CALLS.inc(tool=span["name"], status="ok")
+
+    def on_tool_error(self, error, *, run_id, **kwargs):
+        span = self._close(run_id)
+        if span is not None:
+            span["error"] = str(error)
+            TOOL_CALLS.inc(tool=span["name"], status="error")
+
+    def _close(self, run_id):
+        opened = self._open.pop(run_id, None)
+        if opened is None:
+            return None
+        kind, name, started = opened
+        span = {
+            "kind": kind,
+            "name": name,
+            "start": started - self.started,
+            "duration": time.perf_counter() - started,
+        }
+        with self._lock:
+            self.spans.append(span)
+        return span
+
+    def callback(self):
+        """이 추적기에 기록하는 LangChain 콜백"""
+        return _callback_class()(self)
+
+    # 기타 구간 / 캐시
+    @contextmanager
+    def span(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            duration = time.perf_counter() - started
+            with self._lock:
+                self.spans.append({"kind": "span", "name": name,
+                                   "start": started - self.started, "duration": duration})
+            SPAN_SECONDS.observe(duration, span=name)
+
+    def record_cache(self, tool_name, hit):
+        with self._lock:
+            self.cache_events.append((tool_name, hit))
+
+    @contextmanager
+    def activate(self):
+        """이 턴 동안 record_cache()/trace_span() 이 이 추적기에 기록되도록 설정"""
+        token = _current_tracer.set(self)
+        try:
+            yield self
+        finally:
+            _current_tracer.reset(token)
+
+    def finish(self, path, max_iterations=AGENT_MAX_ITERATIONS):
+        """턴 종료: 전역 지표에 반영하고 요약 반환 (max_iterations 는 그 턴의 반복 예산)"""
+        total = time.perf_counter() - self.started
+        with self._lock:
+            spans = list(self.spans)
+            cache_events = list(self.cache_events)
+        llm_spans = [s for s in spans if s["kind"] == "llm"]
+        iterations = len(llm_spans)
+        TURNS.inc(path=path)
+        TURN_SECONDS.observe(total, path=path)
+        scratchpad_tokens = sum(s.get("tokens", 0) for s in spans if s["kind"] == "tool")
+        if path == "agent":
+            SCRATCHPAD_TOKENS.observe(scratchpad_tokens)
+            AGENT_ITERATIONS.observe(iterations)
+            if iterations >= max_iterations:
+                ITERATION_LIMIT_HITS.inc()
+        return {
+            "path": path,
+            "total": total,
+            "iterations": iterations,
+            "max_iterations": max_iterations,
+            "llm_seconds": sum(s["duration"] for s in llm_spans),
+            "prompt_tokens": sum(s.get("prompt_tokens", 0) for s in llm_spans),
+            "completion_tokens": sum(s.get("completion_tokens", 0) for s in llm_spans),
+            "cached_tokens": sum(s.get("cached_tokens", 0) for s in llm_spans),
+            "scratchpad_tokens": scratchpad_tokens,
+            "tools": [(s["name"], s["duration"]) for s in spans if s["kind"] == "tool"],
+            "spans": {s["name"]: s["duration"] for s in spans if s["kind"] in ("span", "aux")},
+            "cache_hits": sum(1 for _, hit in cache_events if hit),
+            "cache_lookups": len(cache_events),
+        }
+
+@functools.lru_cache(maxsize=None)
+def _callback_class():
+    from langchain_core.callbacks import BaseCallbackHandler
+
+    class TurnTracerCallback(BaseCallbackHandler):
+        """LLM/도구 이벤트를 TurnTracer 로 넘기는 콜백"""
+
+        run_inline = True
+
+        def __init__(self, tracer):
+            self.tracer = tracer
+
+        def on_chat_model_start(self, *args, **kwargs):
+            self.tracer.on_chat_model_start(*args, **kwargs)
+
+        def on_llm_end(self, *args, **kwargs):
+            self.tracer.on_llm_end(*args, **kwargs)
+
+        def on_llm_error(self, *args, **kwargs):
+            self.tracer.on_llm_error(*args, **kwargs)
+
+        def on_tool_start(self, *args, **kwargs):
+            self.tracer.on_tool_start(*args, **kwargs)
+
+        def on_tool_end(self, *args, **kwargs):
+            self.tracer.on_tool_end(*args, **kwargs)
+
+        def on_tool_error(self, *args, **kwargs):
+            self.tracer.on_tool_error(*args, **kwargs)
+
+    return TurnTracerCallback
+
+def record_cache(tool_name, hit):
+    """검색 캐시 조회 결과 기록 (전역 지표 + 현재 턴 추적기)"""
+    CACHE_LOOKUPS.inc(tool=tool_name, result="hit" if hit else "miss")
+    tracer = _current_tracer.get()
+    if tracer is not None:
+        tracer.record_cache(tool_name, hit)
+
+@contextmanager
+def trace_span(name):
+    """현재 턴 추적기가 있으면 구간으로 기록"""
+    tracer = _current_tracer.get()
+    if tracer is None:
+        yield
+        return
+    with tracer.span(name):
+        yield
+
+# 🌐 Prometheus 엔드포인트
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_response(404)
+            self.end_headers()
+            return
+        body = registry.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+_server = None
+_server_lock = threading.Lock()
+
+def start_metrics_server(port=None):
+    """/metrics 엔드포인트를 한 번만 시작 (포트가 없으면 아무것도 하지 않음)"""
+    global _server
+    port = port or os.environ.get("TALKTALK_METRICS_PORT")
+    if not port:
+        return None
+    with _server_lock:
+        if _server is None:
+            _server = ThreadingHTTPServer(("0.0.0.0", int(port)), _MetricsHandler)
+            _server.daemon_threads = True
+            threading.Thread(target=_server.serve_forever, daemon=True).start()
+        return _server
@@ -0,0 +1,218 @@
+"""톡톡이 인기 질의 미리 가져오기
+
+아침 시간대 질문은 대부분 예측 가능합니다 (주요 도시 날씨, 주요 뉴스, 인기 종목).
+백그라운드 스레드가 이런 질의를 캐시 유효 시간이 끝나기 전에 다시 가져와,
+첫 사용자도 캐시 적중으로 답을 받게 합니다.
+
+- 질의 목록 = 설정된 기본 질의 + 실제 사용자 질의에서 배운 인기 질의 (시간이 지나면 점수 감소)
+- 날씨/주식은 목록 전체를 한 번의 도구 호출(묶음 조회)로, 뉴스는 주제별로 가져옴
+- 한 시간당 외부 요청(검색, 날씨, 시세) 예산을 넘지 않음: 호출 전에 최대 요청 수(묶음은
+  이름마다 하나 + 묶음 조회 하나)를 잡아 두고, 끝나면 실제로 보낸 요청 수만 남김
+- 사용자 질의 중 미리 가져온 질의의 비율(적중률)을 로그로 남김
+
+스레드는 프로세스에 하나만 돌며 Streamlit rerun 과 무관하게 유지됩니다.
+서버의 SerpAPI 키로 검색 예산을 쓰므로 TALKTALK_PREFETCH=1 일 때만 켜지고 (TALKTALK_WARMUP
+과 같은 방식), 예산은 TALKTALK_PREFETCH_BUDGET 로 바꿉니다.
+"""
+import logging
+import os
+import threading
+import time
+from collections import deque
+
+from tool_cache import TOOL_TTLS, is_refreshing, normalize_query, refreshing
+
+logger = logging.getLogger("talktalk.prefetch")
+
+# 도구별 기본 질의와 묶음 조회 여부
+PREFETCH_TOOLS = {
+    "weather_search": {"seeds": ("서울", "부산", "대구", "인천", "광주광역시", "대전", "제주"), "batch": True},
+    "news_search": {"seeds": ("경제", "IT"), "batch": False},
+    "stock_search": {"seeds": ("삼성전자", "SK하이닉스", "코스피", "코스닥"), "batch": True},
+}
+PREFETCH_BUDGET_PER_HOUR = 120  # 한 시간에 쓸 수 있는 미리 가져오기 외부 요청 수
+PREFETCH_MAX_LEARNED = 5        # 도구별로 함께 가져올 배운 질의 수
+PREFETCH_MIN_SCORE = 2.0        # 배운 질의로 인정할 최소 점수
+PREFETCH_DECAY = 0.8            # 새로 고칠 때마다 점수에 곱함
+PREFETCH_REFRESH_RATIO = 0.8    # 캐시 TTL 의 80% 가 지나면 다시 가져옴
+PREFETCH_TICK = 5.0             # 일정 확인 주기 (초)
+PREFETCH_BUDGET_RETRY = 60.0    # 예산이 없을 때 다시 시도할 때까지 (초)
+
+class HotQueries:
+    """사용자 질의 빈도 (지수 감소 점수)"""
+
+    def __init__(self, decay=PREFETCH_DECAY):
+        self.decay = decay
+        self._scores = {}  # 도구 -> {정규화 질의: [점수, 원래 질의]}
+        self._lock = threading.Lock()
+
+    def record(self, tool_name, query):
+        key = normalize_query(query)
+        if not key:
+            return
+        with self._lock:
+            entry = self._scores.setdefault(tool_name, {}).setdefault(key, [0.0, query])
+            entry[0] += 1
+
+    def top(self, tool_name, limit=PREFETCH_MAX_LEARNED, min_score=PREFETCH_MIN_SCORE):
+        with self._lock:
+            entries = sorted(self._scores.get(tool_name, {}).values(), key=lambda e: -e[0])
+        return [query for score, query in entries[:limit] if score >= min_score]
+
+    def decay_all(self, tool_name):
+        with self._lock:
+            scores = self._scores.get(tool_name, {})
+            for key in list(scores):
+                scores[key][0] *= self.decay
+                if scores[key][0] < 0.1:
+                    del scores[key]
+
+class Prefetcher:
+    """인기 질의를 주기적으로 다시 가져오는 백그라운드 스레드"""
+
+    def __init__(self, config=PREFETCH_TOOLS, budget_per_hour=None, hot=None, tick=PREFETCH_TICK):
+        self.config = config
+        self.budget_per_hour = budget_per_hour or int(
+            os.environ.get("TALKTALK_PREFETCH_BUDGET", PREFETCH_BUDGET_PER_HOUR)
+        )
+        self.hot = hot if hot is not None else HotQueries()
+        self.tick = tick
+        self.refreshed = 0     # 실행한 도구 호출 수
+        self.requests = 0      # 그 호출들이 보낸 외부 요청 수
+        self.over_budget = 0   # 예산 때문에 건너뛴 호출 수
+        self.hits = 0          # 미리 가져온 질의와 같았던 사용자 질의 수
+        self.lookups = 0       # 관찰한 사용자 질의 수
+        self._tools = {}
+        self._next_due = {}
+        self._warm = {}        # 도구 -> 미리 가져온 정규화 질의
+        self._calls = deque()  # 최근 한 시간 동안의 외부 요청 시각
+        self._thread = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    def attach(self, tools):
+        """미리 가져올 때 쓸 도구"""
+        with self._lock:
+            self._tools = {tool.name: tool for tool in tools if tool.name in self.config}
+
+    def observe(self, tool_name, query):
+        """사용자 도구 호출 기록 (미리 가져오기 자신의 호출은 무시)"""
+        if tool_name not in self.config or is_refreshing():
+            return
+        self.hot.record(tool_name, query)
+        with self._lock:
+            self.lookups += 1
+            if normalize_query(query) in self._warm.get(tool_name, ()):
+                self.hits += 1
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name="talktalk-prefetch", daemon=True)
+                self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            thread.join()
+
+    def run_once(self, now=None):
+        """때가 된 도구를 새로 고침, 이번에 실행한 호출 수 반환"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            tools = dict(self._tools)
+        spent = 0
+        for tool_name, tool in tools.items():
+            if self._next_due.get(tool_name, 0.0) > now:
+                continue
+            queries = list(dict.fromkeys(self.config[tool_name]["seeds"] + tuple(self.hot.top(tool_name))))
+            batched = self.config[tool_name]["batch"]
+            batches = [", ".join(queries)] if batched else queries
+            # 묶음 조회가 실패하면 이름마다 검색하므로 그만큼 잡아 둠
+            reserve = len(queries) + 1 if batched else 1
+            done, requests = [], 0
+            for batch in batches:
+                if not self._spend(now, reserve):
+                    self.over_budget += len(batches) - len(done)
+                    break
+                with refreshing() as refresh:
+                    tool.func(batch)
+                self._settle(now, reserve, refresh["requests"])
+                requests += refresh["requests"]
+                done.append(batch)
+            if not done:
+                # 예산 소진: 이전에 가져온 값은 그대로 두고 잠시 뒤 다시 시도
+                self._next_due[tool_name] = now + PREFETCH_BUDGET_RETRY
+                continue
+            spent += len(done)
+            self.refreshed += len(done)
+            self.requests += requests
+            self._next_due[tool_name] = now + TOOL_TTLS.get(tool_name, 300) * PREFETCH_REFRESH_RATIO
+            self.hot.decay_all(tool_name)
+            warm = queries if batched else done
+            with self._lock:
+                self._warm[tool_name] = {normalize_query(q) for q in warm}
+            stats = self.stats()
+            logger.info(
+                "prefetch %s: %d queries in %d calls (%d requests), hit rate %.0f%% (%d/%d), "
+                "budget %d/%d per hour",
+                tool_name, len(queries), len(done), requests, stats["hit_rate"] * 100,
+                stats["hits"], stats["lookups"], stats["budget_used"], self.budget_per_hour,
+            )
+        return spent
+
+    def stats(self):
+        with self._lock:
+            return {
+                "refreshed": self.refreshed,
+                "requests": self.requests,
+                "over_budget": self.over_budget,
+                "hits": self.hits,
+                "lookups": self.lookups,
+                "hit_rate": self.hits / self.lookups if self.lookups else 0.0,
+                "budget_used": len(self._calls),
+                "running": self._thread is not None,
+            }
+
+    def _spend(self, now, count):
+        """예산에서 요청 count 개를 잡아 둠 (남은 예산이 모자라면 False)"""
+        with self._lock:
+            while self._calls and self._calls[0] <= now - 3600:
+                self._calls.popleft()
+            if len(self._calls) + count > self.budget_per_hour:
+                return False
+            self._calls.extend([now] * count)
+            return True
+
+    def _settle(self, now, reserved, used):
+        # 잡아 둔 요청 수를 실제로 보낸 수로 맞춤
+        with self._lock:
+            for _ in range(reserved - used):
+                self._calls.pop()
+            self._calls.extend([now] * (used - reserved))
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception:
+                logger.exception("prefetch failed")
+            self._stop.wait(self.tick)
+
+# 프로세스 전역 인스턴스
+prefetcher = Prefetcher()
+
+def start_prefetcher(make_tools):
+    """TALKTALK_PREFETCH=1 이면 미리 가져오기 스레드 시작 (프로세스당 한 번)
+
+    make_tools 는 미리 가져오기에 쓸 도구 목록을 만드는 함수로, 처음 시작할 때만 호출됩니다.
+    """
+    if os.environ.get("TALKTALK_PREFETCH", "0") != "1":
+        return None
+    if not prefetcher.stats()["running"]:
+        prefetcher.attach(make_tools())
+    return prefetcher.start()
@@ -0,0 +1,311 @@
+"""톡톡이 요청 한도와 할당량
+
+OpenAI/SerpAPI 호출 앞에서 요청을 받아들일지 정합니다.
+
+- 전역 토큰 버킷 + 사용자별 토큰 버킷 (초당 요청 수 rate, 순간 최대치 burst)
+- 동시 호출 수 상한 (concurrency)
+- 할당량: 기간(period 초) 동안의 전체/사용자별 호출 수 상한 (quota, user_quota, 0 이면 없음)
+- 자리가 없으면 max_wait 초까지 줄을 서서 기다리고 (줄 길이는 queue 까지),
+  그래도 안 되면 QuotaExceeded
+
+사용자는 턴마다 acting_as(session_id) 로 정해지며 도구 스레드까지 전달됩니다.
+설정은 TALKTALK_LIMIT_OPENAI / TALKTALK_LIMIT_SERPAPI 에 "rate=5,burst=10,quota=1000"
+형식으로 덮어씁니다. TALKTALK_RATE_LIMIT=0 이면 막지 않고 사용량만 셉니다.
+할당량은 프로세스 안에서만 셉니다.
+"""
+import asyncio
+import contextvars
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager, contextmanager
+
+from metrics import IN_FLIGHT, QUOTA_USED, RATE_LIMIT, RATE_LIMIT_WAIT
+
+DEFAULT_LIMITS = {
+    "openai": {
+        "rate": 8, "burst": 16, "user_rate": 0.5, "user_burst": 8,
+        "concurrency": 16, "max_wait": 10, "queue": 64,
+        "quota": 0, "user_quota": 0, "period": 24 * 60 * 60,
+    },
+    "serpapi": {
+        "rate": 5, "burst": 10, "user_rate": 0.5, "user_burst": 10,
+        "concurrency": 8, "max_wait": 5, "queue": 64,
+        "quota": 0, "user_quota": 0, "period": 30 * 24 * 60 * 60,  # SerpAPI 는 월 단위 할당량
+    },
+}
+RESOURCE_NAMES = {"openai": "AI 응답", "serpapi": "검색"}
+MAX_TRACKED_USERS = 10000
+CONCURRENCY_POLL = 0.05  # 동시 호출 자리가 날 때까지 다시 확인하는 간격 (초)
+
+# 👤 현재 사용자 (턴마다 설정, 도구 스레드에도 전달됨)
+_current_user = contextvars.ContextVar("talktalk_user", default=None)
+
+@contextmanager
+def acting_as(user):
+    token = _current_user.set(user)
+    try:
+        yield
+    finally:
+        _current_user.reset(token)
+
+def current_user():
+    return _current_user.get()
+
+class QuotaExceeded(Exception):
+    """한도/할당량 때문에 호출을 받아들이지 못함"""
+
+    def __init__(self, resource, reason, retry_after=None, user=None):
+        self.resource = resource
+        self.reason = reason            # rate, user_rate, concurrency, queue, quota, user_quota
+        self.retry_after = retry_after  # 다시 시도할 수 있을 때까지 (초, 알 수 없으면 None)
+        self.user = user if reason.startswith("user_") else None
+        name = RESOURCE_NAMES.get(resource, resource)
+        if reason in ("quota", "user_quota"):
+            message = f"{name} 할당량을 모두 썼어요"
+        else:
+            message = f"{name} 요청이 많아 잠시 멈췄어요"
+        if retry_after:
+            message += f" (약 {_duration(retry_after)} 후 다시 가능)"
+        super().__init__(message)
+
+def _duration(seconds):
+    if seconds < 60:
+        return f"{max(seconds, 1):.0f}초"
+    if seconds < 60 * 60:
+        return f"{seconds / 60:.0f}분"
+    return f"{seconds / 3600:.0f}시간"
+
+class TokenBucket:
+    """초당 rate 개씩 채워지고 capacity 개까지 쌓이는 토큰 (잠금은 호출하는 쪽에서)"""
+
+    def __init__(self, rate, capacity, now):
+        self.rate = rate
+        self.capacity = max(capacity, 1)
+        self.tokens = float(self.capacity)
+        self.updated = now
+
+    def wait_time(self, now):
+        """토큰 하나가 생길 때까지 남은 시간 (있으면 0)"""
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self):
+        self.tokens -= 1
+
+class RateLimiter:
+    """자원 하나(OpenAI, SerpAPI)의 전역/사용자별 한도"""
+
+    def __init__(self, resource, rate=0, burst=0, user_rate=0, user_burst=0, concurrency=0,
+                 max_wait=0, queue=0, quota=0, user_quota=0, period=24 * 60 * 60,
+                 enabled=True, clock=time.monotonic):
+        self.resource = resource
+        self.user_rate = user_rate
+        self.user_burst = user_burst or user_rate
+        self.concurrency = int(concurrency)
+        self.max_wait = max_wait
+        self.queue = int(queue)
+        self.quota = int(quota)
+        self.user_quota = int(user_quota)
+        self.period = period
+        self.enabled = enabled
+        self.clock = clock
+        now = clock()
+        self._global = TokenBucket(rate, burst or rate, now) if rate else None
+        self._users = OrderedDict()  # 사용자 -> TokenBucket (오래 안 쓴 사용자부터 버림)
+        self._used = 0
+        self._user_used = {}
+        self._period_start = now
+        self._in_flight = 0
+        self._waiting = 0
+        self.admitted = 0
+        self.queued = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    # 판정
+    def _admit(self, user, now):
+        """(0, None) 이면 받아들임, 아니면 (기다릴 시간 또는 None(할당량 초과), 사유)"""
+        if now - self._period_start >= self.period:
+            self._period_start = now
+            self._used = 0
+            self._user_used.clear()
+        if self.enabled:
+            if self.quota and self._used >= self.quota:
+                return None, "quota"
+            if user is not None and self.user_quota and self._user_used.get(user, 0) >= self.user_quota:
+                return None, "user_quota"
+            waits = []
+            if self.concurrency and self._in_flight >= self.concurrency:
+                waits.append((CONCURRENCY_POLL, "concurrency"))
+            if self._global is not None:
+                waits.append((self._global.wait_time(now), "rate"))
+            bucket = self._user_bucket(user, now)
+            if bucket is not None:
+                waits.append((bucket.wait_time(now), "user_rate"))
+            wait, reason = max(waits, default=(0.0, None))
+            if wait > 0:
+                return wait, reason
+            if self._global is not None:
+                self._global.take()
+            if bucket is not None:
+                bucket.take()
+        self._in_flight += 1
+        self._used += 1
+        if user is not None:
+            self._user_used[user] = self._user_used.get(user, 0) + 1
+        return 0.0, None
+
+    def _user_bucket(self, user, now):
+        if user is None or not self.user_rate:
+            return None
+        bucket = self._users.get(user)
+        if bucket is None:
+            bucket = self._users[user] = TokenBucket(self.user_rate, self.user_burst, now)
+            while len(self._users) > MAX_TRACKED_USERS:
+                self._users.popitem(last=False)
+        self._users.move_to_end(user)
+        return bucket
+
+    def _try(self, user, started, queued):
+        """한 번 판정: 받아들이면 None, 기다려야 하면 대기 시간, 아니면 QuotaExceeded"""
+        now = self.clock()
+        with self._lock:
+            wait, reason = self._admit(user, now)
+            if wait == 0:
+                self.admitted += 1
+                self._publish()
+            else:
+                remaining = started + self.max_wait - now
+                # 줄이 꽉 찼거나, 할당량 초과거나, 기다려도 제시간에 토큰이 안 생기면 바로 거절
+                if not queued and self.queue and self._waiting >= self.queue:
+                    reason = "queue"
+                if (reason == "queue" or wait is None or remaining <= 0
+                        or (reason != "concurrency" and wait > remaining)):
+                    self.rejected += 1
+                    RATE_LIMIT.inc(resource=self.resource, result="rejected", reason=reason)
+                    retry_after = wait if wait is not None else self._period_start + self.period - now
+                    return QuotaExceeded(self.resource, reason, retry_after, user)
+                return min(wait, remaining)
+        waited = now - started
+        RATE_LIMIT.inc(resource=self.resource, result="queued" if queued else "admitted")
+        RATE_LIMIT_WAIT.observe(waited, resource=self.resource)
+        return None
+
+    def _enter_queue(self, queued):
+        if not queued:
+            with self._lock:
+                self._waiting += 1
+                self.queued += 1
+        return True
+
+    def _leave_queue(self, queued):
+        if queued:
+            with self._lock:
+                self._waiting -= 1
+
+    def release(self):
+        with self._lock:
+            self._in_flight -= 1
+            self._publish()
+
+    def _publish(self):
+        QUOTA_USED.set(self._used, resource=self.resource)
+        IN_FLIGHT.set(self._in_flight, resource=self.resource)
+
+    # 사용
+    def acquire(self, user=None):
+        """자리를 얻을 때까지 (최대 max_wait 초) 기다림, 안 되면 QuotaExceeded"""
+        user = current_user() if user is None else user
+        started, queued = self.clock(), False
+        try:
+            while True:
+                result = self._try(user, started, queued)
+                if result is None:
+                    return
+                if isinstance(result, QuotaExceeded):
+                    raise result
+                queued = self._enter_queue(queued)
+                time.sleep(result)
+        finally:
+            self._leave_queue(queued)
+
+    async def aacquire(self, user=None):
+        """acquire() 의 비동기판 (기다리는 동안 이벤트 루프를 막지 않음)"""
+        user = current_user() if user is None else user
+        started, queued = self.clock(), False
+        try:
+            while True:
+                result = self._try(user, started, queued)
+                if result is None:
+                    return
+                if isinstance(result, QuotaExceeded):
+                    raise result
+                queued = self._enter_queue(queued)
+                await asyncio.sleep(result)
+        finally:
+            self._leave_queue(queued)
+
+    @contextmanager
+    def limit(self, user=None):
+        self.acquire(user)
+        try:
+            yield
+        finally:
+            self.release()
+
+    @asynccontextmanager
+    async def alimit(self, user=None):
+        await self.aacquire(user)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def stats(self, user=None):
+        with self._lock:
+            return {
+                "used": self._used,
+                "quota": self.quota,
+                "user_used": self._user_used.get(user, 0) if user is not None else 0,
+                "user_quota": self.user_quota,
+                "in_flight": self._in_flight,
+                "waiting": self._waiting,
+                "admitted": self.admitted,
+                "queued": self.queued,
+                "rejected": self.rejected,
+            }
+
+def parse_limits(text):
+    """"rate=5,burst=10" → {"rate": 5.0, "burst": 10.0}"""
+    limits = {}
+    for item in filter(None, (part.strip() for part in (text or "").split(","))):
+        key, _, value = item.partition("=")
+        limits[key.strip()] = float(value)
+    return limits
+
+def limits_for(resource):
+    """기본값 + TALKTALK_LIMIT_<자원> 설정"""
+    limits = dict(DEFAULT_LIMITS[resource])
+    overrides = parse_limits(os.environ.get(f"TALKTALK_LIMIT_{resource.upper()}"))
+    unknown = set(overrides) - set(limits)
+    if unknown:
+        raise ValueError(f"알 수 없는 한도 설정: {', '.join(sorted(unknown))}")
+    limits.update(overrides)
+    return limits
+
+# 프로세스 전역 한도 (자원별로 처음 쓸 때 생성)
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+def get_limiter(resource):
+    with _limiters_lock:
+        if resource not in _limiters:
+            _limiters[resource] = RateLimiter(
+                resource,
+                enabled=os.environ.get("TALKTALK_RATE_LIMIT", "1") != "0",
+                **limits_for(resource),
+            )
+        return _limiters[resource]
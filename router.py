@@ -0,0 +1,179 @@
+"""톡톡이 빠른 의도 라우터
+
+"서울 날씨", "삼성전자 주가" 처럼 도구 하나로 끝나는 분명한 질문은
+LLM 을 거치지 않고 해당 도구를 바로 호출해 정해진 문장으로 답합니다.
+여러 의도가 섞였거나 애매한 질문은 None 을 돌려 전체 에이전트로 넘깁니다.
+"안녕", "고마워" 같은 짧은 인사는 도구 없이 정해진 답변으로 돌려줍니다.
+"""
+import re
+import threading
+import time
+
+# 문장 끝에 붙는 요청 표현 ("알려줘", "어때?" 등)
+_TAIL = (
+    r"(?:\s*좀)?(?:\s*(?:알려\s*줘|알려\s*주세요|알려\s*줄래|어때|어때요|어떄|"
+    r"보여\s*줘|찾아\s*줘|검색해\s*줘|궁금해))?\s*[?!.~]*"
+)
+LANGUAGES = r"(?:영어|일본어|중국어|한국어|프랑스어|독일어|스페인어|베트남어|러시아어)"
+
+INTENT_RULES = [
+    ("weather_search", re.compile(
+        rf"^(?P<arg>[가-힣A-Za-z ]{{1,15}}?)\s*(?:의\s*)?(?:날씨|기온){_TAIL}$")),
+    ("stock_search", re.compile(
+        rf"^(?P<arg>[가-힣A-Za-z0-9& ]{{1,20}}?)\s*(?:의\s*)?(?:현재\s*)?"
+        rf"(?:주가|주식\s*(?:가격|정보)?|시세){_TAIL}$")),
+    ("recipe_search", re.compile(
+        rf"^(?P<arg>[가-힣A-Za-z ]{{1,20}}?)\s*(?:레시피|만드는\s*(?:법|방법)|요리법){_TAIL}$")),
+    ("news_search", re.compile(
+        rf"^(?P<arg>[가-힣A-Za-z0-9 ]{{1,20}}?)\s*(?:관련\s*)?(?:최신\s*|오늘\s*)?뉴스{_TAIL}$")),
+    ("translation_search", re.compile(
+        rf"^(?P<arg>.{{1,40}}?(?:을|를)?\s*{LANGUAGES}(?:로|으로))\s*"
+        rf"(?:번역(?:해\s*줘|해\s*주세요|해\s*줄래)?)?\s*[?!.~]*$")),
+]
+
+# 한 질문에 여러 의도가 있는지 확인하는 키워드
+INTENT_KEYWORDS = {
+    "weather_search": ("날씨", "기온", "온도"),
+    "stock_search": ("주가", "주식", "시세", "코스피", "코스닥"),
+    "recipe_search": ("레시피", "만드는", "요리법"),
+    "news_search": ("뉴스", "소식"),
+    "translation_search": ("번역", "영어로", "일본어로", "중국어로"),
+}
+
+# 현재 값이 아닌 다른 시점/기간이나 예측을 묻는 표현 (도구는 현재 값만 돌려줌)
+QUALIFIERS = re.compile(
+    r"내일|모레|글피|주말|이번\s*주|다음\s*주|다음\s*달|어제|그제|지난|작년|올해|내년|과거|역대|"
+    r"전망|예측|예상|추이|추세|목표\s*주가|주간|월간|시간별|최고가|최저가|평균|"
+    r"\d+\s*(?:시간|일|주|개월|달|년)\s*(?:전|후|뒤|동안)|\d{4}\s*년"
+)
+# 여러 질문을 잇는 표현이나 비교/추론이 필요한 질문, 현재가 아닌 시점은 에이전트로
+_AMBIGUOUS = re.compile(r"그리고|또|하고\s|랑\s|이랑|및|,|비교|왜|추천|" + QUALIFIERS.pattern)
+_FILLER = re.compile(r"^(?:오늘|지금|현재)\s*")
+# 앞선 대화를 가리키는 표현 ("그거", "아까" ...)
+REFERENTIAL = re.compile(r"그거|이거|저거|그것|아까|방금|위에|다시\s*(?:알려|말해|설명)|더\s*자세히|계속")
+# 사용자 자신에 관한 표현 ("내 주식", "제 일정" ...)
+PERSONAL = re.compile(
+    r"(?:^|\s)(?:내|제|나|저|우리|너|네)(?:가|는|의|를|게|한테|\s)|기억|\b(?:my|me|I)\b",
+    re.IGNORECASE,
+)
+# 검색어가 될 수 없는 지시어/대명사로 시작하는 인자 ("그 뉴스", "거기 날씨")
+_DEICTIC = re.compile(r"^(?:그|이|저|그런|이런|저런|내|제|나|우리|너|네|거기|여기|저기)(?:\s|$)")
+# 도구가 답을 못 찾았거나 실패했을 때의 출력 (tool_runtime 의 시간 초과 포함)
+FAILED_MARKERS = ("오류", "찾을 수 없습니다", "시간이 초과")
+
+def is_failed(output):
+    """도구 출력이 실패/검색 결과 없음인지"""
+    return any(word in output for word in FAILED_MARKERS)
+
+ANSWER_TEMPLATES = {
+    "weather_search": "{output}\n\n다른 지역 날씨도 궁금하시면 말씀해 주세요! 😊",
+    "stock_search": "{output}\n\n⚠️ 주가는 실시간으로 바뀌니 투자 전에 꼭 다시 확인해 주세요.",
+    "recipe_search": "{output}\n\n맛있게 만들어 드세요! 🍽️",
+    "news_search": "📰 '{arg}' 관련 최신 뉴스예요:\n\n{output}",
+    "translation_search": "{output}",
+}
+
+# 도구도 LLM 도 필요 없는 짧은 인사/감사 (문장 전체가 이것일 때만)
+SMALL_TALK = [
+    (re.compile(r"^(?:안녕|안녕하세요|안녕하십니까|하이|hi|hello|반가워|반가워요|반갑습니다)"
+                r"(?:\s*톡톡(?:아|이)?)?\s*[?!.~😊👋]*$", re.IGNORECASE),
+     "안녕하세요! 👋 톡톡이예요. 날씨, 뉴스, 레시피, 주가, 번역 무엇이든 물어보세요! 😊"),
+    (re.compile(r"^(?:고마워|고마워요|고맙습니다|감사|감사해요|감사합니다|땡큐|thanks|thank you)"
+                r"(?:\s*톡톡(?:아|이)?)?\s*[?!.~😊🙏]*$", re.IGNORECASE),
+     "천만에요! 😊 또 궁금한 게 있으면 언제든 물어보세요."),
+    (re.compile(r"^(?:잘\s*가|잘\s*자|바이|bye|다음에\s*봐)(?:요)?\s*[?!.~👋]*$", re.IGNORECASE),
+     "다음에 또 만나요! 👋"),
+]
+
+def small_talk(query):
+    """짧은 인사/감사면 정해진 답변, 아니면 None"""
+    query = query.strip()
+    for pattern, answer in SMALL_TALK:
+        if pattern.match(query):
+            return answer
+    return None
+
+class RouterStats:
+    """라우터 적중률과 절약한 시간 (프로세스 전역)"""
+
+    def __init__(self):
+        self.total = 0
+        self.routed = 0
+        self.saved_seconds = 0.0
+        self.agent_seconds = None  # 에이전트 턴 평균 시간 (지수 이동 평균)
+        self._lock = threading.Lock()
+
+    def record_route(self, seconds):
+        with self._lock:
+            self.total += 1
+            self.routed += 1
+            if self.agent_seconds is not None:
+                self.saved_seconds += max(0.0, self.agent_seconds - seconds)
+
+    def record_agent(self, seconds):
+        with self._lock:
+            self.total += 1
+            if self.agent_seconds is None:
+                self.agent_seconds = seconds
+            else:
+                self.agent_seconds = 0.8 * self.agent_seconds + 0.2 * seconds
+
+    def stats(self):
+        with self._lock:
+            return {
+                "total": self.total,
+                "routed": self.routed,
+                "hit_rate": self.routed / self.total if self.total else 0.0,
+                "saved_seconds": self.saved_seconds,
+            }
+
+router_stats = RouterStats()
+
+def classify(query):
+    """(도구 이름, 인자) 또는 None
+
+    앞선 대화나 사용자 자신을 가리키는 질문은 대화 기록이 필요하므로 None.
+    번역은 번역할 문장에 "나는" 등이 들어갈 수 있어 인자의 첫 단어만 봅니다.
+    """
+    query = query.strip()
+    if not query or len(query) > 40 or _AMBIGUOUS.search(query) or REFERENTIAL.search(query):
+        return None
+    families = [name for name, words in INTENT_KEYWORDS.items() if any(w in query for w in words)]
+    if len(families) != 1:
+        return None
+    for tool_name, pattern in INTENT_RULES:
+        if tool_name != families[0]:
+            continue
+        match = pattern.match(query)
+        if match:
+            arg = _FILLER.sub("", match.group("arg").strip()).strip()
+            if not arg or _DEICTIC.match(arg):
+                return None
+            if tool_name != "translation_search" and PERSONAL.search(query):
+                return None
+            return tool_name, arg
+    return None
+
+class IntentRouter:
+    """분명한 단일 도구 질문을 도구 직접 호출로 처리"""
+
+    def __init__(self, tools, stats=router_stats):
+        self.tools = {tool.name: tool for tool in tools}
+        self.stats = stats
+
+    def answer(self, query):
+        """템플릿 답변 또는 None (None 이면 에이전트로 처리)"""
+        started = time.perf_counter()
+        greeting = small_talk(query)
+        if greeting is not None:
+            self.stats.record_route(time.perf_counter() - started)
+            return greeting
+        intent = classify(query)
+        if intent is None or intent[0] not in self.tools:
+            return None
+        tool_name, arg = intent
+        output = self.tools[tool_name].func(arg)
+        if is_failed(output):
+            return None
+        self.stats.record_route(time.perf_counter() - started)
+        return ANSWER_TEMPLATES[tool_name].format(output=output, arg=arg)
@@ -0,0 +1,154 @@
+"""톡톡이 공유 검색 HTTP 클라이언트
+
+여섯 개 도구가 각자 SerpAPIWrapper 를 만들던 대신, 프로세스 전체가
+연결 풀(keep-alive)을 가진 httpx.AsyncClient 하나를 함께 씁니다.
+
+- 클라이언트는 전용 백그라운드 이벤트 루프에서 돌고, 도구 스레드에서 search() 로 호출함
+- 같은 요청이 이미 진행 중이면 새로 보내지 않고 그 응답을 함께 받음
+- 연결 오류/시간 초과/429·5xx 는 지수 백오프로 재시도
+- 주소는 TALKTALK_SEARCH_URL 로 바꿀 수 있음 (로컬 대역 서버 등)
+"""
+import asyncio
+import importlib.util
+import os
+import random
+import threading
+import time
+
+import httpx
+
+from metrics import SEARCH_REQUESTS, SEARCH_SECONDS
+from rate_limit import get_limiter
+
+SEARCH_BASE_URL = "https://serpapi.com"
+SEARCH_TIMEOUT = 10.0      # 요청당 시간 제한 (초)
+SEARCH_RETRIES = 2         # 첫 요청 뒤 재시도 횟수
+SEARCH_BACKOFF = 0.3       # 첫 재시도 대기 (초), 이후 두 배씩
+MAX_CONNECTIONS = 32
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+# SerpAPIWrapper 와 같은 기본 검색 조건
+DEFAULT_PARAMS = {
+    "engine": "google",
+    "google_domain": "google.com",
+    "gl": "us",
+    "hl": "en",
+    "output": "json",
+}
+
+# h2 패키지가 있을 때만 HTTP/2 사용
+_HTTP2 = importlib.util.find_spec("h2") is not None
+
+class SearchClient:
+    """연결 풀 + 요청 병합 + 재시도를 갖춘 검색 클라이언트"""
+
+    def __init__(self, base_url=None, timeout=SEARCH_TIMEOUT, retries=SEARCH_RETRIES,
+                 backoff=SEARCH_BACKOFF, max_connections=MAX_CONNECTIONS):
+        self.base_url = (base_url or os.environ.get("TALKTALK_SEARCH_URL") or SEARCH_BASE_URL).rstrip("/")
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.max_connections = max_connections
+        self.requests = 0
+        self.coalesced = 0
+        self.retried = 0
+        self._inflight = {}  # 요청 파라미터 -> 진행 중인 Task (클라이언트 루프에서만 접근)
+        self._client = None
+        self._loop = None
+        self._lock = threading.Lock()
+
+    def search(self, params):
+        """동기 호출 (도구 스레드에서 사용), 응답 JSON 반환"""
+        return self._submit(params).result()
+
+    def stats(self):
+        return {
+            "requests": self.requests,
+            "coalesced": self.coalesced,
+            "retried": self.retried,
+        }
+
+    def _submit(self, params):
+        return asyncio.run_coroutine_threadsafe(self._search(params), self._ensure_loop())
+
+    def _ensure_loop(self):
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="talktalk-search", daemon=True).start()
+                self._loop = loop
+            return self._loop
+
+    async def _search(self, params):
+        key = tuple(sorted(params.items()))
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch(params))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            self.coalesced += 1
+            SEARCH_REQUESTS.inc(result="coalesced")
+        # 기다리던 쪽이 취소되어도 다른 대기자를 위한 요청은 계속 진행
+        return await asyncio.shield(task)
+
+    async def _fetch(self, params):
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=self.timeout,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                ),
+                http2=_HTTP2,
+            )
+        for attempt in range(self.retries + 1):
+            self.requests += 1
+            started = time.perf_counter()
+            try:
+                response = await self._client.get("/search", params=params)
+                SEARCH_SECONDS.observe(time.perf_counter() - started)
+                if response.status_code not in RETRY_STATUS or attempt == self.retries:
+                    SEARCH_REQUESTS.inc(result=str(response.status_code))
+                    # SerpAPI 는 잘못된 키 등도 {"error": ...} JSON 으로 알려 줌
+                    return response.json()
+            except httpx.TransportError:
+                if attempt == self.retries:
+                    SEARCH_REQUESTS.inc(result="error")
+                    raise
+            self.retried += 1
+            SEARCH_REQUESTS.inc(result="retry")
+            await asyncio.sleep(self.backoff * 2 ** attempt * random.uniform(0.5, 1.5))
+
+# 프로세스 전역 클라이언트
+_search_client = None
+_search_client_lock = threading.Lock()
+
+def get_search_client():
+    global _search_client
+    with _search_client_lock:
+        if _search_client is None:
+            _search_client = SearchClient()
+        return _search_client
+
+class SerpAPISearchBackend:
+    """공유 클라이언트 위의 SerpAPI 검색 (SerpAPIWrapper 와 같은 results() 인터페이스)"""
+
+    def __init__(self, api_key=None, client=None, params=None):
+        self.api_key = api_key
+        self.client = client if client is not None else get_search_client()
+        self.params = {**DEFAULT_PARAMS, **(params or {})}
+
+    def _params(self, query):
+        api_key = self.api_key or os.environ.get("SERPAPI_API_KEY", "")
+        return {**self.params, "q": query, "api_key": api_key}
+
+    def results(self, query):
+        params = self._params(query)
+        if not params["api_key"]:
+            # 키 없이 보내면 오류 응답만 받으므로 요청하지 않음
+            raise ValueError("SerpAPI 키가 설정되지 않았습니다")
+        # SerpAPI 할당량을 쓰는 실제 호출만 한도를 거침 (캐시 적중은 공짜)
+        with get_limiter("serpapi").limit():
+            return self.client.search(params)
@@ -0,0 +1,183 @@
+"""톡톡이 의미 기반 답변 캐시
+
+"오늘 서울 날씨 어때?" 와 "서울 날씨 알려줘" 처럼 거의 같은 질문에는
+에이전트를 다시 돌리지 않고 이전 답변을 돌려줍니다.
+질문은 글자 n-gram 벡터로 바꿔 (네트워크/모델 없이 동작) 코사인 유사도로 비교하고,
+답변의 유효 시간은 질문 종류(날씨, 주가 ...)에 따라 도구 캐시 TTL 을 따릅니다.
+
+캐시는 모든 사용자가 공유하므로 도구로 답하는 질문(날씨, 뉴스, 주가 ...)만 넣고,
+개인적인 질문("내 이름", "제 일정" ...)이나 앞선 대화에 기대는 질문은 넣지 않습니다.
+숫자, 언어, 시점(내일, 작년 ...), 지명, 종목은 유사도와 별개로 정확히 같아야 합니다.
+에이전트가 대화 기록에서 지명/종목/언어를 가져와 도구를 불렀다면(질문에 없는 인자)
+그 답변은 질문만으로 정해지지 않으므로 넣지 않습니다.
+"""
+import math
+import re
+import threading
+import time
+from collections import Counter, OrderedDict
+
+from router import INTENT_KEYWORDS, LANGUAGES, PERSONAL, QUALIFIERS, REFERENTIAL
+from stock_quotes import extract_listings
+from tool_cache import TOOL_TTLS, normalize_query
+from weather import extract_places
+
+SIMILARITY_THRESHOLD = 0.92
+MAX_ENTRIES = 2000
+DEFAULT_FRESHNESS = TOOL_TTLS["general_search"]
+STALE_GRACE = 24 * 60 * 60  # 만료된 답변을 대체 답변용으로 더 보관하는 시간 (초)
+
+# 의미에 영향을 주지 않는 요청 표현
+_STOPWORDS = re.compile(
+    r"알려\s*줘요?|알려\s*주세요|알려\s*줄래|어때요|어때|어떄|궁금해요?|보여\s*줘요?|찾아\s*줘요?|"
+    r"해\s*줘요?|좀|오늘|지금|현재|요즘|최신|최근|please"
+)
+
+def canonical_question(question):
+    text = _STOPWORDS.sub(" ", normalize_query(question))
+    return " ".join(text.split())
+
+def embed(question, sizes=(2, 3)):
+    """글자 n-gram 빈도 벡터 (L2 정규화된 희소 벡터)"""
+    text = canonical_question(question).replace(" ", "")
+    grams = Counter(
+        text[i:i + n] for n in sizes for i in range(len(text) - n + 1)
+    ) or Counter([text])
+    norm = math.sqrt(sum(v * v for v in grams.values()))
+    return {gram: count / norm for gram, count in grams.items()}
+
+def facets(question):
+    """유사도와 별개로 정확히 같아야 하는 표현 (숫자, 언어, 시점, 지명, 종목)"""
+    text = normalize_query(question)
+    return frozenset(
+        [("number", n) for n in re.findall(r"\d+(?:\.\d+)?", text)]
+        + [("language", lang) for lang in re.findall(LANGUAGES, text)]
+        + [("time", "".join(word.split())) for word in QUALIFIERS.findall(text)]
+        + [("place", place["name"]) for place in extract_places(question)]
+        + [("ticker", listing["ticker"]) for listing in extract_listings(question)]
+    )
+
+_ENTITY_FACETS = ("place", "ticker", "language")
+
+def grounded(question, tool_inputs):
+    """도구 인자의 지명/종목/언어가 모두 질문에도 나오는지"""
+    allowed = facets(question)
+    return all(
+        facet in allowed
+        for text in tool_inputs
+        for facet in facets(text)
+        if facet[0] in _ENTITY_FACETS
+    )
+
+def freshness_for(question):
+    """질문 종류에 맞는 답변 유효 시간 (여러 종류면 가장 짧게)"""
+    ttls = [
+        TOOL_TTLS[tool_name]
+        for tool_name, words in INTENT_KEYWORDS.items()
+        if any(word in question for word in words)
+    ]
+    return min(ttls) if ttls else DEFAULT_FRESHNESS
+
+class SemanticCache:
+    """n-gram 역색인 위의 유사 질문 답변 캐시 (LRU 크기 제한)"""
+
+    def __init__(self, threshold=SIMILARITY_THRESHOLD, max_entries=MAX_ENTRIES):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # id -> (벡터, 표현, 답변, 만료 시각)
+        self._postings = {}            # n-gram -> {id, ...}
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def cacheable(question):
+        """공유 캐시에 넣고 찾을 수 있는 질문인지 (도구 질문, 개인/앞 대화 참조 아님)"""
+        return (
+            bool(canonical_question(question))
+            and any(word in question for words in INTENT_KEYWORDS.values() for word in words)
+            # 앞선 대화에 기대거나 사용자 자신에 관한 질문은 다른 사용자에게 돌려주지 않음
+            and not REFERENTIAL.search(question)
+            and not PERSONAL.search(question)
+        )
+
+    def lookup(self, question, threshold=None, allow_stale=False):
+        """유사한 질문의 답변 또는 None
+
+        allow_stale 이면 유효 시간이 지난 답변도 돌려줍니다 (요청 한도 초과 때 대체 답변용).
+        """
+        threshold = self.threshold if threshold is None else threshold
+        if not self.cacheable(question):
+            return None
+        vector = embed(question)
+        question_facets = facets(question)
+        now = time.monotonic()
+        with self._lock:
+            candidates = set()
+            for gram in vector:
+                candidates.update(self._postings.get(gram, ()))
+            best_id, best_score = None, 0.0
+            for entry_id in candidates:
+                entry_vector, entry_facets, _, expires_at = self._entries[entry_id]
+                if (expires_at <= now and not allow_stale) or entry_facets != question_facets:
+                    continue
+                score = sum(weight * entry_vector.get(gram, 0.0) for gram, weight in vector.items())
+                if score > best_score:
+                    best_id, best_score = entry_id, score
+            if best_id is not None and best_score >= threshold:
+                self._entries.move_to_end(best_id)
+                self.hits += 1
+                return self._entries[best_id][2]
+            self.misses += 1
+            return None
+
+    def store(self, question, answer, tool_inputs=()):
+        """tool_inputs: 이 답변을 만든 도구 인자들 (질문에 없는 지명/종목/언어가 있으면 넣지 않음)"""
+        if not self.cacheable(question) or not answer or not grounded(question, tool_inputs):
+            return
+        vector = embed(question)
+        entry = (vector, facets(question), answer, time.monotonic() + freshness_for(question))
+        with self._lock:
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = entry
+            for gram in vector:
+                self._postings.setdefault(gram, set()).add(entry_id)
+            self._evict(time.monotonic())
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._postings.clear()
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+            }
+
+    def _evict(self, now):
+        expired = [
+            entry_id for entry_id, entry in self._entries.items() if entry[3] + STALE_GRACE <= now
+        ]
+        for entry_id in expired:
+            self._remove(entry_id)
+        while len(self._entries) > self.max_entries:
+            self._remove(next(iter(self._entries)))
+
+    def _remove(self, entry_id):
+        vector = self._entries.pop(entry_id)[0]
+        for gram in vector:
+            postings = self._postings.get(gram)
+            if postings is not None:
+                postings.discard(entry_id)
+                if not postings:
+                    del self._postings[gram]
+
+# 프로세스 전역 캐시
+semantic_cache = SemanticCache()
@@ -0,0 +1,244 @@
+"""톡톡이 대화 기록 저장소
+
+여러 앱 인스턴스가 같은 대화를 이어갈 수 있도록 대화 기록을 프로세스 밖에 저장합니다.
+- 메시지는 추가만 하고 (append-only) 전체를 다시 쓰지 않음
+- 요약되지 않은 최근 메시지만 읽어 옴
+- 오래된 세션은 TTL 기준으로 정리
+
+저장소 선택: TALKTALK_HISTORY_BACKEND = sqlite (기본) | redis | fakeredis
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+
+SESSION_TTL = 7 * 24 * 60 * 60     # 마지막 대화 후 보관 기간 (초)
+CLEANUP_INTERVAL = 10 * 60         # SQLite 정리 주기 (초)
+LOAD_LIMIT = 100                   # 한 번에 읽어 올 최대 메시지 수
+
+def _dumps(message):
+    from langchain_core.messages import message_to_dict
+
+    return json.dumps(message_to_dict(message), ensure_ascii=False)
+
+def _loads(rows):
+    from langchain_core.messages import messages_from_dict
+
+    return messages_from_dict([json.loads(row) for row in rows])
+
+# 🗄️ SQLite 저장소 (기본)
+class SQLiteHistoryStore:
+    """단일 파일 SQLite 저장소"""
+
+    def __init__(self, path="talktalk_history.db", ttl=SESSION_TTL):
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._last_cleanup = 0.0
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS messages ("
+                " session_id TEXT NOT NULL, seq INTEGER NOT NULL, body TEXT NOT NULL,"
+                " PRIMARY KEY (session_id, seq))"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS sessions ("
+                " session_id TEXT PRIMARY KEY, state TEXT NOT NULL DEFAULT '{}',"
+                " next_seq INTEGER NOT NULL DEFAULT 0, updated_at REAL NOT NULL)"
+            )
+
+    def append(self, session_id, messages):
+        if not messages:
+            return
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO sessions (session_id, updated_at) VALUES (?, ?)",
+                (session_id, now),
+            )
+            (next_seq,) = self._conn.execute(
+                "SELECT next_seq FROM sessions WHERE session_id = ?", (session_id,)
+            ).fetchone()
+            self._conn.executemany(
+                "INSERT INTO messages (session_id, seq, body) VALUES (?, ?, ?)",
+                [(session_id, next_seq + i, _dumps(m)) for i, m in enumerate(messages)],
+            )
+            self._conn.execute(
+                "UPDATE sessions SET next_seq = ?, updated_at = ? WHERE session_id = ?",
+                (next_seq + len(messages), now, session_id),
+            )
+        self._maybe_cleanup(now)
+
+    def load(self, session_id, start=0, limit=LOAD_LIMIT):
+        """start 번째 이후 메시지 중 최근 limit 개"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT body FROM messages WHERE session_id = ? AND seq >= ?"
+                " ORDER BY seq DESC LIMIT ?",
+                (session_id, start, limit),
+            ).fetchall()
+        return _loads([row[0] for row in reversed(rows)])
+
+    def get_state(self, session_id):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT state FROM sessions WHERE session_id = ?", (session_id,)
+            ).fetchone()
+        return json.loads(row[0]) if row else {}
+
+    def set_state(self, session_id, state):
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO sessions (session_id, state, updated_at) VALUES (?, ?, ?)"
+                " ON CONFLICT(session_id) DO UPDATE SET state = excluded.state,"
+                " updated_at = excluded.updated_at",
+                (session_id, json.dumps(state, ensure_ascii=False), now),
+            )
+
+    def delete(self, session_id):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM messages WHERE session_id = ?", (session_id,))
+            self._conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+
+    def cleanup(self, now=None):
+        """TTL 이 지난 세션 삭제, 삭제한 세션 수 반환"""
+        cutoff = (now or time.time()) - self.ttl
+        with self._lock, self._conn:
+            expired = [
+                row[0] for row in self._conn.execute(
+                    "SELECT session_id FROM sessions WHERE updated_at < ?", (cutoff,)
+                )
+            ]
+            for session_id in expired:
+                self._conn.execute("DELETE FROM messages WHERE session_id = ?", (session_id,))
+                self._conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+        return len(expired)
+
+    def _maybe_cleanup(self, now):
+        if now - self._last_cleanup >= CLEANUP_INTERVAL:
+            self._last_cleanup = now
+            self.cleanup(now)
+
+# 🧰 Redis 호환 저장소
+class RedisHistoryStore:
+    """redis-py 호환 클라이언트 위의 저장소 (키 만료로 TTL 정리)"""
+
+    def __init__(self, client, ttl=SESSION_TTL, prefix="talktalk:history:"):
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def _keys(self, session_id):
+        return f"{self.prefix}{session_id}:messages", f"{self.prefix}{session_id}:state"
+
+    def append(self, session_id, messages):
+        if not messages:
+            return
+        messages_key, state_key = self._keys(session_id)
+        self.client.rpush(messages_key, *[_dumps(m) for m in messages])
+        self.client.expire(messages_key, self.ttl)
+        self.client.expire(state_key, self.ttl)
+
+    def load(self, session_id, start=0, limit=LOAD_LIMIT):
+        messages_key, _ = self._keys(session_id)
+        length = self.client.llen(messages_key)
+        first = max(start, length - limit)
+        rows = self.client.lrange(messages_key, first, -1)
+        return _loads([row.decode("utf-8") if isinstance(row, bytes) else row for row in rows])
+
+    def get_state(self, session_id):
+        _, state_key = self._keys(session_id)
+        raw = self.client.get(state_key)
+        if raw is None:
+            return {}
+        return json.loads(raw.decode("utf-8") if isinstance(raw, bytes) else raw)
+
+    def set_state(self, session_id, state):
+        _, state_key = self._keys(session_id)
+        self.client.set(state_key, json.dumps(state, ensure_ascii=False), ex=self.ttl)
+
+    def delete(self, session_id):
+        self.client.delete(*self._keys(session_id))
+
+    def cleanup(self, now=None):
+        # Redis 가 키 만료로 직접 정리함
+        return 0
+
+class FakeRedis:
+    """RedisHistoryStore 가 쓰는 명령만 구현한 로컬 Redis 대역"""
+
+    def __init__(self):
+        self._data = {}
+        self._expires = {}
+        self._lock = threading.Lock()
+
+    def _alive(self, key):
+        expires = self._expires.get(key)
+        if expires is not None and expires <= time.time():
+            self._data.pop(key, None)
+            self._expires.pop(key, None)
+        return key in self._data
+
+    def rpush(self, key, *values):
+        with self._lock:
+            self._alive(key)
+            self._data.setdefault(key, []).extend(values)
+            return len(self._data[key])
+
+    def llen(self, key):
+        with self._lock:
+            return len(self._data[key]) if self._alive(key) else 0
+
+    def lrange(self, key, start, end):
+        with self._lock:
+            if not self._alive(key):
+                return []
+            values = self._data[key]
+            end = len(values) if end == -1 else end + 1
+            return list(values[start:end])
+
+    def get(self, key):
+        with self._lock:
+            return self._data[key] if self._alive(key) else None
+
+    def set(self, key, value, ex=None):
+        with self._lock:
+            self._data[key] = value
+            self._expires.pop(key, None)
+            if ex is not None:
+                self._expires[key] = time.time() + ex
+
+    def expire(self, key, seconds):
+        with self._lock:
+            if self._alive(key):
+                self._expires[key] = time.time() + seconds
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+                self._expires.pop(key, None)
+
+# 프로세스 전역 저장소
+_store = None
+_store_lock = threading.Lock()
+
+def create_history_store():
+    backend = os.environ.get("TALKTALK_HISTORY_BACKEND", "sqlite")
+    if backend == "redis":
+        import redis
+        return RedisHistoryStore(redis.Redis.from_url(os.environ["TALKTALK_REDIS_URL"]))
+    if backend == "fakeredis":
+        return RedisHistoryStore(FakeRedis())
+    return SQLiteHistoryStore(os.environ.get("TALKTALK_HISTORY_DB", "talktalk_history.db"))
+
+def get_history_store():
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = create_history_store()
+        return _store
@@ -0,0 +1,277 @@
+"""톡톡이 주식 시세
+
+검색 결과 스니펫을 긁어 오던 대신, 종목 이름을 종목 코드로 바꾼 뒤
+시세 제공자(provider)에게 여러 종목을 한 번에 물어봅니다.
+
+- 종목 이름 → 코드 색인 (삼성전자 → 005930, 애플 → AAPL 등 별칭 포함)
+- QuoteProvider: quotes(listings) 로 여러 종목을 한 번에 조회
+  - FixtureQuoteProvider: 네트워크 없이 동작하는 고정 시세 (테스트/벤치마크용)
+  - YahooQuoteProvider: Yahoo Finance 시세 API (한 요청에 여러 종목)
+- 종목별 짧은 TTL 메모리 캐시 (묶음 중 일부만 캐시에 있어도 나머지만 조회)
+
+환경변수 TALKTALK_QUOTE_PROVIDER=fixture|yahoo 로 제공자를 고릅니다. Yahoo 시세 API 는
+인증 없는 비공식 엔드포인트라 명시적으로 켤 때만 쓰고, 제공자가 없으면 주식 도구는
+웹 검색으로 답합니다 (오프라인 검색 모드에서는 고정 시세).
+"""
+import hashlib
+import os
+import re
+import threading
+import time
+import unicodedata
+
+from tool_cache import TOOL_TTLS, TTLCache, cache_lookup, record_upstream
+
+# 시세 캐시 유효 시간 (초), 주식 도구 캐시와 같게 둬야 미리 가져오기(TTL 의 80%)가
+# 만료 전에 시세를 새로 고침
+QUOTE_TTL = TOOL_TTLS["stock_search"]
+QUOTE_TIMEOUT = 5.0
+YAHOO_BASE_URL = "https://query1.finance.yahoo.com"
+
+# (코드, 시장, 이름, 별칭) — 시장: KS 코스피, KQ 코스닥, US 미국, INDEX 지수
+LISTINGS = [
+    ("005930", "KS", "삼성전자", ("삼전", "samsung electronics", "samsung")),
+    ("000660", "KS", "SK하이닉스", ("하이닉스", "sk hynix", "hynix")),
+    ("373220", "KS", "LG에너지솔루션", ("엘지에너지솔루션", "lg엔솔", "엔솔")),
+    ("207940", "KS", "삼성바이오로직스", ("삼바", "삼성바이오")),
+    ("005380", "KS", "현대차", ("현대자동차", "hyundai motor")),
+    ("000270", "KS", "기아", ("기아차", "kia")),
+    ("068270", "KS", "셀트리온", ("celltrion",)),
+    ("035420", "KS", "NAVER", ("네이버", "naver")),
+    ("035720", "KS", "카카오", ("kakao",)),
+    ("323410", "KS", "카카오뱅크", ("카뱅",)),
+    ("005490", "KS", "POSCO홀딩스", ("포스코홀딩스", "포스코", "posco")),
+    ("051910", "KS", "LG화학", ("엘지화학",)),
+    ("006400", "KS", "삼성SDI", ("삼성에스디아이",)),
+    ("012330", "KS", "현대모비스", ("모비스",)),
+    ("105560", "KS", "KB금융", ("kb금융지주", "국민은행")),
+    ("055550", "KS", "신한지주", ("신한금융", "신한금융지주")),
+    ("028260", "KS", "삼성물산", ()),
+    ("015760", "KS", "한국전력", ("한전",)),
+    ("259960", "KS", "크래프톤", ("krafton",)),
+    ("036570", "KS", "엔씨소프트", ("ncsoft", "엔씨")),
+    ("247540", "KQ", "에코프로비엠", ()),
+    ("196170", "KQ", "알테오젠", ()),
+    ("028300", "KQ", "HLB", ("에이치엘비",)),
+    ("AAPL", "US", "애플", ("apple",)),
+    ("TSLA", "US", "테슬라", ("tesla",)),
+    ("NVDA", "US", "엔비디아", ("nvidia",)),
+    ("MSFT", "US", "마이크로소프트", ("microsoft", "마소")),
+    ("GOOGL", "US", "알파벳", ("구글", "google", "alphabet")),
+    ("AMZN", "US", "아마존", ("amazon",)),
+    ("META", "US", "메타", ("페이스북", "meta")),
+    ("KS11", "INDEX", "코스피", ("kospi", "코스피지수")),
+    ("KQ11", "INDEX", "코스닥", ("kosdaq", "코스닥지수")),
+]
+
+def _key(text):
+    return unicodedata.normalize("NFKC", text).lower().replace(" ", "")
+
+def _build_index():
+    index = {}
+    for ticker, market, name, aliases in LISTINGS:
+        listing = {"ticker": ticker, "market": market, "name": name}
+        for alias in (ticker, name) + aliases:
+            index[_key(alias)] = listing
+    return index
+
+_INDEX = _build_index()
+_TOKEN = re.compile(r"[0-9a-z가-힣&]+")
+# 종목 이름 뒤에 붙어도 되는 말 ("삼성전자주가", "카카오랑", "애플은") — 그 밖의 글자가
+# 이어지면 다른 이름이므로 ("카카오페이", "메타버스", "nokia") 종목으로 보지 않음
+_SUFFIX = re.compile(
+    r"(?:주가|주식|시세|현재가|종가)?"
+    r"(?:이랑|랑|하고|과|와|의|은|는|이|가|을|를|도|만|에서|에|으로|로|요)?"
+)
+
+def resolve(name):
+    """종목 이름/별칭/코드 → 종목 정보 dict 또는 None"""
+    return _INDEX.get(_key(name))
+
+def _match(word):
+    """단어 전체가 (가장 긴) 별칭 + 허용된 뒷말이면 (종목, 별칭 길이), 아니면 (None, 0)"""
+    for end in range(len(word), 0, -1):
+        listing = _INDEX.get(word[:end])
+        if listing is not None and _SUFFIX.fullmatch(word[end:]):
+            return listing, end
+    return None, 0
+
+def extract_listings(text):
+    """문장에 나온 종목들 (등장 순서, 중복 제거)
+
+    단어 경계로 찾습니다. "samsung electronics" 처럼 띄어 쓴 별칭은 이어진 단어
+    세 개까지 붙여 봅니다.
+    """
+    words = _TOKEN.findall(unicodedata.normalize("NFKC", text).lower())
+    found = []
+    i = 0
+    while i < len(words):
+        step, listing = 1, None
+        for size in (3, 2, 1):
+            if i + size > len(words):
+                continue
+            candidate, length = _match("".join(words[i:i + size]))
+            # 여러 단어를 붙였으면 별칭이 첫 단어를 넘어서야 함
+            if candidate is not None and (size == 1 or length > len(words[i])):
+                step, listing = size, candidate
+                break
+        if listing is not None and listing not in found:
+            found.append(listing)
+        i += step
+    return found
+
+# 📡 시세 제공자
+class QuoteProvider:
+    """시세 제공자 인터페이스"""
+
+    def quotes(self, listings):
+        """{종목 코드: 시세 dict} (찾지 못한 종목은 빠짐)
+
+        시세 dict: ticker, name, market, price, change, change_percent, currency, as_of
+        """
+        raise NotImplementedError
+
+def _currency(market):
+    return {"KS": "KRW", "KQ": "KRW", "US": "USD"}.get(market, "POINT")
+
+class FixtureQuoteProvider(QuoteProvider):
+    """고정 시세 제공자 (코드에서 정해지는 값이라 매번 같음)"""
+
+    def __init__(self, fixtures=None, latency=0.0):
+        self.fixtures = fixtures or {}
+        self.latency = latency
+        self.calls = 0
+
+    def quotes(self, listings):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        results = {}
+        for listing in listings:
+            ticker = listing["ticker"]
+            if ticker in self.fixtures:
+                results[ticker] = dict(self.fixtures[ticker])
+                continue
+            seed = int(hashlib.sha256(ticker.encode("utf-8")).hexdigest()[:8], 16)
+            if listing["market"] in ("KS", "KQ"):
+                price = float((seed % 900 + 10) * 100)
+            elif listing["market"] == "US":
+                price = round(50 + seed % 45000 / 100, 2)
+            else:
+                price = round(700 + seed % 200000 / 100, 2)
+            change_percent = round((seed // 1000 % 600 - 300) / 100, 2)
+            results[ticker] = {
+                **listing,
+                "price": price,
+                "change": round(price * change_percent / 100, 2),
+                "change_percent": change_percent,
+                "currency": _currency(listing["market"]),
+                "as_of": time.time(),
+            }
+        return results
+
+class YahooQuoteProvider(QuoteProvider):
+    """Yahoo Finance 시세 API (여러 종목을 한 요청으로 조회)"""
+
+    def __init__(self, base_url=None, timeout=QUOTE_TIMEOUT):
+        import httpx
+
+        self.base_url = (base_url or os.environ.get("TALKTALK_QUOTE_URL") or YAHOO_BASE_URL).rstrip("/")
+        self._client = httpx.Client(base_url=self.base_url, timeout=timeout,
+                                    headers={"User-Agent": "Mozilla/5.0"})
+
+    @staticmethod
+    def symbol(listing):
+        ticker, market = listing["ticker"], listing["market"]
+        if market in ("KS", "KQ"):
+            return f"{ticker}.{market}"
+        if market == "INDEX":
+            return f"^{ticker}"
+        return ticker
+
+    def quotes(self, listings):
+        by_symbol = {self.symbol(listing): listing for listing in listings}
+        response = self._client.get("/v7/finance/quote", params={"symbols": ",".join(by_symbol)})
+        response.raise_for_status()
+        results = {}
+        for item in response.json().get("quoteResponse", {}).get("result", []):
+            listing = by_symbol.get(item.get("symbol"))
+            if listing is None or item.get("regularMarketPrice") is None:
+                continue
+            results[listing["ticker"]] = {
+                **listing,
+                "price": item["regularMarketPrice"],
+                "change": item.get("regularMarketChange", 0.0),
+                "change_percent": item.get("regularMarketChangePercent", 0.0),
+                "currency": item.get("currency") or _currency(listing["market"]),
+                "as_of": item.get("regularMarketTime") or time.time(),
+            }
+        return results
+
+def create_quote_provider():
+    """TALKTALK_QUOTE_PROVIDER 에 맞는 제공자 또는 None (오프라인 검색 모드에서는 고정 시세)"""
+    name = os.environ.get("TALKTALK_QUOTE_PROVIDER")
+    if name is None and os.environ.get("TALKTALK_SEARCH_BACKEND") == "stub":
+        name = "fixture"
+    if name == "fixture":
+        return FixtureQuoteProvider()
+    if name == "yahoo":
+        return YahooQuoteProvider()
+    return None
+
+# 📈 시세 조회
+class QuoteService:
+    """종목별 캐시 + 묶음 조회"""
+
+    def __init__(self, provider=None, cache=None, ttl=QUOTE_TTL):
+        self.provider = provider if provider is not None else create_quote_provider()
+        self.cache = cache if cache is not None else TTLCache(max_bytes=1024 * 1024, max_entries=2000)
+        self.ttl = ttl
+        self.requests = 0
+
+    def get_quotes(self, listings):
+        """{종목 코드: 시세 dict}, 캐시에 없는 종목만 제공자에게 한 번에 요청"""
+        results, missing = {}, []
+        for listing in listings:
+            quote = cache_lookup(self.cache, listing["ticker"], "stock_quote")
+            if quote is not None:
+                results[listing["ticker"]] = quote
+            else:
+                missing.append(listing)
+        if missing:
+            self.requests += 1
+            record_upstream()
+            for ticker, quote in self.provider.quotes(missing).items():
+                self.cache.set(ticker, quote, self.ttl)
+                results[ticker] = quote
+        return results
+
+def format_quote(quote):
+    """한 줄 시세 ("📈 삼성전자(005930) 71,000원 ▲500 (+0.71%)")"""
+    arrow = "▲" if quote["change"] > 0 else "▼" if quote["change"] < 0 else ""
+    if quote["currency"] == "KRW":
+        price, change = f"{quote['price']:,.0f}원", f"{abs(quote['change']):,.0f}"
+    elif quote["currency"] == "USD":
+        price, change = f"${quote['price']:,.2f}", f"{abs(quote['change']):,.2f}"
+    else:
+        price, change = f"{quote['price']:,.2f}", f"{abs(quote['change']):,.2f}"
+    as_of = time.strftime("%H:%M", time.localtime(quote["as_of"]))
+    return (
+        f"📈 {quote['name']}({quote['ticker']}) {price} {arrow}{change} "
+        f"({quote['change_percent']:+.2f}%) · {as_of} 기준"
+    )
+
+# 프로세스 전역 시세 서비스 (처음 쓸 때 생성)
+_quote_service = None
+_quote_service_lock = threading.Lock()
+
+def get_quote_service():
+    """시세 서비스, 제공자를 설정하지 않았으면 None (주식 도구가 웹 검색으로 답함)"""
+    global _quote_service
+    with _quote_service_lock:
+        if _quote_service is None:
+            provider = create_quote_provider()
+            if provider is None:
+                return None
+            _quote_service = QuoteService(provider)
+        return _quote_service
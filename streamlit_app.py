@@ -1,14 +1,18 @@
-import os
+import asyncio
+import time
 import streamlit as st
-import json
-import requests
-from datetime import datetime
-from langchain_openai import ChatOpenAI
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_community.utilities import SerpAPIWrapper
-from langchain.agents import create_tool_calling_agent, AgentExecutor, Tool
-from langchain_community.chat_message_histories import ChatMessageHistory
-from langchain_core.runnables.history import RunnableWithMessageHistory
+from chatbot_core import (
+    agent_is_broken, chat_turn, create_prefetch_tools, delete_session, get_agent_cache,
+    is_session_id, last_history_stats, load_transcript, new_session_id,
+)
+from router import router_stats
+from semantic_cache import semantic_cache
+from tool_cache import get_single_flight, get_tool_cache
+from metrics import TurnTracer, start_metrics_server
+from prefetch import prefetcher, start_prefetcher
+from rate_limit import get_limiter
+from agent_policy import policy_stats
+from warmup import start_warmup
 
 # 페이지 설정
 st.set_page_config(
@@ -19,69 +23,82 @@ st.set_page_config(
 )
 
 # 🎨 다크/라이트 모드 관리
-def apply_theme_styles(theme):
-    """테마에 따른 스타일 적용"""
-    if theme == "dark":
-        bg_color = "#0e1117"
-        text_color = "#fafafa"
-        secondary_bg = "#262730"
-        border_color = "rgba(255, 255, 255, 0.2)"
-        sidebar_bg = "#262730"
-        chat_bg = "rgba(255, 255, 255, 0.05)"
-        color_scheme = "dark"
-        # 다크모드: 어두운 회색 버튼, 흰 글자
-        button_bg = "#374151"
-        button_text = "white"
-        button_hover_bg = "white"
-        button_hover_text = "#374151"
-    else:  # light mode
-        bg_color = "#ffffff"
-        text_color = "#262730"
-        secondary_bg = "#f0f2f6"
-        border_color = "rgba(0, 0, 0, 0.2)"
-        sidebar_bg = "#f0f2f6"
-        chat_bg = "rgba(0, 0, 0, 0.02)"
-        color_scheme = "light"
+# 테마별 색상 (CSS 변수로 내보냄)
+THEME_PALETTES = {
+    "light": {
+        "bg-color": "#ffffff",
+        "text-color": "#262730",
+        "secondary-bg": "#f0f2f6",
+        "border-color": "rgba(0, 0, 0, 0.2)",
+        "sidebar-bg": "#f0f2f6",
+        "chat-bg": "rgba(0, 0, 0, 0.02)",
+        "color-scheme": "light",
         # 라이트모드: 흰색 버튼, 검은색 글자
-        button_bg = "white"
-        button_text = "#374151"
-        button_hover_bg = "#374151"
-        button_hover_text = "white"
-    
-    return f"""
-    <style>
+        "button-bg": "white",
+        "button-text": "#374151",
+        "button-hover-bg": "#374151",
+        "button-hover-text": "white",
+        # 채팅 입력창
+        "input-bg": "#f8f9fa",
+        "input-text": "#212529",
+        "input-border": "2px solid #dee2e6",
+        "input-radius": "8px",
+    },
+    "dark": {
+        "bg-color": "#0e1117",
+        "text-color": "#fafafa",
+        "secondary-bg": "#262730",
+        "border-color": "rgba(255, 255, 255, 0.2)",
+        "sidebar-bg": "#262730",
+        "chat-bg": "rgba(255, 255, 255, 0.05)",
+        "color-scheme": "dark",
+        # 다크모드: 어두운 회색 버튼, 흰 글자
+        "button-bg": "#374151",
+        "button-text": "white",
+        "button-hover-bg": "white",
+        "button-hover-text": "#374151",
+        # 채팅 입력창
+        "input-bg": "#262730",
+        "input-text": "#fafafa",
+        "input-border": "1px solid rgba(255, 255, 255, 0.2)",
+        "input-radius": "4px",
+    },
+}
+
+# 테마와 무관한 스타일 (색상은 모두 CSS 변수 참조)
+THEME_RULES = """
         /* 전역 테마 설정 - 매우 강제 적용 */
         .stApp, .stApp *, 
         [data-testid="stAppViewContainer"],
         .main, .main *,
         section[data-testid="main"],
-        section[data-testid="main"] * {{
-            color: {text_color} !important;
-        }}
+        section[data-testid="main"] * {
+            color: var(--tt-text-color) !important;
+        }
         
         .stApp,
         [data-testid="stAppViewContainer"],
         body,
         html,
         .main,
-        section[data-testid="main"] {{
-            background-color: {bg_color} !important;
-        }}
+        section[data-testid="main"] {
+            background-color: var(--tt-bg-color) !important;
+        }
         
         /* 브라우저 다크모드 무시 - 강제 라이트/다크 적용 */
-        html, body {{
-            background-color: {bg_color} !important;
-            color: {text_color} !important;
-            color-scheme: {color_scheme} !important;
-        }}
+        html, body {
+            background-color: var(--tt-bg-color) !important;
+            color: var(--tt-text-color) !important;
+            color-scheme: var(--tt-color-scheme) !important;
+        }
         
         /* 메인 콘텐츠 영역 텍스트 색상 */
-        .main .block-container, .main .block-container * {{
-            color: {text_color} !important;
-        }}
+        .main .block-container, .main .block-container * {
+            color: var(--tt-text-color) !important;
+        }
         
         /* 메인 헤더 스타일 */
-        .main-header {{
+        .main-header {
             background: linear-gradient(90deg, #667eea 0%, #764ba2 100%);
             padding: 2rem;
             border-radius: 10px;
@@ -89,38 +106,38 @@ def apply_theme_styles(theme):
             text-align: center;
             margin-bottom: 2rem;
             box-shadow: 0 4px 6px rgba(0, 0, 0, 0.1);
-        }}
+        }
         
-        .main-header h1 {{
+        .main-header h1 {
             color: white !important;
             margin: 0;
             font-size: 2.5rem;
-        }}
+        }
         
-        .main-header p {{
+        .main-header p {
             color: rgba(255, 255, 255, 0.9) !important;
             margin: 0.5rem 0 0 0;
             font-size: 1.2rem;
-        }}
+        }
         
         /* 사이드바 스타일 - 매우 강력한 색상 적용 */
         [data-testid="stSidebar"],
         section[data-testid="stSidebar"],
         .css-1d391kg,
-        .css-1kyxreq {{
-            background-color: {sidebar_bg} !important;
-        }}
+        .css-1kyxreq {
+            background-color: var(--tt-sidebar-bg) !important;
+        }
         
         [data-testid="stSidebar"] *,
         section[data-testid="stSidebar"] *,
         .css-1d391kg *,
-        .css-1kyxreq * {{
-            color: {text_color} !important;
-        }}
+        .css-1kyxreq * {
+            color: var(--tt-text-color) !important;
+        }
         
-        [data-testid="stSidebar"] .markdown-text-container {{
-            color: {text_color} !important;
-        }}
+        [data-testid="stSidebar"] .markdown-text-container {
+            color: var(--tt-text-color) !important;
+        }
         
         [data-testid="stSidebar"] p, 
         [data-testid="stSidebar"] div, 
@@ -140,99 +157,99 @@ def apply_theme_styles(theme):
         .css-1d391kg,
         .css-1d391kg *,
         .css-1kyxreq,
-        .css-1kyxreq * {{
-            color: {text_color} !important;
-        }}
+        .css-1kyxreq * {
+            color: var(--tt-text-color) !important;
+        }
         
         /* 사이드바 내 텍스트 입력 레이블 */
         [data-testid="stSidebar"] .stTextInput label,
         [data-testid="stSidebar"] .stSelectbox label,
-        section[data-testid="stSidebar"] label {{
-            color: {text_color} !important;
+        section[data-testid="stSidebar"] label {
+            color: var(--tt-text-color) !important;
             font-weight: bold !important;
-        }}
+        }
         
         /* 채팅 메시지 스타일 */
-        .stChatMessage {{
-            background: {chat_bg} !important;
+        .stChatMessage {
+            background: var(--tt-chat-bg) !important;
             border-radius: 10px;
             padding: 1rem;
             margin: 0.5rem 0;
             box-shadow: 0 2px 4px rgba(0,0,0,0.1);
-            border: 1px solid {border_color};
-        }}
+            border: 1px solid var(--tt-border-color);
+        }
         
-        .stChatMessage * {{
-            color: {text_color} !important;
-        }}
+        .stChatMessage * {
+            color: var(--tt-text-color) !important;
+        }
         
         /* 입력창 스타일 */
-        .stTextInput > div > div > input {{
-            background-color: {secondary_bg} !important;
-            color: {text_color} !important;
-            border: 1px solid {border_color} !important;
-        }}
+        .stTextInput > div > div > input {
+            background-color: var(--tt-secondary-bg) !important;
+            color: var(--tt-text-color) !important;
+            border: 1px solid var(--tt-border-color) !important;
+        }
         
-        .stTextInput label {{
-            color: {text_color} !important;
-        }}
+        .stTextInput label {
+            color: var(--tt-text-color) !important;
+        }
         
         /* placeholder 텍스트 색상 (API 키 예시 등) */
-        .stTextInput > div > div > input::placeholder {{
+        .stTextInput > div > div > input::placeholder {
             color: #888888 !important;
             opacity: 0.7 !important;
-        }}
+        }
         
         /* 패스워드 입력창 placeholder */
-        input[type="password"]::placeholder {{
+        input[type="password"]::placeholder {
             color: #888888 !important;
             opacity: 0.7 !important;
-        }}
+        }
         
         /* 패스워드 입력창 눈 아이콘 (비밀번호 보기 버튼) */
         .stTextInput > div > div > button,
         [data-testid="textInputContainer"] button,
-        .stTextInput button {{
-            background-color: {text_color} !important;
-            color: {bg_color} !important;
-            border: 1px solid {border_color} !important;
+        .stTextInput button {
+            background-color: var(--tt-text-color) !important;
+            color: var(--tt-bg-color) !important;
+            border: 1px solid var(--tt-border-color) !important;
             border-radius: 4px !important;
-        }}
+        }
         
         .stTextInput > div > div > button:hover,
         [data-testid="textInputContainer"] button:hover,
-        .stTextInput button:hover {{
-            background-color: {secondary_bg} !important;
-            color: {text_color} !important;
-        }}
+        .stTextInput button:hover {
+            background-color: var(--tt-secondary-bg) !important;
+            color: var(--tt-text-color) !important;
+        }
         
         /* 눈 아이콘 자체 스타일 */
         .stTextInput svg,
-        [data-testid="textInputContainer"] svg {{
-            fill: {bg_color} !important;
-            color: {bg_color} !important;
-        }}
+        [data-testid="textInputContainer"] svg {
+            fill: var(--tt-bg-color) !important;
+            color: var(--tt-bg-color) !important;
+        }
         
         .stTextInput button:hover svg,
-        [data-testid="textInputContainer"] button:hover svg {{
-            fill: {text_color} !important;
-            color: {text_color} !important;
-        }}
+        [data-testid="textInputContainer"] button:hover svg {
+            fill: var(--tt-text-color) !important;
+            color: var(--tt-text-color) !important;
+        }
         
         /* 셀렉트박스 스타일 */
-        .stSelectbox > div > div > div {{
-            background-color: {secondary_bg} !important;
-            color: {text_color} !important;
-        }}
+        .stSelectbox > div > div > div {
+            background-color: var(--tt-secondary-bg) !important;
+            color: var(--tt-text-color) !important;
+        }
         
-        .stSelectbox label {{
-            color: {text_color} !important;
-        }}
+        .stSelectbox label {
+            color: var(--tt-text-color) !important;
+        }
         
         /* 마크다운 텍스트 */
-        .stMarkdown, .stMarkdown * {{
-            color: {text_color} !important;
-        }}
+        .stMarkdown, .stMarkdown * {
+            color: var(--tt-text-color) !important;
+        }
         
         /* 일반 텍스트 요소들 - 모든 곳에 적용 */
         p, div, span, h1, h2, h3, h4, h5, h6, label, 
@@ -240,33 +257,33 @@ def apply_theme_styles(theme):
         .element-container, .element-container *,
         .block-container, .block-container *,
         .css-1kyxreq, .css-1kyxreq *,
-        .css-1d391kg, .css-1d391kg * {{
-            color: {text_color} !important;
-        }}
+        .css-1d391kg, .css-1d391kg * {
+            color: var(--tt-text-color) !important;
+        }
         
         /* 특별히 사이드바의 "🔑 API 키 설정" 텍스트를 위한 스타일 */
         [data-testid="stSidebar"] .stMarkdown h3,
         [data-testid="stSidebar"] h3,
-        section[data-testid="stSidebar"] h3 {{
-            color: {text_color} !important;
+        section[data-testid="stSidebar"] h3 {
+            color: var(--tt-text-color) !important;
             font-size: 1.2rem !important;
             margin: 1rem 0 0.5rem 0 !important;
-        }}
+        }
         
         /* 버튼 스타일 - 테마별 색상 (높은 우선순위) */
         .stApp .stButton > button,
         section[data-testid="stSidebar"] .stButton > button,
         div[data-testid="stSidebar"] .stButton > button,
-        .stButton > button {{
-            background-color: {button_bg} !important;
-            color: {button_text} !important;
-            border: 2px solid {button_bg} !important;
+        .stButton > button {
+            background-color: var(--tt-button-bg) !important;
+            color: var(--tt-button-text) !important;
+            border: 2px solid var(--tt-button-bg) !important;
             border-radius: 8px !important;
             padding: 0.5rem 1rem !important;
             transition: all 0.6s ease !important;
             font-weight: 500 !important;
             box-shadow: none !important;
-        }}
+        }
         
         .stApp .stButton > button:hover,
         section[data-testid="stSidebar"] .stButton > button:hover,
@@ -274,37 +291,37 @@ def apply_theme_styles(theme):
         .stButton > button:hover,
         button:hover,
         [data-testid="stSidebar"] button:hover,
-        .stApp button:hover {{
-            background-color: {button_hover_bg} !important;
-            color: {button_hover_text} !important;
-            border: 2px solid {button_bg} !important;
+        .stApp button:hover {
+            background-color: var(--tt-button-hover-bg) !important;
+            color: var(--tt-button-hover-text) !important;
+            border: 2px solid var(--tt-button-bg) !important;
             transform: translateY(-2px) !important;
             box-shadow: 0 4px 8px rgba(0,0,0,0.2) !important;
-        }}
+        }
         
         /* 호버 시 텍스트 색상 강제 적용 */
         .stButton > button:hover *,
         button:hover *,
         [data-testid="stSidebar"] button:hover *,
-        .stApp button:hover * {{
-            color: {button_hover_text} !important;
-        }}
+        .stApp button:hover * {
+            color: var(--tt-button-hover-text) !important;
+        }
         
         /* 특별한 버튼 ID 선택자로 더 강력하게 */
         button[kind="primary"],
         button[kind="secondary"],
-        button[data-testid] {{
-            background-color: {button_bg} !important;
-            color: {button_text} !important;
-            border: 2px solid {button_bg} !important;
-        }}
+        button[data-testid] {
+            background-color: var(--tt-button-bg) !important;
+            color: var(--tt-button-text) !important;
+            border: 2px solid var(--tt-button-bg) !important;
+        }
         
         button[kind="primary"]:hover,
         button[kind="secondary"]:hover,
-        button[data-testid]:hover {{
-            background-color: {button_hover_bg} !important;
-            color: {button_hover_text} !important;
-        }}
+        button[data-testid]:hover {
+            background-color: var(--tt-button-hover-bg) !important;
+            color: var(--tt-button-hover-text) !important;
+        }
         
         /* 매우 강력한 호버 텍스트 색상 적용 */
         .stButton:hover,
@@ -313,80 +330,80 @@ def apply_theme_styles(theme):
         .stButton:hover button *,
         button:hover span,
         button:hover div,
-        button:hover p {{
-            color: {button_hover_text} !important;
-        }}
+        button:hover p {
+            color: var(--tt-button-hover-text) !important;
+        }
         
         /* 대화 기록 삭제 버튼 특별 스타일 */
         .stButton > button[aria-label*="삭제"], 
         .stButton > button:contains("대화 기록 삭제"),
-        .stButton > button:contains("🗑️") {{
+        .stButton > button:contains("🗑️") {
             background-color: #dc2626 !important;
             color: white !important;
             border: 2px solid #dc2626 !important;
             transition: all 0.8s cubic-bezier(0.4, 0, 0.2, 1) !important;
-        }}
+        }
         
         .stButton > button[aria-label*="삭제"]:hover,
         .stButton > button:contains("대화 기록 삭제"):hover,
-        .stButton > button:contains("🗑️"):hover {{
+        .stButton > button:contains("🗑️"):hover {
             background-color: #b91c1c !important;
             color: white !important;
             border: 2px solid #b91c1c !important;
             transform: translateY(-3px) !important;
             box-shadow: 0 6px 12px rgba(220, 38, 38, 0.6) !important;
-        }}
+        }
         
         /* 테마 전환 버튼 특별 애니메이션 */
         button[key="theme_toggle"],
         .stButton > button:contains("다크 모드"),
         .stButton > button:contains("라이트 모드"),
         .stButton > button:contains("🌙"),
-        .stButton > button:contains("☀️") {{
+        .stButton > button:contains("☀️") {
             transition: all 0.8s cubic-bezier(0.4, 0, 0.2, 1) !important;
-        }}
+        }
         
         button[key="theme_toggle"]:hover,
         .stButton > button:contains("다크 모드"):hover,
         .stButton > button:contains("라이트 모드"):hover,
         .stButton > button:contains("🌙"):hover,
-        .stButton > button:contains("☀️"):hover {{
+        .stButton > button:contains("☀️"):hover {
             transform: translateY(-3px) scale(1.02) !important;
             box-shadow: 0 8px 16px rgba(0,0,0,0.2) !important;
-        }}
+        }
         
         /* 성공/오류 메시지 가독성 개선 */
-        .stSuccess {{
+        .stSuccess {
             background-color: rgba(0, 200, 0, 0.1) !important;
-        }}
+        }
         
-        .stSuccess * {{
+        .stSuccess * {
             color: #00c851 !important;
-        }}
+        }
         
-        .stError {{
+        .stError {
             background-color: rgba(255, 0, 0, 0.1) !important;
-        }}
+        }
         
-        .stError * {{
+        .stError * {
             color: #ff4444 !important;
-        }}
+        }
         
-        .stWarning {{
+        .stWarning {
             background-color: rgba(255, 193, 7, 0.1) !important;
-        }}
+        }
         
-        .stWarning * {{
+        .stWarning * {
             color: #ffbb33 !important;
-        }}
+        }
         
-        .stInfo {{
+        .stInfo {
             background-color: rgba(0, 123, 255, 0.1) !important;
-        }}
+        }
         
-        .stInfo * {{
+        .stInfo * {
             color: #007bff !important;
-        }}
+        }
         
         /* 채팅 입력창 - 매우 강력한 선택자 */
         input[type="text"],
@@ -401,22 +418,22 @@ def apply_theme_styles(theme):
         section[data-testid="main"] input[type="text"],
         .main input[type="text"],
         .stChatInput textarea,
-        .stChatInputContainer textarea {{
-            background-color: {secondary_bg} !important;
-            color: {text_color} !important;
-            border: 1px solid {border_color} !important;
+        .stChatInputContainer textarea {
+            background-color: var(--tt-secondary-bg) !important;
+            color: var(--tt-text-color) !important;
+            border: 1px solid var(--tt-border-color) !important;
             border-radius: 4px !important;
-        }}
+        }
         
         /* 채팅 입력창 placeholder */
         input[type="text"]::placeholder,
         textarea::placeholder,
         .stChatInputContainer input::placeholder,
         .stChatInput input::placeholder,
-        [data-testid="stChatInputContainer"] input::placeholder {{
+        [data-testid="stChatInputContainer"] input::placeholder {
             color: #888888 !important;
             opacity: 0.7 !important;
-        }}
+        }
         
         /* 채팅 입력창 컨테이너 배경 - 매우 강력하게 */
         .stChatInputContainer,
@@ -424,340 +441,254 @@ def apply_theme_styles(theme):
         .stChatInput,
         div[data-testid="stChatInputContainer"],
         .stApp .stChatInputContainer,
-        section[data-testid="main"] div[data-testid="stChatInputContainer"] {{
-            background-color: {bg_color} !important;
-        }}
-        
-        /* 테마별 조건부 스타일 추가 */
-    </style>
-    """ + (f"""
-    <style>
-        /* 라이트 모드 전용 강제 스타일 - 브라우저 다크모드 무시 */
-        * {{
-            color-scheme: light !important;
-        }}
-        html, body {{
-            background: #ffffff !important;
-            color: #262730 !important;
-            color-scheme: light !important;
-        }}
-        .stApp, body, html {{
-            background: #ffffff !important;
-            color: #262730 !important;
-        }}
-        [data-testid="stSidebar"] {{
-            background: #f0f2f6 !important;
-        }}
-        
-        /* 채팅 입력창 강력한 라이트모드 적용 */
-        input, textarea, 
+        section[data-testid="main"] div[data-testid="stChatInputContainer"] {
+            background-color: var(--tt-bg-color) !important;
+        }
+
+        /* 테마 강제 적용 - 브라우저 다크/라이트 모드 무시 */
+        * {
+            color-scheme: var(--tt-color-scheme) !important;
+            --primary-color: var(--tt-text-color) !important;
+            --background-color: var(--tt-bg-color) !important;
+            --secondary-background-color: var(--tt-secondary-bg) !important;
+            --text-color: var(--tt-text-color) !important;
+        }
+        .stApp, [data-testid="stAppViewContainer"], body, html {
+            background: var(--tt-bg-color) !important;
+            color: var(--tt-text-color) !important;
+        }
+        [data-testid="stSidebar"] {
+            background: var(--tt-sidebar-bg) !important;
+        }
+        .main .block-container {
+            background: var(--tt-bg-color) !important;
+            color: var(--tt-text-color) !important;
+        }
+        
+        /* 채팅 입력창 */
+        input, textarea,
         .stApp input, .stApp textarea,
         [data-testid="stChatInputContainer"] input,
         [data-testid="stChatInputContainer"] textarea,
         .stChatInputContainer input,
         .stChatInputContainer textarea,
         .stChatInput input,
-        .stChatInput textarea {{
-            background: #f8f9fa !important;
-            color: #212529 !important;
-            border: 2px solid #dee2e6 !important;
-            border-radius: 8px !important;
-        }}
-        
-        [data-testid="stChatInputContainer"] {{
-            background: #ffffff !important;
-        }}
-        
-        .main .block-container {{
-            background: #ffffff !important;
-            color: #262730 !important;
-        }}
-        
-        /* 모든 input 강제 라이트모드 */
-        input:not([type="submit"]):not([type="button"]) {{
-            background: #f8f9fa !important;
-            color: #212529 !important;
-            border: 2px solid #dee2e6 !important;
-        }}
-    </style>
-    <script>
-        // JavaScript로 강제 라이트모드 적용
-        setTimeout(function() {{
-            const inputs = document.querySelectorAll('input[type="text"], textarea');
-            inputs.forEach(input => {{
-                input.style.setProperty('background', '#f8f9fa', 'important');
-                input.style.setProperty('color', '#212529', 'important');
-                input.style.setProperty('border', '2px solid #dee2e6', 'important');
-            }});
-        }}, 100);
-        
-        // 동적으로 생성되는 요소들도 처리
-        const observer = new MutationObserver(function(mutations) {{
-            mutations.forEach(function(mutation) {{
-                mutation.addedNodes.forEach(function(node) {{
-                    if (node.nodeType === 1) {{
-                        const inputs = node.querySelectorAll ? node.querySelectorAll('input[type="text"], textarea') : [];
-                        inputs.forEach(input => {{
-                            input.style.setProperty('background', '#f8f9fa', 'important');
-                            input.style.setProperty('color', '#212529', 'important');
-                            input.style.setProperty('border', '2px solid #dee2e6', 'important');
-                        }});
-                    }}
-                }});
-            }});
-        }});
-        observer.observe(document.body, {{ childList: true, subtree: true }});
-    </script>
-    """ if theme == "light" else f"""
-    <style>
-        /* 다크 모드 전용 강제 스타일 - 브라우저 라이트모드 무시 */
-        html, body {{
-            background: #0e1117 !important;
-            color: #fafafa !important;
-            color-scheme: dark !important;
-        }}
-        .stApp, body, html {{
-            background: #0e1117 !important;
-            color: #fafafa !important;
-        }}
-        [data-testid="stSidebar"] {{
-            background: #262730 !important;
-        }}
-        .stApp input[type="text"],
-        .stApp textarea {{
-            background: #262730 !important;
-            color: #fafafa !important;
-            border: 1px solid rgba(255, 255, 255, 0.2) !important;
-        }}
-        .stApp [data-testid="stChatInputContainer"] {{
-            background: #0e1117 !important;
-        }}
-        .main .block-container {{
-            background: #0e1117 !important;
-            color: #fafafa !important;
-        }}
-    </style>
-    """)
+        .stChatInput textarea,
+        input:not([type="submit"]):not([type="button"]) {
+            background: var(--tt-input-bg) !important;
+            color: var(--tt-input-text) !important;
+            border: var(--tt-input-border) !important;
+            border-radius: var(--tt-input-radius) !important;
+        }
+        
+        .stApp [data-testid="stChatInputContainer"] {
+            background: var(--tt-bg-color) !important;
+        }
+"""
 
-# 🎯 다양한 도구들 정의
-def create_weather_tool():
-    """날씨 정보 검색 도구"""
-    search = SerpAPIWrapper()
-    
-    def get_weather(location: str) -> str:
-        try:
-            results = search.results(f"{location} 날씨 오늘 섭씨 celsius temperature")
-            organic = results.get("organic_results", [])
-            if organic:
-                weather_info = organic[0].get("snippet", "날씨 정보를 찾을 수 없습니다.")
-                # 화씨를 섭씨로 변환하는 안내 포함
-                return f"🌤️ {location} 날씨: {weather_info}\n\n📌 온도는 섭씨(°C) 기준으로 표시됩니다."
-            return "날씨 정보를 찾을 수 없습니다."
-        except Exception as e:
-            return f"날씨 검색 중 오류 발생: {str(e)}"
-    
-    return Tool(
-        name="weather_search",
-        func=get_weather,
-        description="특정 지역의 날씨 정보를 검색합니다. 사용법: weather_search('서울')"
-    )
+def _css_variables(palette):
+    return "\n".join(f"            --tt-{name}: {value};" for name, value in palette.items())
 
-def create_news_tool():
-    """최신 뉴스 검색 도구"""
-    search = SerpAPIWrapper()
-    
-    def get_news(topic: str) -> str:
-        try:
-            results = search.results(f"{topic} 최신 뉴스")
-            organic = results.get("organic_results", [])
-            news_list = []
-            
-            for i, result in enumerate(organic[:3]):
-                title = result.get("title", "제목 없음")
-                snippet = result.get("snippet", "내용 없음")
-                link = result.get("link", "")
-                news_list.append(f"{i+1}. 📰 {title}\n   {snippet}\n   🔗 {link}")
-            
-            return "\n\n".join(news_list) if news_list else "뉴스를 찾을 수 없습니다."
-        except Exception as e:
-            return f"뉴스 검색 중 오류 발생: {str(e)}"
-    
-    return Tool(
-        name="news_search",
-        func=get_news,
-        description="최신 뉴스를 검색합니다. 사용법: news_search('AI 기술')"
-    )
+@st.cache_resource
+def build_theme_css():
+    """두 테마를 모두 담은 스타일시트 (한 번만 생성, 내용이 항상 같음)
 
-def create_recipe_tool():
-    """요리 레시피 검색 도구"""
-    search = SerpAPIWrapper()
-    
-    def get_recipe(dish: str) -> str:
-        try:
-            results = search.results(f"{dish} 레시피 만들기 요리법")
-            organic = results.get("organic_results", [])
-            recipes = []
-            
-            for result in organic[:2]:
-                title = result.get("title", "")
-                snippet = result.get("snippet", "")
-                if "레시피" in title or "만들기" in title:
-                    recipes.append(f"🍳 {title}\n{snippet}")
-            
-            return "\n\n".join(recipes) if recipes else f"{dish} 레시피를 찾을 수 없습니다."
-        except Exception as e:
-            return f"레시피 검색 중 오류 발생: {str(e)}"
-    
-    return Tool(
-        name="recipe_search",
-        func=get_recipe,
-        description="요리 레시피를 검색합니다. 사용법: recipe_search('김치찌개')"
-    )
+    라이트가 기본이고, 페이지에 .tt-theme-dark 표시 요소가 있으면 다크 변수로 바뀝니다.
+    내용이 매번 같으므로 Streamlit 이 브라우저 캐시 참조로 보내 rerun 마다 다시 전송하지 않습니다.
+    """
+    return f"""<style id="talktalk-theme">
+        :root {{
+{_css_variables(THEME_PALETTES["light"])}
+        }}
+        :root:has(.tt-theme-dark) {{
+{_css_variables(THEME_PALETTES["dark"])}
+        }}
+{THEME_RULES}
+    </style>"""
 
-def create_stock_tool():
-    """주식 정보 검색 도구"""
-    search = SerpAPIWrapper()
-    
-    def get_stock_info(company: str) -> str:
-        try:
-            results = search.results(f"{company} 주식 주가 현재가")
-            organic = results.get("organic_results", [])
-            
-            if organic:
-                stock_info = organic[0].get("snippet", "주식 정보를 찾을 수 없습니다.")
-                return f"📈 {company} 주식 정보: {stock_info}"
-            return f"{company} 주식 정보를 찾을 수 없습니다."
-        except Exception as e:
-            return f"주식 정보 검색 중 오류 발생: {str(e)}"
-    
-    return Tool(
-        name="stock_search",
-        func=get_stock_info,
-        description="주식 정보를 검색합니다. 사용법: stock_search('삼성전자')"
-    )
+def theme_marker(theme):
+    """현재 테마 표시 요소 (rerun 마다 바뀌는 부분은 이것뿐)"""
+    return f'<span class="tt-theme-{theme}"></span>'
 
-def create_translation_tool():
-    """번역 도구"""
-    search = SerpAPIWrapper()
-    
-    def translate_text(text_and_lang: str) -> str:
-        try:
-            results = search.results(f"번역 {text_and_lang}")
-            organic = results.get("organic_results", [])
-            
-            if organic:
-                translation = organic[0].get("snippet", "번역을 찾을 수 없습니다.")
-                return f"🔤 번역 결과: {translation}"
-            return "번역을 찾을 수 없습니다."
-        except Exception as e:
-            return f"번역 중 오류 발생: {str(e)}"
-    
-    return Tool(
-        name="translation_search",
-        func=translate_text,
-        description="텍스트를 번역합니다. 사용법: translation_search('안녕하세요 영어로')"
-    )
+# 💬 채팅 기록 관리
+SESSION_COOKIE = "talktalk_sid"
+SESSION_COOKIE_MAX_AGE = 30 * 24 * 60 * 60  # 초
+
+def get_browser_session_id():
+    """브라우저별 세션 ID (쿠키로 유지되어 새로고침해도 대화가 이어짐)
+
+    URL 에 두면 링크를 공유한 사람에게 대화 기록까지 넘어가므로 쿠키에만 둡니다.
+    """
+    if "session_id" not in st.session_state:
+        session_id = st.context.cookies.get(SESSION_COOKIE, "")
+        if not is_session_id(session_id):
+            session_id = new_session_id()
+            # 서버에서는 쿠키를 쓸 수 없어 브라우저에서 설정
+            st.html(
+                f"<script>document.cookie = '{SESSION_COOKIE}={session_id}; path=/; "
+                f"max-age={SESSION_COOKIE_MAX_AGE}; SameSite=Strict';</script>",
+                unsafe_allow_javascript=True,
+            )
+        # 예전 버전이 URL 에 남긴 sid 는 쓰지 않고 지움
+        if "sid" in st.query_params:
+            del st.query_params["sid"]
+        st.session_state.session_id = session_id
+    return st.session_state.session_id
+
+# ⚡ 한 턴 처리 (에이전트 파이프라인은 chatbot_core.py)
+def error_message(error):
+    return f"죄송해요! 오류가 발생했어요: {str(error)}"
+
+def render_turn(talktalk, user_input, session_id, streaming, tracer):
+    """답변 말풍선을 그리며 한 턴 처리 (스트리밍이면 토큰과 도구 상태를 실시간으로 표시)
+
+    실패하면 같은 말풍선에 오류를 표시하고 예외를 다시 올립니다.
+    """
+    with st.chat_message("assistant"):
+        status = st.empty()
+        placeholder = st.empty()
+        tokens = []
+
+        def on_update(kind, payload):
+            if kind == "token":
+                tokens.append(payload)
+                placeholder.markdown("".join(tokens) + "▌")
+            elif kind == "tool_start":
+                detail = f" ({payload['input']})" if payload["input"] else ""
+                status.caption(f"🔧 {payload['name']} 실행 중...{detail}")
+            elif kind == "tool_end":
+                status.caption(f"✅ {payload['name']} 완료")
+                # 도구 호출 전 중간 토큰은 최종 답변과 섞이지 않도록 비움
+                tokens.clear()
 
-def create_general_search_tool():
-    """일반 검색 도구"""
-    search = SerpAPIWrapper()
-    
-    def general_search(query: str) -> str:
         try:
-            results = search.results(query)
-            organic = results.get("organic_results", [])
-            search_results = []
-            
-            for i, result in enumerate(organic[:3]):
-                title = result.get("title", "제목 없음")
-                snippet = result.get("snippet", "내용 없음")
-                link = result.get("link", "")
-                search_results.append(f"{i+1}. 🔍 {title}\n   {snippet}\n   🔗 {link}")
-            
-            return "\n\n".join(search_results) if search_results else "검색 결과를 찾을 수 없습니다."
+            if streaming:
+                result = asyncio.run(chat_turn(talktalk, user_input, session_id, on_update, tracer))
+            else:
+                with st.spinner("톡톡이가 생각중이에요... 🤔"):
+                    result = asyncio.run(chat_turn(talktalk, user_input, session_id, tracer=tracer))
         except Exception as e:
-            return f"검색 중 오류 발생: {str(e)}"
-    
-    return Tool(
-        name="general_search",
-        func=general_search,
-        description="일반적인 정보를 검색합니다. 다른 도구로 해결되지 않는 질문에 사용합니다."
-    )
+            # 스트리밍 중이던 토큰 대신 오류를 표시
+            status.empty()
+            placeholder.markdown(error_message(e))
+            raise
+        status.empty()
+        placeholder.markdown(result["answer"])
+    return result
 
-# 🤖 AI 에이전트 생성
-def create_ai_agent(api_keys):
-    """톡톡이 AI 에이전트 생성"""
-    
-    # 환경변수 설정
-    os.environ['OPENAI_API_KEY'] = api_keys['openai']
-    os.environ['SERPAPI_API_KEY'] = api_keys['serpapi']
-    
-    # 도구들 생성
-    tools = [
-        create_weather_tool(),
-        create_news_tool(),
-        create_recipe_tool(),
-        create_stock_tool(),
-        create_translation_tool(),
-        create_general_search_tool()
+# 📜 대화 표시
+CHAT_PAGE_SIZE = 40  # 한 번에 표시할 메시지 수
+
+def render_transcript(messages):
+    """최근 메시지만 그리고, 이전 메시지는 '더 보기'로 펼침
+
+    대화가 길어져도 rerun 마다 그리는 요소 수가 일정하게 유지됩니다.
+    """
+    if "visible_messages" not in st.session_state:
+        st.session_state.visible_messages = CHAT_PAGE_SIZE
+
+    hidden = len(messages) - st.session_state.visible_messages
+    if hidden > 0:
+        if st.button(f"⬆️ 이전 대화 {min(hidden, CHAT_PAGE_SIZE)}개 더 보기", key="load_more"):
+            st.session_state.visible_messages += CHAT_PAGE_SIZE
+            st.rerun()
+
+    for message in messages[-st.session_state.visible_messages:]:
+        with st.chat_message(message["role"]):
+            st.markdown(message["content"])
+
+TRACE_PATHS = {
+    "quick": "빠른 답변", "agent": "에이전트", "degraded": "한도 초과 대체 답변", "timeout": "마감 시간 초과",
+}
+
+def format_trace(trace):
+    """턴 요약을 사이드바용 한 줄씩으로 표시"""
+    lines = [
+        f"경로: {TRACE_PATHS.get(trace['path'], trace['path'])} · 전체 {trace['total']:.2f}s",
+        f"🤖 LLM {trace['iterations']}/{trace['max_iterations']}회 · {trace['llm_seconds']:.2f}s "
+        f"(입력 {trace['prompt_tokens']} · 캐시 {trace['cached_tokens']} / 출력 {trace['completion_tokens']} 토큰)",
     ]
-    
-    # LLM 설정
-    llm = ChatOpenAI(
-        model="gpt-4o-mini",
-        temperature=0.7,
-        max_tokens=2000
+    for name, seconds in trace["tools"]:
+        lines.append(f"🔧 {name} {seconds:.2f}s")
+    if trace["tools"]:
+        lines.append(f"📋 스크래치패드 도구 출력 {trace['scratchpad_tokens']} 토큰")
+    if trace["cache_lookups"]:
+        lines.append(f"⚡ 검색 캐시 적중 {trace['cache_hits']}/{trace['cache_lookups']}")
+    for name, seconds in trace["spans"].items():
+        lines.append(f"⏲️ {name} {seconds * 1000:.0f}ms")
+    return "  \n".join(lines)
+
+def format_limits(user):
+    """OpenAI/SerpAPI 사용량과 한도 (전체, 이 세션)"""
+    parts, waiting, rejected = [], 0, 0
+    for resource, label in (("openai", "AI"), ("serpapi", "검색")):
+        stats = get_limiter(resource).stats(user)
+        used = f"{stats['used']}/{stats['quota']}" if stats["quota"] else f"{stats['used']}"
+        mine = f"{stats['user_used']}/{stats['user_quota']}" if stats["user_quota"] else f"{stats['user_used']}"
+        parts.append(f"{label} {used} (내 {mine})")
+        waiting += stats["waiting"]
+        rejected += stats["rejected"]
+    return f"🚦 사용량 {' · '.join(parts)} · 대기 {waiting} · 거절 {rejected}"
+
+def render_stats(session_id, show_detail):
+    """사이드바 통계 (검색/답변 캐시, 사용량, 마지막 턴 응답 시간, 대화 기록 토큰)"""
+    # 검색 캐시 상태
+    cache_stats = get_tool_cache().stats()
+    st.caption(
+        f"⚡ 검색 캐시: 적중 {cache_stats['hits']} / 미스 {cache_stats['misses']} "
+        f"({cache_stats['hit_rate']:.0%})"
     )
-    
-    # 프롬프트 설정
-    prompt = ChatPromptTemplate.from_messages([
-        ("system", """
-안녕하세요! 저는 AI 비서 톡톡이입니다! 🤖✨
-
-저는 다양한 기능을 가진 만능 AI 비서예요:
-
-🌤️ **날씨 정보**: 전국 어디든 실시간 날씨를 섭씨(°C) 온도로 알려드려요
-📰 **최신 뉴스**: 궁금한 분야의 최신 소식을 전해드려요  
-🍳 **요리 레시피**: 맛있는 요리법을 찾아드려요
-📈 **주식 정보**: 관심 있는 기업의 주가를 확인해드려요
-🔤 **번역 서비스**: 다양한 언어로 번역해드려요
-🔍 **통합 검색**: 모든 궁금한 것을 검색해드려요
-
-**사용 팁:**
-- 구체적으로 질문해주세요! (예: "서울 날씨", "김치찌개 레시피")
-- 최신 정보가 필요하면 "최신", "현재", "오늘" 등을 포함해주세요
-- 날씨 정보는 항상 섭씨(°C) 온도로 제공됩니다
-- 여러 질문도 한번에 물어보셔도 돼요!
-
-친근하고 도움이 되는 답변을 드릴게요! 😊
-어떤 도움이 필요하신가요?
-"""),
-        ("placeholder", "{chat_history}"),
-        ("human", "{input}"),
-        ("placeholder", "{agent_scratchpad}"),
-    ])
-    
-    # 에이전트 생성
-    agent = create_tool_calling_agent(llm, tools, prompt)
-    agent_executor = AgentExecutor(
-        agent=agent, 
-        tools=tools, 
-        verbose=False,
-        max_iterations=3,
-        early_stopping_method="generate"
+    saved = sum(tool["saved"] for tool in get_single_flight().stats().values())
+    if saved:
+        st.caption(f"🔗 동시 중복 검색 합침: {saved}회 절약")
+    warm = prefetcher.stats()
+    if warm["refreshed"]:
+        st.caption(
+            f"🔥 미리 가져오기: {warm['refreshed']}회 · 적중 {warm['hits']}/{warm['lookups']} "
+            f"({warm['hit_rate']:.0%})"
+        )
+    st.caption(format_limits(session_id))
+    answer_stats = semantic_cache.stats()
+    st.caption(
+        f"💾 답변 캐시: 적중 {answer_stats['hits']} / 미스 {answer_stats['misses']} "
+        f"({answer_stats['hit_rate']:.0%})"
     )
-    
-    return agent_executor
 
-# 💬 채팅 기록 관리
-def get_session_history(session_id: str):
-    if "session_histories" not in st.session_state:
-        st.session_state.session_histories = {}
-    
-    if session_id not in st.session_state.session_histories:
-        st.session_state.session_histories[session_id] = ChatMessageHistory()
-    
-    return st.session_state.session_histories[session_id]
+    # 마지막 턴 응답 속도
+    if st.session_state.turn_metrics:
+        last = st.session_state.turn_metrics[-1]
+        ttft = f"{last['ttft']:.2f}s" if last["ttft"] is not None else "-"
+        st.caption(f"⏱️ 첫 토큰 {ttft} / 전체 {last['total']:.2f}s")
+
+    # 마지막 턴 구간별 시간
+    if show_detail and st.session_state.turn_metrics:
+        trace = st.session_state.turn_metrics[-1].get("trace")
+        if trace is not None:
+            st.caption(format_trace(trace))
+
+    # 빠른 라우터 적중률
+    routing = router_stats.stats()
+    if routing["total"]:
+        st.caption(
+            f"🚦 빠른 답변 {routing['routed']}/{routing['total']} "
+            f"({routing['hit_rate']:.0%}) · 절약 {routing['saved_seconds']:.1f}s"
+        )
+
+    # 턴당 LLM 호출 수 (빠른 답변은 0회)
+    policy = policy_stats.stats()
+    if policy["turns"]:
+        st.caption(
+            f"🤖 턴당 LLM 호출 {policy['llm_calls_per_turn']:.2f}회 · "
+            f"조기 종료 {policy['exits'].get('complete', 0)} · 중단 {policy['exits'].get('stopped', 0) + policy['exits'].get('deadline', 0)}"
+        )
+
+    # 프롬프트에 들어가는 대화 기록 토큰
+    tokens = last_history_stats(session_id)
+    if tokens is not None:
+        st.caption(
+            f"🧠 대화 기록 {tokens['prompt_tokens']} 토큰 "
+            f"(전체 {tokens['full_tokens']}, 절약 {tokens['saved_tokens']})"
+        )
 
 # 🎨 메인 앱
 def main():
@@ -767,72 +698,19 @@ def main():
     
     if "theme" not in st.session_state:
         st.session_state.theme = "light"
+
+    if "turn_metrics" not in st.session_state:
+        st.session_state.turn_metrics = []
+
+    session_id = get_browser_session_id()
+    # TALKTALK_METRICS_PORT 가 있으면 /metrics 엔드포인트 시작 (프로세스당 한 번)
+    start_metrics_server()
+    # 인기 질의 미리 가져오기 스레드 (TALKTALK_PREFETCH=1, 프로세스당 한 번)
+    start_prefetcher(create_prefetch_tools)
     
-    # 현재 테마에 따른 스타일 적용 (캐시 무효화)
-    import time
-    cache_buster = int(time.time() * 1000)  # 밀리초 타임스탬프
-    theme_css = apply_theme_styles(st.session_state.theme)
-    # CSS에 고유 식별자 추가로 캐시 무효화
-    theme_css = theme_css.replace('<style>', f'<style id="theme-{cache_buster}">')
-    st.markdown(theme_css, unsafe_allow_html=True)
-    
-    # 추가 강제 테마 적용
-    if st.session_state.theme == "light":
-        st.markdown(f"""
-        <style id="force-light-{cache_buster}">
-            /* 라이트 모드 강제 적용 */
-            * {{
-                --primary-color: #262730 !important;
-                --background-color: #ffffff !important;
-                --secondary-background-color: #f0f2f6 !important;
-                --text-color: #262730 !important;
-            }}
-            
-            .stApp, [data-testid="stAppViewContainer"], body, html {{
-                background: #ffffff !important;
-                color: #262730 !important;
-            }}
-            
-            [data-testid="stSidebar"] {{
-                background: #f0f2f6 !important;
-                color: #262730 !important;
-            }}
-            
-            input, textarea {{
-                background: #f0f2f6 !important;
-                color: #262730 !important;
-                border: 1px solid rgba(0,0,0,0.2) !important;
-            }}
-        </style>
-        """, unsafe_allow_html=True)
-    else:
-        st.markdown(f"""
-        <style id="force-dark-{cache_buster}">
-            /* 다크 모드 강제 적용 */
-            * {{
-                --primary-color: #fafafa !important;
-                --background-color: #0e1117 !important;
-                --secondary-background-color: #262730 !important;
-                --text-color: #fafafa !important;
-            }}
-            
-            .stApp, [data-testid="stAppViewContainer"], body, html {{
-                background: #0e1117 !important;
-                color: #fafafa !important;
-            }}
-            
-            [data-testid="stSidebar"] {{
-                background: #262730 !important;
-                color: #fafafa !important;
-            }}
-            
-            input, textarea {{
-                background: #262730 !important;
-                color: #fafafa !important;
-                border: 1px solid rgba(255,255,255,0.2) !important;
-            }}
-        </style>
-        """, unsafe_allow_html=True)
+    # 테마 적용: 고정 스타일시트 + 작은 테마 표시 요소만 전환
+    st.markdown(build_theme_css(), unsafe_allow_html=True)
+    st.markdown(theme_marker(st.session_state.theme), unsafe_allow_html=True)
     
     # 헤더
     st.markdown("""
@@ -882,16 +760,35 @@ def main():
         🔤 **번역 서비스**  
         🔍 **통합 검색**
         """)
-        
+
+        # 스트리밍 모드
+        streaming = st.toggle("⚡ 실시간 답변 (스트리밍)", value=True)
+
+        show_detail = st.toggle("🔬 응답 시간 상세", value=False)
+
+        # 캐시/사용량/응답 시간 통계 (이번 턴이 끝난 뒤 채움)
+        stats_panel = st.empty()
+
         st.markdown("---")
         
         # 대화 초기화 버튼
         if st.button("🗑️ 대화 기록 삭제"):
             st.session_state.messages = []
-            st.session_state.session_histories = {}
+            st.session_state.visible_messages = CHAT_PAGE_SIZE
+            delete_session(session_id)
             st.success("대화 기록이 삭제되었습니다!")
             st.rerun()
-    
+
+    # 첫 화면을 보낸 뒤 LangChain/OpenAI 미리 불러오기 (TALKTALK_WARMUP=1, 프로세스당 한 번)
+    start_warmup()
+
+    chat_area(openai_key, serpapi_key, session_id, streaming)
+
+    # 이번 턴까지 반영한 통계 (턴 전에 그리면 한 턴 늦은 숫자가 보임)
+    with stats_panel.container():
+        render_stats(session_id, show_detail)
+
+def chat_area(openai_key, serpapi_key, session_id, streaming):
     # API 키 확인
     if not openai_key or not serpapi_key:
         st.warning("🔑 OpenAI API 키와 SerpAPI 키를 입력해주세요!")
@@ -902,19 +799,11 @@ def main():
         """)
         return
     
-    # AI 에이전트 생성
+    # AI 에이전트 가져오기 (캐시에 없을 때만 생성)
+    api_keys = {"openai": openai_key, "serpapi": serpapi_key}
+    agent_cache = get_agent_cache()
     try:
-        api_keys = {"openai": openai_key, "serpapi": serpapi_key}
-        agent_executor = create_ai_agent(api_keys)
-        
-        # 메모리 추가
-        agent_with_history = RunnableWithMessageHistory(
-            agent_executor,
-            get_session_history,
-            input_messages_key="input",
-            history_messages_key="chat_history",
-        )
-        
+        talktalk = agent_cache.get(api_keys)
     except Exception as e:
         st.error(f"AI 에이전트 생성 중 오류 발생: {str(e)}")
         return
@@ -935,33 +824,44 @@ def main():
         무엇을 도와드릴까요? 😊
         """
         st.session_state.messages.append({"role": "assistant", "content": welcome_msg})
+        # 새로고침/다른 인스턴스로 옮겨 와도 최근 대화 복원
+        st.session_state.messages.extend(load_transcript(session_id))
     
-    # 이전 메시지 표시
-    for message in st.session_state.messages:
-        with st.chat_message(message["role"]):
-            st.markdown(message["content"])
+    # 이 턴의 구간 기록 (렌더링, 대화 기록 로드, LLM, 도구)
+    # 요청 한도는 브라우저 세션 단위로 셈 (chat_turn)
+    tracer = TurnTracer()
+    with tracer.activate():
+        run_turn(talktalk, agent_cache, api_keys, session_id, streaming, tracer)
+
+def run_turn(talktalk, agent_cache, api_keys, session_id, streaming, tracer):
+    # 이전 메시지 표시 (최근 메시지만)
+    with tracer.span("render"):
+        render_transcript(st.session_state.messages)
     
     # 사용자 입력
     if user_input := st.chat_input("궁금한 것을 물어보세요! 💬"):
-        # 사용자 메시지 추가
+        # 사용자 메시지 추가 (새 메시지만 바로 그리고 전체 rerun 은 하지 않음)
         st.session_state.messages.append({"role": "user", "content": user_input})
+        with st.chat_message("user"):
+            st.markdown(user_input)
+        
+        # AI 응답 생성 (빠른 답변 → 에이전트, 한도 초과면 대체 답변)
+        started = time.perf_counter()
+        try:
+            result = render_turn(talktalk, user_input, session_id, streaming, tracer)
+            st.session_state.turn_metrics.append({
+                "ttft": result["ttft"],
+                "total": time.perf_counter() - started,
+                "trace": result["trace"],
+            })
+            st.session_state.messages.append({"role": "assistant", "content": result["answer"]})
         
-        # AI 응답 생성
-        with st.spinner("톡톡이가 생각중이에요... 🤔"):
-            try:
-                response = agent_with_history.invoke(
-                    {"input": user_input},
-                    config={"configurable": {"session_id": "user_session"}}
-                )
-                ai_response = response['output']
-                st.session_state.messages.append({"role": "assistant", "content": ai_response})
-                
-            except Exception as e:
-                error_msg = f"죄송해요! 오류가 발생했어요: {str(e)}"
-                st.session_state.messages.append({"role": "assistant", "content": error_msg})
-        
-        # 메시지 추가 후 페이지 재실행
-        st.rerun()
+        except Exception as e:
+            # 잘못된 키 등으로 망가진 에이전트만 다음 턴에 다시 생성
+            if agent_is_broken(e):
+                agent_cache.invalidate(api_keys)
+            # 오류는 render_turn 이 이미 이번 답변 말풍선에 표시함
+            st.session_state.messages.append({"role": "assistant", "content": error_message(e)})
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,62 @@
+"""질문/도구 입력에서 지명, 종목, 번역 요청을 뽑는 함수 테스트
+
+    $ python -m pytest -q tests
+"""
+import pytest
+
+from stock_quotes import extract_listings
+from translation import parse_request
+from weather import extract_places
+
+def place_names(text):
+    return [place["name"] for place in extract_places(text)]
+
+def tickers(text):
+    return [listing["ticker"] for listing in extract_listings(text)]
+
+# 🌤️ 지명
+@pytest.mark.parametrize("text, names", [
+    ("서울 날씨", ["서울"]),
+    ("서울의 기온", ["서울"]),
+    ("부산이랑 제주 날씨 알려줘", ["부산", "제주"]),
+    ("부산에서 제주도까지 날씨", ["부산", "제주"]),
+    ("강남 날씨", ["서울 강남"]),
+    ("서울 강남 날씨", ["서울 강남"]),
+    ("광주광역시 날씨", ["광주광역시"]),
+    ("경기 광주 날씨", ["경기 광주"]),
+])
+def test_extract_places(text, names):
+    assert place_names(text) == names
+
+@pytest.mark.parametrize("text", [
+    "광주 날씨",         # 광주광역시와 경기 광주 중 어디인지 모름
+    "서울대 근처 맛집",  # 단어 경계 밖의 지명은 무시
+])
+def test_extract_places_skips_ambiguous_or_partial_names(text):
+    assert place_names(text) == []
+
+# 📈 종목
+@pytest.mark.parametrize("text, expected", [
+    ("삼성전자 주가", ["005930"]),
+    ("삼성 전자", ["005930"]),
+    ("삼성전자랑 SK하이닉스 시세", ["005930", "000660"]),
+    ("애플 주식", ["AAPL"]),
+    ("코스피 지수", ["KS11"]),
+])
+def test_extract_listings(text, expected):
+    assert tickers(text) == expected
+
+@pytest.mark.parametrize("text", ["삼성전자서비스 주가", "삼성전자우 주가"])
+def test_extract_listings_needs_a_word_boundary(text):
+    assert tickers(text) == []
+
+# 🔤 번역 요청
+@pytest.mark.parametrize("text, expected", [
+    ("안녕하세요를 영어로", (["안녕하세요"], "영어")),
+    ("'감사합니다', '사랑해요' 일본어로 번역해줘", (["감사합니다", "사랑해요"], "일본어")),
+    ("hello to Korean", (["hello"], "한국어")),
+    ("번역 좋은 아침", (["좋은 아침"], "영어")),  # 언어가 없으면 한국어 → 영어
+    ("줄1\n줄2 영어로", (["줄1", "줄2"], "영어")),
+])
+def test_parse_request(text, expected):
+    assert parse_request(text) == expected
@@ -0,0 +1,91 @@
+"""rate_limit.py 단위 테스트 (가짜 시계로, 실제로 기다리지 않음)
+
+    $ python -m pytest -q tests
+"""
+import pytest
+
+import rate_limit
+from rate_limit import QuotaExceeded, RateLimiter, TokenBucket
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    # acquire() 가 줄을 서는 동안 자는 시간만큼 시계를 앞으로
+    monkeypatch.setattr(rate_limit.time, "sleep", clock.sleep)
+    return clock
+
+# 🪣 토큰 버킷
+def test_bucket_refills_at_rate():
+    bucket = TokenBucket(rate=2, capacity=2, now=0.0)
+    bucket.take()
+    bucket.take()
+    assert bucket.wait_time(0.0) == pytest.approx(0.5)
+    assert bucket.wait_time(0.25) == pytest.approx(0.25)
+    assert bucket.wait_time(0.5) == 0.0
+
+def test_bucket_caps_at_capacity():
+    bucket = TokenBucket(rate=1, capacity=3, now=0.0)
+    bucket.take()
+    assert bucket.wait_time(100.0) == 0.0
+    assert bucket.tokens == 3
+
+# 🚶 줄 서기
+def test_queued_call_is_admitted_within_max_wait(clock):
+    limiter = RateLimiter("openai", rate=1, burst=1, max_wait=2, queue=4, clock=clock)
+    limiter.acquire("a")
+    limiter.acquire("a")
+    assert clock.now == pytest.approx(1.0)
+    stats = limiter.stats("a")
+    assert (stats["admitted"], stats["queued"], stats["waiting"], stats["rejected"]) == (2, 1, 0, 0)
+
+def test_call_is_rejected_when_token_comes_after_max_wait(clock):
+    limiter = RateLimiter("openai", rate=1, burst=1, max_wait=0.5, queue=4, clock=clock)
+    limiter.acquire("a")
+    with pytest.raises(QuotaExceeded) as raised:
+        limiter.acquire("a")
+    assert raised.value.reason == "rate"
+    assert raised.value.retry_after == pytest.approx(1.0)
+    assert clock.now == 0.0  # 기다려도 소용없으면 바로 거절
+    assert limiter.stats("a")["rejected"] == 1
+
+def test_full_queue_rejects_immediately(clock):
+    limiter = RateLimiter("openai", rate=1, burst=1, max_wait=10, queue=1, clock=clock)
+    limiter.acquire("a")
+    limiter._enter_queue(False)  # 다른 호출 하나가 이미 줄을 선 상태
+    with pytest.raises(QuotaExceeded) as raised:
+        limiter.acquire("b")
+    assert raised.value.reason == "queue"
+    assert limiter.stats()["waiting"] == 1
+
+# 👤 사용자별 할당량
+def test_user_quota_is_per_user(clock):
+    limiter = RateLimiter("serpapi", user_quota=2, period=60, clock=clock)
+    limiter.acquire("a")
+    limiter.acquire("a")
+    with pytest.raises(QuotaExceeded) as raised:
+        limiter.acquire("a")
+    assert raised.value.reason == "user_quota"
+    assert raised.value.user == "a"
+
+    limiter.acquire("b")  # 다른 사용자는 그대로 쓸 수 있음
+    assert limiter.stats("a")["user_used"] == 2
+    assert limiter.stats("b")["user_used"] == 1
+
+def test_user_quota_resets_after_period(clock):
+    limiter = RateLimiter("serpapi", user_quota=1, period=60, clock=clock)
+    limiter.acquire("a")
+    with pytest.raises(QuotaExceeded):
+        limiter.acquire("a")
+    clock.now = 60.0
+    limiter.acquire("a")
+    assert limiter.stats("a")["user_used"] == 1
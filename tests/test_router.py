@@ -0,0 +1,45 @@
+"""router.classify 테스트 (LLM 없이 바로 도구를 부를 질문 고르기)
+
+    $ python -m pytest -q tests
+"""
+import pytest
+
+from router import classify, small_talk
+
+@pytest.mark.parametrize("query, expected", [
+    ("서울 날씨", ("weather_search", "서울")),
+    ("제주 날씨 어때?", ("weather_search", "제주")),
+    ("삼성전자 주가 알려줘", ("stock_search", "삼성전자")),
+    ("이마트 주가", ("stock_search", "이마트")),
+    ("김치찌개 레시피", ("recipe_search", "김치찌개")),
+    ("AI 뉴스", ("news_search", "AI")),
+    ("나는 학생이에요를 영어로 번역해줘", ("translation_search", "나는 학생이에요를 영어로")),
+])
+def test_single_tool_questions_are_routed(query, expected):
+    assert classify(query) == expected
+
+@pytest.mark.parametrize("query", [
+    "서울 날씨랑 삼성전자 주가",  # 여러 의도
+    "내일 서울 날씨",              # 현재가 아닌 시점
+    "서울이랑 부산 날씨 비교",     # 비교
+    "오늘 날씨",                   # 지역 없음
+])
+def test_ambiguous_questions_go_to_the_agent(query):
+    assert classify(query) is None
+
+@pytest.mark.parametrize("query", [
+    "그 뉴스",
+    "그 사람 뉴스",
+    "거기 날씨",
+    "아까 그거 뉴스",
+    "내 주식 시세",
+    "우리 동네 날씨",
+    "내 이름을 영어로",
+    "그거 영어로 번역해줘",
+])
+def test_questions_about_earlier_turns_or_the_user_go_to_the_agent(query):
+    assert classify(query) is None
+
+def test_small_talk():
+    assert small_talk("안녕하세요 톡톡아!") is not None
+    assert small_talk("안녕하세요 서울 날씨") is None
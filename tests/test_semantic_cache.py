@@ -0,0 +1,50 @@
+"""semantic_cache.py 테스트 (공유 답변 캐시에 넣어도 되는 질문, 정확히 같아야 하는 표현)
+
+    $ python -m pytest -q tests
+"""
+import pytest
+
+from semantic_cache import SemanticCache, facets, grounded
+
+@pytest.mark.parametrize("question", ["서울 날씨 알려줘", "AI 뉴스", "삼성전자 주가"])
+def test_tool_questions_are_cacheable(question):
+    assert SemanticCache.cacheable(question)
+
+@pytest.mark.parametrize("question", [
+    "안녕",            # 도구 질문이 아님
+    "내 주식 시세",    # 사용자 자신
+    "제 일정 뉴스",
+    "아까 그 뉴스",    # 앞선 대화
+    "그거 다시 알려줘",
+])
+def test_personal_or_referential_questions_are_not_cacheable(question):
+    assert not SemanticCache.cacheable(question)
+
+@pytest.mark.parametrize("question, expected", [
+    ("서울 날씨", {("place", "서울")}),
+    ("내일 서울 날씨", {("place", "서울"), ("time", "내일")}),
+    ("3일 후 서울 날씨", {("number", "3"), ("place", "서울"), ("time", "3일후")}),
+    ("서울이랑 부산 날씨", {("place", "서울"), ("place", "부산")}),
+    ("삼성전자 주가", {("ticker", "005930")}),
+    ("영어로 번역", {("language", "영어")}),
+])
+def test_facets(question, expected):
+    assert facets(question) == expected
+
+def test_answers_match_only_with_the_same_facets():
+    cache = SemanticCache()
+    cache.store("서울 날씨 알려줘", "서울: 맑음")
+    assert cache.lookup("오늘 서울 날씨 어때") == "서울: 맑음"
+    assert cache.lookup("내일 서울 날씨 알려줘") is None
+    assert cache.lookup("부산 날씨 알려줘") is None
+
+def test_tool_inputs_must_come_from_the_question():
+    assert grounded("부산 날씨 어때?", ["부산"])
+    assert grounded("서울이랑 부산 날씨", ["서울, 부산"])
+    assert not grounded("날씨 어때?", ["부산"])  # 대화 기록에서 가져온 지역
+
+def test_answer_for_a_place_from_chat_history_is_not_stored():
+    cache = SemanticCache()
+    cache.store("날씨 어때?", "부산: 맑음 21도", tool_inputs=["부산"])
+    assert cache.lookup("오늘 날씨 어때?") is None
+    assert cache.stats()["entries"] == 0
@@ -0,0 +1,116 @@
+"""tool_cache.py 단위 테스트 (TTL 캐시, single-flight, 만료된 결과로 대체)
+
+    $ python -m pytest -q tests
+"""
+import threading
+
+import pytest
+
+from rate_limit import QuotaExceeded
+from tool_cache import CachedSearch, SingleFlight, TTLCache, normalize_query
+
+RESULTS = {"organic_results": [{"title": "제목", "snippet": "내용", "link": "https://example.com"}]}
+
+class FakeBackend:
+    def __init__(self, response=RESULTS):
+        self.response = response
+        self.queries = []
+
+    def results(self, query):
+        self.queries.append(query)
+        if isinstance(self.response, Exception):
+            raise self.response
+        return self.response
+
+def cached_search(backend, cache=None):
+    return CachedSearch("news_search", backend, cache=cache or TTLCache(), flight=SingleFlight())
+
+# 🗂️ TTL 캐시
+def test_expired_entry_is_a_miss_but_kept_for_stale_reads():
+    cache = TTLCache()
+    cache.set("fresh", 1, ttl=60)
+    cache.set("expired", 2, ttl=0)
+    assert cache.get("fresh") == 1
+    assert cache.get("expired") is None
+    assert cache.get_stale("expired") == 2
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+def test_least_recently_used_entry_is_evicted_first():
+    cache = TTLCache(max_entries=2)
+    cache.set("a", 1, ttl=60)
+    cache.set("b", 2, ttl=60)
+    cache.get("a")
+    cache.set("c", 3, ttl=60)
+    assert cache.get_stale("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+
+def test_normalize_query_ignores_case_spacing_and_punctuation():
+    assert normalize_query("  AI   뉴스?! ") == normalize_query("ai 뉴스") == "ai 뉴스"
+
+# 🔍 CachedSearch
+def test_cached_search_reuses_normalized_query():
+    backend = FakeBackend()
+    search = cached_search(backend)
+    search.results("AI 뉴스")
+    search.results("ai  뉴스?")
+    assert backend.queries == ["AI 뉴스"]
+
+def test_error_response_is_not_cached():
+    backend = FakeBackend({"error": "Invalid API key"})
+    search = cached_search(backend)
+    search.results("AI 뉴스")
+    search.results("AI 뉴스")
+    assert len(backend.queries) == 2
+
+def test_quota_exceeded_falls_back_to_stale_result():
+    cache = TTLCache()
+    search = cached_search(FakeBackend(), cache)
+    search.results("AI 뉴스")
+    # 만료시키고 한도 초과 상황으로
+    cache.set(("news_search", "ai 뉴스"), cache.get_stale(("news_search", "ai 뉴스")), ttl=0)
+    search.backend = FakeBackend(QuotaExceeded("serpapi", "rate", 1.0))
+    assert search.results("AI 뉴스") == RESULTS
+
+def test_quota_exceeded_without_stale_result_is_raised():
+    search = cached_search(FakeBackend(QuotaExceeded("serpapi", "quota")))
+    with pytest.raises(QuotaExceeded):
+        search.results("AI 뉴스")
+
+# 🛫 single-flight
+def test_single_flight_shares_one_call():
+    flight = SingleFlight()
+    started, release = threading.Event(), threading.Event()
+    calls, results = [], []
+
+    def slow():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return "결과"
+
+    leader = threading.Thread(target=lambda: results.append(flight.do("news_search", "k", slow)))
+    leader.start()
+    started.wait(5)
+    follower = threading.Thread(target=lambda: results.append(flight.do("news_search", "k", slow)))
+    follower.start()
+    # 뒤따른 호출이 줄을 설 때까지 기다렸다가 먼저 온 호출을 끝냄
+    while flight.stats().get("news_search", {}).get("saved", 0) == 0:
+        threading.Event().wait(0.01)
+    release.set()
+    leader.join(5)
+    follower.join(5)
+
+    assert len(calls) == 1
+    assert sorted(results) == [("결과", False), ("결과", True)]
+    assert flight.stats() == {"news_search": {"upstream": 1, "saved": 1}}
+
+def test_single_flight_shares_the_error_and_forgets_the_key():
+    flight = SingleFlight()
+
+    def fail():
+        raise RuntimeError("upstream down")
+
+    with pytest.raises(RuntimeError):
+        flight.do("news_search", "k", fail)
+    # 끝난 호출은 남지 않으므로 다음 호출은 새로 실행
+    assert flight.do("news_search", "k", lambda: "ok") == ("ok", False)
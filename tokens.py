@@ -0,0 +1,34 @@
+"""톡톡이 토큰 계산
+
+대화 기록 예산(history.py), 도구 출력 예산(compaction.py), 턴 추적(metrics.py)이 함께
+씁니다.
+"""
+from functools import lru_cache
+
+@lru_cache(maxsize=1)
+def _get_encoding():
+    try:
+        import tiktoken
+        return tiktoken.get_encoding("o200k_base")
+    except Exception:
+        # 오프라인 등으로 인코딩 파일을 받을 수 없으면 근사치 사용
+        return None
+
+def count_tokens(text):
+    """gpt-4o 계열 토큰 수 (tiktoken 이 없으면 근사치)"""
+    if not text:
+        return 0
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text))
+    ascii_chars = sum(1 for ch in text if ch.isascii())
+    return (len(text) - ascii_chars) + (ascii_chars + 3) // 4
+
+def truncate_to_tokens(text, max_tokens):
+    if count_tokens(text) <= max_tokens:
+        return text
+    encoding = _get_encoding()
+    if encoding is not None:
+        return encoding.decode(encoding.encode(text)[:max_tokens]) + " …(생략)"
+    # 근사치 모드: 한글 1글자 ≈ 1토큰 기준으로 자름
+    return text[:max_tokens] + " …(생략)"
@@ -0,0 +1,284 @@
+"""톡톡이 도구용 검색 결과 캐시
+
+모든 사용자/세션이 공유하는 프로세스 전역 캐시입니다.
+Streamlit 은 rerun 마다 스크립트를 다시 실행하지만, import 된 모듈은
+sys.modules 에 남아 있으므로 여기 둔 객체는 프로세스 수명 동안 유지됩니다.
+"""
+import contextvars
+import json
+import os
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from compaction import project
+from metrics import TOOL_UPSTREAM, record_cache
+from rate_limit import QuotaExceeded, current_user
+from search_client import SerpAPISearchBackend
+
+# 도구별 캐시 유효 시간 (초)
+TOOL_TTLS = {
+    "stock_search": 60,             # 주가는 자주 바뀜
+    "weather_search": 10 * 60,
+    "news_search": 10 * 60,
+    "general_search": 30 * 60,
+    "recipe_search": 24 * 60 * 60,  # 레시피/번역은 거의 바뀌지 않음
+    "translation_search": 24 * 60 * 60,
+}
+DEFAULT_TTL = 5 * 60
+
+_PUNCTUATION = re.compile(r"[?!.,~…]+")
+_SPACES = re.compile(r"\s+")
+
+def normalize_query(query):
+    """캐시 키용 질의 정규화 (대소문자, 공백, 문장부호 차이 무시)"""
+    query = unicodedata.normalize("NFKC", str(query)).lower()
+    query = _PUNCTUATION.sub(" ", query)
+    return _SPACES.sub(" ", query).strip()
+
+def _estimate_size(value):
+    try:
+        return len(json.dumps(value, ensure_ascii=False, default=str).encode("utf-8"))
+    except (TypeError, ValueError):
+        return len(str(value).encode("utf-8"))
+
+class TTLCache:
+    """TTL 만료 + 메모리 상한 LRU 캐시"""
+
+    def __init__(self, max_bytes=16 * 1024 * 1024, max_entries=5000):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()  # key -> (만료 시각, 크기, 값)
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """값 반환 (없거나 만료되었으면 None)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[2]
+            # 만료된 항목은 한도 초과 때 get_stale() 로 쓸 수 있도록 LRU 로 밀려날 때까지 둠
+            self.misses += 1
+            return None
+
+    def get_stale(self, key):
+        """만료 여부와 관계없이 값 반환 (없으면 None, 적중으로 세지 않음)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry[2] if entry is not None else None
+
+    def set(self, key, value, ttl):
+        size = _estimate_size(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + ttl, size, value)
+            self._bytes += size
+            while self._bytes > self.max_bytes or len(self._entries) > self.max_entries:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / total if total else 0.0,
+            }
+
+    def _remove(self, key):
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+# 프로세스 전역 캐시
+_tool_cache = TTLCache()
+
+def get_tool_cache():
+    return _tool_cache
+
+# 미리 가져오기(prefetch) 중에는 캐시를 읽지 않고 새로 가져와 덮어씀
+_refreshing = contextvars.ContextVar("talktalk_cache_refresh", default=None)
+
+@contextmanager
+def refreshing():
+    """이 블록은 캐시를 새로 채움, {"requests": 실제로 보낸 외부 요청 수} 를 돌려줌"""
+    refresh = {"requests": 0}
+    token = _refreshing.set(refresh)
+    try:
+        yield refresh
+    finally:
+        _refreshing.reset(token)
+
+def is_refreshing():
+    return _refreshing.get() is not None
+
+def record_upstream():
+    """외부 요청(검색, 날씨, 시세) 한 번 기록 (미리 가져오기 예산용, 그 밖에는 무시)"""
+    refresh = _refreshing.get()
+    if refresh is not None:
+        refresh["requests"] += 1
+
+def cache_lookup(cache, key, name):
+    """캐시 조회 + 적중 기록 (미리 가져오는 중이면 항상 미스, 기록하지 않음)"""
+    if is_refreshing():
+        return None
+    value = cache.get(key)
+    record_cache(name, value is not None)
+    return value
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+class SingleFlight:
+    """같은 키의 동시 호출을 하나로 합침
+
+    먼저 온 호출만 실제로 실행하고, 그동안 들어온 같은 키의 호출은
+    기다렸다가 같은 결과(또는 같은 예외)를 받습니다.
+    """
+
+    def __init__(self):
+        self.upstream = {}  # 도구 -> 실제로 실행한 호출 수
+        self.shared = {}    # 도구 -> 다른 호출의 결과를 나눠 받은 수 (절약한 호출)
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, tool_name, key, func):
+        """(결과, 다른 호출의 결과를 나눠 받았는지) 반환"""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.upstream[tool_name] = self.upstream.get(tool_name, 0) + 1
+            else:
+                self.shared[tool_name] = self.shared.get(tool_name, 0) + 1
+        TOOL_UPSTREAM.inc(tool=tool_name, result="upstream" if leader else "shared")
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+        try:
+            call.result = func()
+            return call.result, False
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def stats(self):
+        with self._lock:
+            return {
+                tool_name: {"upstream": count, "saved": self.shared.get(tool_name, 0)}
+                for tool_name, count in self.upstream.items()
+            }
+
+# 프로세스 전역 single-flight
+_single_flight = SingleFlight()
+
+def get_single_flight():
+    return _single_flight
+
+class StubSearchBackend:
+    """SerpAPI 없이 동작하는 로컬 검색 백엔드 (테스트/벤치마크용)"""
+
+    def __init__(self, fixtures=None, latency=0.0, num_results=3):
+        self.fixtures = fixtures or {}
+        self.latency = latency
+        self.num_results = num_results
+        self.calls = 0
+
+    def results(self, query):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        if query in self.fixtures:
+            return self.fixtures[query]
+        return {
+            "organic_results": [
+                {
+                    "title": f"{query} 레시피 만들기 결과 {i + 1}",
+                    "snippet": f"{query} 에 대한 검색 결과 {i + 1} 입니다. 현재 기온 21°C",
+                    "link": f"https://example.com/search/{i + 1}",
+                }
+                for i in range(self.num_results)
+            ]
+        }
+
+def create_search_backend(api_key=None):
+    """환경변수 TALKTALK_SEARCH_BACKEND=stub 이면 로컬 백엔드, 아니면 공유 클라이언트로 SerpAPI"""
+    if os.environ.get("TALKTALK_SEARCH_BACKEND") == "stub":
+        return StubSearchBackend()
+    return SerpAPISearchBackend(api_key=api_key)
+
+class CachedSearch:
+    """검색 백엔드 앞단의 캐시 (SerpAPIWrapper 와 같은 results() 인터페이스)"""
+
+    def __init__(self, tool_name, backend=None, cache=None, ttl=None, flight=None):
+        self.tool_name = tool_name
+        self.backend = backend if backend is not None else create_search_backend()
+        self.cache = cache if cache is not None else get_tool_cache()
+        self.ttl = ttl if ttl is not None else TOOL_TTLS.get(tool_name, DEFAULT_TTL)
+        self.flight = flight if flight is not None else get_single_flight()
+
+    def results(self, query):
+        key = (self.tool_name, normalize_query(query))
+        cached = cache_lookup(self.cache, key, self.tool_name)
+        if cached is not None:
+            return cached
+        try:
+            # 같은 정규화 질의가 동시에 들어오면 검색은 한 번만
+            try:
+                results, shared = self.flight.do(self.tool_name, key, lambda: self._fetch(key, query))
+            except QuotaExceeded as error:
+                # 다른 사용자의 한도에 걸린 검색이면 내 한도로 다시 시도
+                if error.user in (None, current_user()):
+                    raise
+                results, shared = self._fetch(key, query), False
+            # 다른 사용자의 키로 받은 오류(잘못된 키, 한도 초과 등)는 나눠 갖지 않고 내 키로 다시 요청
+            if shared and isinstance(results, dict) and "error" in results:
+                return self._fetch(key, query)
+            return results
+        except QuotaExceeded:
+            # 한도를 넘었으면 만료된 결과라도 있으면 그것으로 답함
+            stale = self.cache.get_stale(key)
+            if stale is None:
+                raise
+            return stale
+
+    def _fetch(self, key, query):
+        # 도구가 쓰는 필드만 남겨 캐시 (원본 JSON 은 여기서 한 번만 훑음)
+        results = project(self.tool_name, self.backend.results(query))
+        record_upstream()
+        # 오류 응답은 캐시하지 않음
+        if isinstance(results, dict) and "error" not in results:
+            self.cache.set(key, results, self.ttl)
+        return results
@@ -0,0 +1,69 @@
+"""톡톡이 도구 비동기 실행
+
+AgentExecutor 의 비동기 경로(ainvoke / astream_events)는 한 단계에서 나온
+여러 도구 호출을 asyncio.gather 로 동시에 실행합니다. 여기서는 각 도구의
+coroutine= 구현을 만들어 턴별 동시 실행 수와 호출당 시간 제한을 적용합니다.
+
+스레드 풀은 둘입니다.
+- 도구 풀: 에이전트의 도구 호출. 시간이 초과된 호출도 스레드는 끝날 때까지 돌므로
+  턴 여러 개가 동시에 도구를 불러도 남도록 넉넉하게 둠
+- 블로킹 풀: run_blocking (빠른 답변과 그 안의 요청 한도 대기, 에이전트 생성 등).
+  이 작업이 도구 자리를 차지하지 않도록 따로 둠
+"""
+import asyncio
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, nullcontext
+
+TOOL_CONCURRENCY = 4   # 한 턴에서 동시에 실행할 도구 수
+TOOL_TIMEOUT = 15.0    # 도구 호출당 시간 제한 (초)
+TOOL_THREADS = 64      # 모든 턴이 함께 쓰는 도구 스레드 수
+BLOCKING_THREADS = 16
+
+# 프로세스 전역 스레드 풀 (asyncio.run 이 끝날 때 기다리지 않도록 기본 executor 대신 사용)
+_tool_executor = ThreadPoolExecutor(max_workers=TOOL_THREADS, thread_name_prefix="talktalk-tool")
+_blocking_executor = ThreadPoolExecutor(
+    max_workers=BLOCKING_THREADS, thread_name_prefix="talktalk-blocking"
+)
+
+# 실행 중인 턴의 도구 자리 (턴마다 새로 만듦, 공유 에이전트라 컨텍스트에 둠)
+_turn_slots = contextvars.ContextVar("talktalk_tool_slots", default=None)
+
+@contextmanager
+def tool_slots(limit=TOOL_CONCURRENCY):
+    """이 블록(한 턴)의 도구 호출을 동시에 limit 개까지만 실행"""
+    token = _turn_slots.set(asyncio.Semaphore(limit))
+    try:
+        yield
+    finally:
+        _turn_slots.reset(token)
+
+def make_async_tool(func, timeout=TOOL_TIMEOUT):
+    """동기 도구 함수를 Tool(coroutine=...) 용 비동기 함수로 변환
+
+    tool_slots() 밖에서 부르면 동시 실행 수를 제한하지 않습니다.
+    """
+
+    async def run(*args, **kwargs):
+        loop = asyncio.get_running_loop()
+        async with _turn_slots.get() or nullcontext():
+            # 턴 추적기(contextvar)가 작업 스레드에서도 보이도록 컨텍스트를 복사해 실행
+            context = contextvars.copy_context()
+            future = loop.run_in_executor(
+                _tool_executor, lambda: context.run(func, *args, **kwargs)
+            )
+            try:
+                return await asyncio.wait_for(future, timeout)
+            except asyncio.TimeoutError:
+                return f"⏱️ 도구 응답 시간이 초과되었습니다 ({timeout:g}초)."
+
+    run.__name__ = f"a{func.__name__}"
+    return run
+
+async def run_blocking(func, *args, **kwargs):
+    """동기 함수를 블로킹 풀에서 실행 (이벤트 루프를 막지 않고, 컨텍스트는 그대로 전달)"""
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(
+        _blocking_executor, lambda: context.run(func, *args, **kwargs)
+    )
@@ -0,0 +1,189 @@
+"""톡톡이 번역
+
+"번역 {문장}" 을 웹 검색해 스니펫을 돌려주던 대신, 번역 백엔드에 직접 맡깁니다.
+
+- 입력에서 번역할 문장(여러 개 가능)과 목표 언어를 뽑아냄
+  ("안녕하세요를 영어로", "'감사합니다', '사랑해요' 일본어로 번역해줘")
+- TranslationBackend: translate(texts, target) 로 여러 문장을 한 번에 번역
+  - LLMTranslationBackend: 짧은 고정 프롬프트로 LLM 직접 호출 (기본)
+  - LocalTranslationBackend: transformers 로컬 모델 (설치되어 있을 때만)
+- 번역 메모리: (목표 언어, 문장) 별 프로세스 전역 캐시라 반복되는 문장은 공짜
+  (문장은 공백만 정리해 그대로 비교, 문장부호/대소문자가 다르면 다른 문장)
+
+환경변수 TALKTALK_TRANSLATION_BACKEND=llm|local 로 백엔드를 고릅니다.
+"""
+import os
+import re
+
+from metrics import TRANSLATION_TAG
+from tool_cache import TOOL_TTLS, TTLCache, cache_lookup
+
+TRANSLATION_MEMORY_TTL = TOOL_TTLS["translation_search"]
+TRANSLATION_MAX_TOKENS = 800
+LOCAL_MODEL = "facebook/nllb-200-distilled-600M"
+
+# 언어 이름 → (코드, 영어 이름, NLLB 코드)
+LANGUAGES = {
+    "영어": ("en", "English", "eng_Latn"),
+    "한국어": ("ko", "Korean", "kor_Hang"),
+    "일본어": ("ja", "Japanese", "jpn_Jpan"),
+    "중국어": ("zh", "Chinese (Simplified)", "zho_Hans"),
+    "프랑스어": ("fr", "French", "fra_Latn"),
+    "독일어": ("de", "German", "deu_Latn"),
+    "스페인어": ("es", "Spanish", "spa_Latn"),
+    "베트남어": ("vi", "Vietnamese", "vie_Latn"),
+    "러시아어": ("ru", "Russian", "rus_Cyrl"),
+}
+_ALIASES = {
+    "english": "영어", "korean": "한국어", "japanese": "일본어", "chinese": "중국어",
+    "french": "프랑스어", "german": "독일어", "spanish": "스페인어",
+    "vietnamese": "베트남어", "russian": "러시아어",
+    "한글": "한국어", "일어": "일본어", "중국말": "중국어", "불어": "프랑스어",
+}
+
+_LANGUAGE_NAMES = "|".join(sorted(list(LANGUAGES) + list(_ALIASES), key=len, reverse=True))
+# 문장 끝의 "...(을|를) 영어로 번역해줘", "... in English", "translate ... to English"
+_TARGET = re.compile(
+    rf"\s*(?:(?:을|를)\s*)?(?P<lang>{_LANGUAGE_NAMES})\s*(?:로|으로)?\s*"
+    r"(?:번역(?:해\s*줘|해\s*주세요|해\s*줄래|하면|해)?)?\s*[?!.~]*$",
+    re.IGNORECASE,
+)
+_ENGLISH_TARGET = re.compile(rf"\s+(?:to|into|in)\s+(?P<lang>{_LANGUAGE_NAMES})\s*[?!.]*$", re.IGNORECASE)
+_PREFIX = re.compile(r"^\s*(?:번역\s*:?|translate\s*:?)\s*", re.IGNORECASE)
+_QUOTED = re.compile(r"[\"'“‘「](.+?)[\"'”’」]")
+_HANGUL = re.compile(r"[가-힣]")
+_NUMBERED = re.compile(r"^\s*(\d+)[.)]\s*(.*)$")
+
+def parse_request(text):
+    """입력 → (번역할 문장 목록, 목표 언어 이름)
+
+    목표 언어가 없으면 한국어 문장은 영어로, 그 밖에는 한국어로 번역합니다.
+    여러 문장은 따옴표로 감싸거나 줄을 나눠 넘깁니다.
+    """
+    body = _PREFIX.sub("", text.strip())
+    target = None
+    for pattern in (_ENGLISH_TARGET, _TARGET):
+        match = pattern.search(body)
+        if match and match.start() > 0:
+            target = match.group("lang").lower()
+            body = body[:match.start()]
+            break
+    target = _ALIASES.get(target, target)
+
+    texts = _QUOTED.findall(body)
+    if not texts:
+        texts = [line.strip(" -•\t") for line in body.splitlines()]
+    texts = [t.strip() for t in texts if t.strip()]
+    if target is None:
+        target = "영어" if texts and _HANGUL.search(texts[0]) else "한국어"
+    return texts, target
+
+# 🔤 번역 백엔드
+class TranslationBackend:
+    """번역 백엔드 인터페이스"""
+
+    def translate(self, texts, target):
+        """texts 와 같은 순서의 번역문 목록 (target 은 LANGUAGES 의 언어 이름)"""
+        raise NotImplementedError
+
+# 언어가 바뀌어도 그대로인 짧은 시스템 프롬프트 (프롬프트 캐시 적중용)
+TRANSLATION_SYSTEM_PROMPT = (
+    "You are a translator. Translate each numbered line of the user message into the "
+    "language named on the first line. Keep the numbering and reply with the "
+    "translations only, one per line."
+)
+
+class LLMTranslationBackend(TranslationBackend):
+    """LLM 직접 호출 (에이전트를 거치지 않음)"""
+
+    def __init__(self, llm):
+        self.llm = llm
+
+    def translate(self, texts, target):
+        language = LANGUAGES[target][1]
+        numbered = "\n".join(f"{i + 1}. {' '.join(text.split())}" for i, text in enumerate(texts))
+        response = self.llm.invoke(
+            [("system", TRANSLATION_SYSTEM_PROMPT), ("human", f"{language}\n{numbered}")],
+            config={"tags": [TRANSLATION_TAG]},
+        )
+        return self._parse(response.content, len(texts))
+
+    @staticmethod
+    def _parse(content, count):
+        lines = {}
+        for line in content.strip().splitlines():
+            match = _NUMBERED.match(line)
+            if match:
+                lines[int(match.group(1))] = match.group(2).strip()
+        if count == 1 and 1 not in lines:
+            return [content.strip()]
+        return [lines.get(i + 1) for i in range(count)]
+
+class LocalTranslationBackend(TranslationBackend):
+    """transformers 로컬 번역 모델 (네트워크/키 불필요)"""
+
+    def __init__(self, model=None):
+        from transformers import pipeline  # 선택 의존성
+
+        self.model = model or os.environ.get("TALKTALK_TRANSLATION_MODEL", LOCAL_MODEL)
+        self._pipeline = pipeline("translation", model=self.model)
+
+    def translate(self, texts, target):
+        results = []
+        for text in texts:
+            source = "kor_Hang" if _HANGUL.search(text) else "eng_Latn"
+            output = self._pipeline(text, src_lang=source, tgt_lang=LANGUAGES[target][2])
+            results.append(output[0]["translation_text"])
+        return results
+
+def create_translation_backend(llm):
+    """TALKTALK_TRANSLATION_BACKEND=local 이면 로컬 모델 (없으면 LLM 으로 대체)"""
+    if os.environ.get("TALKTALK_TRANSLATION_BACKEND") == "local":
+        try:
+            return LocalTranslationBackend()
+        except Exception:
+            pass
+    return LLMTranslationBackend(llm)
+
+# 프로세스 전역 번역 메모리
+_translation_memory = TTLCache(max_bytes=4 * 1024 * 1024, max_entries=20000)
+
+def get_translation_memory():
+    return _translation_memory
+
+def memory_key(text, target):
+    # "밥 먹었어?" 와 "밥 먹었어." 는 번역이 다르므로 공백만 정리
+    return target, " ".join(text.split())
+
+class Translator:
+    """번역 메모리 + 묶음 번역"""
+
+    def __init__(self, backend, memory=None, ttl=TRANSLATION_MEMORY_TTL):
+        self.backend = backend
+        self.memory = memory if memory is not None else get_translation_memory()
+        self.ttl = ttl
+
+    def translate(self, texts, target):
+        """texts 와 같은 순서의 번역문 목록, 메모리에 없는 문장만 한 번에 번역"""
+        results, missing = {}, {}
+        for text in texts:
+            key = memory_key(text, target)
+            cached = cache_lookup(self.memory, key, "translation_memory")
+            if cached is not None:
+                results[key] = cached
+            else:
+                missing.setdefault(key, text)
+        if missing:
+            translations = self.backend.translate(list(missing.values()), target)
+            for key, translated in zip(missing, translations):
+                if translated:
+                    self.memory.set(key, translated, self.ttl)
+                    results[key] = translated
+        return [results.get(memory_key(text, target)) for text in texts]
+
+def format_translations(texts, translations, target):
+    if len(texts) == 1:
+        return f"🔤 번역 결과 ({target}): {translations[0]}"
+    lines = [f"🔤 번역 결과 ({target}):"]
+    lines.extend(f"- {text} → {translated}" for text, translated in zip(texts, translations))
+    return "\n".join(lines)
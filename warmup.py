@@ -0,0 +1,56 @@
+"""톡톡이 무거운 모듈 미리 불러오기
+
+LangChain/OpenAI 는 불러오는 데 수 초가 걸리므로 첫 화면(API 키 사이드바)과 서버 시작은
+이 모듈들 없이 진행하고, 에이전트를 처음 만들 때 불러옵니다. 그래서 chatbot_core,
+metrics, session_store 등은 langchain* 을 모듈 맨 위가 아니라 쓰는 함수 안에서 불러옵니다.
+TALKTALK_WARMUP=1 이면 첫 화면을 그린 뒤 백그라운드 스레드가
+그 모듈들을 미리 불러와, 첫 질문에서 import 시간을 기다리지 않게 합니다.
+
+스레드는 프로세스에 한 번만 돕니다. 같은 모듈을 메인 스레드가 동시에 불러오면 파이썬
+import 잠금이 한쪽을 기다리게 하므로 두 번 불러오지 않습니다.
+"""
+import importlib
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger("talktalk.warmup")
+
+# 에이전트를 만들 때 필요한 모듈 (오래 걸리는 순)
+WARMUP_MODULES = (
+    "chat_models",                       # langchain_openai, openai
+    "agent_executor",                    # langchain.agents
+    "langchain_core.prompts",
+    "langchain_core.runnables.history",
+    "history",                           # langchain_core.chat_history, messages
+)
+
+_started = False
+_lock = threading.Lock()
+_timings = {}
+
+def warm_up(modules=WARMUP_MODULES):
+    """모듈을 차례로 불러오고 모듈별 걸린 시간(초) 반환"""
+    for name in modules:
+        started = time.perf_counter()
+        try:
+            importlib.import_module(name)
+        except Exception:
+            logger.exception("warm-up import failed: %s", name)
+            continue
+        _timings[name] = time.perf_counter() - started
+    logger.info("warm-up done: %s", ", ".join(f"{n} {s:.2f}s" for n, s in _timings.items()))
+    return dict(_timings)
+
+def start_warmup():
+    """TALKTALK_WARMUP=1 이면 미리 불러오기 스레드 시작 (프로세스당 한 번)"""
+    global _started
+    if os.environ.get("TALKTALK_WARMUP", "0") != "1":
+        return False
+    with _lock:
+        if _started:
+            return False
+        _started = True
+    threading.Thread(target=warm_up, name="talktalk-warmup", daemon=True).start()
+    return True
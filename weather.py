@@ -0,0 +1,308 @@
+"""톡톡이 날씨
+
+검색 결과 스니펫에서 기온을 찾던 대신, 지명을 좌표로 바꾼 뒤
+날씨 제공자(provider)에게 여러 지역을 한 번에 물어봅니다.
+
+- 오프라인 지명 사전 (시/도, 주요 시/군, 서울 자치구, 해외 주요 도시)
+- 예보 캐시 키는 (격자 칸, 시각) — 0.1° 격자(약 10km)라 이웃한 구는 같은 항목을 씀
+- WeatherProvider: forecasts(cells) 로 여러 칸을 한 번에 조회
+  - FakeWeatherProvider: 네트워크 없이 동작하는 고정 날씨 (테스트/벤치마크용)
+  - OpenMeteoProvider: Open-Meteo API (키 불필요, 한 요청에 여러 좌표)
+
+환경변수 TALKTALK_WEATHER_PROVIDER=fake|open-meteo 로 제공자를 고릅니다.
+"""
+import hashlib
+import os
+import re
+import threading
+import time
+import unicodedata
+
+from tool_cache import TTLCache, cache_lookup, record_upstream
+
+GRID_SIZE = 0.1           # 격자 칸 크기 (도)
+FORECAST_TTL = 60 * 60    # 캐시 키에 시각이 들어가므로 길어도 한 시간
+WEATHER_TIMEOUT = 5.0
+OPEN_METEO_BASE_URL = "https://api.open-meteo.com"
+
+# 지명: (위도, 경도, 별칭)
+# 구는 "도시 구" 로 적고 도시 이름과 함께 쓴 표현("서울 강남구", "서울시 중구")으로 찾음.
+# 별칭에는 도시 없이도 한 곳만 가리키는 이름만 둠 (중구/강서구/광주는 여러 곳에 있음)
+GAZETTEER = {
+    "서울": (37.5665, 126.9780, ("서울시", "서울특별시", "seoul")),
+    "부산": (35.1796, 129.0756, ("부산시", "부산광역시", "busan")),
+    "대구": (35.8714, 128.6014, ("대구시", "대구광역시", "daegu")),
+    "인천": (37.4563, 126.7052, ("인천시", "인천광역시", "incheon")),
+    "광주광역시": (35.1595, 126.8526, ("gwangju",)),
+    "대전": (36.3504, 127.3845, ("대전시", "대전광역시", "daejeon")),
+    "울산": (35.5384, 129.3114, ("울산시", "울산광역시", "ulsan")),
+    "세종": (36.4800, 127.2890, ("세종시", "세종특별자치시", "sejong")),
+    "수원": (37.2636, 127.0286, ("수원시", "suwon")),
+    "성남": (37.4200, 127.1265, ("성남시", "분당", "판교")),
+    "고양": (37.6584, 126.8320, ("고양시", "일산")),
+    "용인": (37.2411, 127.1776, ("용인시",)),
+    "경기 광주": (37.4295, 127.2551, ("경기도 광주", "경기 광주시", "경기도 광주시")),
+    "창원": (35.2280, 128.6811, ("창원시", "마산")),
+    "청주": (36.6424, 127.4890, ("청주시",)),
+    "전주": (35.8242, 127.1480, ("전주시", "jeonju")),
+    "천안": (36.8151, 127.1139, ("천안시",)),
+    "포항": (36.0190, 129.3435, ("포항시",)),
+    "경주": (35.8562, 129.2247, ("경주시", "gyeongju")),
+    "안동": (36.5684, 128.7294, ("안동시",)),
+    "강릉": (37.7519, 128.8761, ("강릉시", "gangneung")),
+    "춘천": (37.8813, 127.7298, ("춘천시",)),
+    "원주": (37.3422, 127.9202, ("원주시",)),
+    "속초": (38.2070, 128.5918, ("속초시",)),
+    "여수": (34.7604, 127.6622, ("여수시", "yeosu")),
+    "목포": (34.8118, 126.3922, ("목포시",)),
+    "제주": (33.4996, 126.5312, ("제주시", "제주도", "jeju")),
+    "서귀포": (33.2541, 126.5600, ("서귀포시",)),
+    # 서울 자치구
+    "서울 강남": (37.5172, 127.0473, ("강남", "강남구")),
+    "서울 서초": (37.4837, 127.0324, ("서초", "서초구")),
+    "서울 송파": (37.5145, 127.1059, ("송파", "송파구", "잠실")),
+    "서울 종로": (37.5735, 126.9790, ("종로", "종로구", "광화문")),
+    "서울 중구": (37.5641, 126.9979, ("명동",)),
+    "서울 마포": (37.5663, 126.9019, ("마포", "마포구", "홍대")),
+    "서울 용산": (37.5326, 126.9905, ("용산", "용산구", "이태원")),
+    "서울 영등포": (37.5264, 126.8962, ("영등포", "영등포구", "여의도")),
+    "서울 성동": (37.5634, 127.0369, ("성동", "성동구", "성수")),
+    "서울 노원": (37.6542, 127.0568, ("노원", "노원구")),
+    "서울 강서": (37.5509, 126.8495, ("김포공항",)),
+    "서울 관악": (37.4784, 126.9516, ("관악", "관악구", "신림")),
+    # 해외
+    "도쿄": (35.6762, 139.6503, ("동경", "tokyo")),
+    "오사카": (34.6937, 135.5023, ("osaka",)),
+    "베이징": (39.9042, 116.4074, ("북경", "beijing")),
+    "상하이": (31.2304, 121.4737, ("상해", "shanghai")),
+    "뉴욕": (40.7128, -74.0060, ("new york",)),
+    "런던": (51.5074, -0.1278, ("london",)),
+    "파리": (48.8566, 2.3522, ("paris",)),
+    "방콕": (13.7563, 100.5018, ("bangkok",)),
+}
+
+# WMO 날씨 코드 → 한국어
+WEATHER_CODES = {
+    0: "맑음", 1: "대체로 맑음", 2: "구름 조금", 3: "흐림",
+    45: "안개", 48: "안개", 51: "약한 이슬비", 53: "이슬비", 55: "강한 이슬비",
+    61: "약한 비", 63: "비", 65: "강한 비", 66: "어는 비", 67: "어는 비",
+    71: "약한 눈", 73: "눈", 75: "많은 눈", 77: "싸락눈",
+    80: "소나기", 81: "소나기", 82: "강한 소나기", 85: "눈보라", 86: "눈보라",
+    95: "뇌우", 96: "우박을 동반한 뇌우", 99: "우박을 동반한 뇌우",
+}
+WEATHER_ICONS = {"맑음": "☀️", "대체로 맑음": "🌤️", "구름 조금": "⛅", "흐림": "☁️"}
+
+def _key(text):
+    return unicodedata.normalize("NFKC", text).lower().replace(" ", "")
+
+def _build_index():
+    index = {}
+    for name, (lat, lon, aliases) in GAZETTEER.items():
+        place = {"name": name, "lat": lat, "lon": lon}
+        names = [name, *aliases]
+        city, _, district = name.partition(" ")
+        if district and city in GAZETTEER:
+            # "서울 강남" → 서울시 강남구, 서울특별시 강남 ...
+            names += [
+                city_name + district_name
+                for city_name in (city, *GAZETTEER[city][2])
+                for district_name in (district, district + "구")
+            ]
+        for alias in names:
+            index[_key(alias)] = place
+    return index
+
+_INDEX = _build_index()
+_TOKEN = re.compile(r"[0-9a-z가-힣]+")
+# 지명 뒤에 붙어도 되는 말 ("서울날씨", "부산이랑", "제주에서") — 그 밖의 글자가
+# 이어지면 다른 이름이므로 ("세종대왕릉") 지명으로 보지 않음
+_SUFFIX = re.compile(
+    r"(?:날씨|기온|예보)?"
+    r"(?:이랑|랑|하고|과|와|의|은|는|이|가|을|를|도|만|에서|에|으로|로|까지|부터|쪽|요)?"
+)
+
+def geocode(name):
+    """지명 → {"name", "lat", "lon"} 또는 None"""
+    return _INDEX.get(_key(name))
+
+def _match(word):
+    """단어 전체가 (가장 긴) 지명 + 허용된 뒷말이면 (지명, 지명 길이), 아니면 (None, 0)"""
+    for end in range(len(word), 0, -1):
+        place = _INDEX.get(word[:end])
+        if place is not None and _SUFFIX.fullmatch(word[end:]):
+            return place, end
+    return None, 0
+
+def extract_places(text):
+    """문장에 나온 지명들 (등장 순서, 중복 제거)
+
+    단어 경계로 찾습니다. "서울 강남구", "경기 광주" 처럼 띄어 쓴 지명은 이어진
+    단어 세 개까지 붙여 보고, 긴 지명을 먼저 잡습니다 ("경기 광주" 는 광주광역시가 아님).
+    """
+    words = _TOKEN.findall(unicodedata.normalize("NFKC", text).lower())
+    found = []
+    i = 0
+    while i < len(words):
+        step, place = 1, None
+        for size in (3, 2, 1):
+            if i + size > len(words):
+                continue
+            candidate, length = _match("".join(words[i:i + size]))
+            # 여러 단어를 붙였으면 지명이 첫 단어를 넘어서야 함
+            if candidate is not None and (size == 1 or length > len(words[i])):
+                step, place = size, candidate
+                break
+        if place is not None and place not in found:
+            found.append(place)
+        i += step
+    return found
+
+def grid_cell(place):
+    """0.1° 격자 칸 (이웃한 지역은 같은 칸)"""
+    return (
+        round(round(place["lat"] / GRID_SIZE) * GRID_SIZE, 4),
+        round(round(place["lon"] / GRID_SIZE) * GRID_SIZE, 4),
+    )
+
+# 📡 날씨 제공자
+class WeatherProvider:
+    """날씨 제공자 인터페이스"""
+
+    def forecasts(self, cells):
+        """{격자 칸: 날씨 dict} (찾지 못한 칸은 빠짐)
+
+        날씨 dict: temperature, apparent_temperature, humidity, wind_speed, precipitation, condition
+        """
+        raise NotImplementedError
+
+class FakeWeatherProvider(WeatherProvider):
+    """고정 날씨 제공자 (칸과 시각에서 정해지는 값이라 같은 시간에는 매번 같음)"""
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.calls = 0
+
+    def forecasts(self, cells):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        hour = time.strftime("%Y%m%d%H")
+        results = {}
+        for cell in cells:
+            seed = int(hashlib.sha256(f"{cell}{hour}".encode("utf-8")).hexdigest()[:8], 16)
+            temperature = round(-5 + seed % 350 / 10, 1)
+            results[cell] = {
+                "temperature": temperature,
+                "apparent_temperature": round(temperature - seed % 30 / 10, 1),
+                "humidity": 30 + seed // 7 % 60,
+                "wind_speed": round(seed // 11 % 80 / 10, 1),
+                "precipitation": 0.0,
+                "condition": WEATHER_CODES[(0, 1, 2, 3, 61)[seed // 13 % 5]],
+            }
+        return results
+
+class OpenMeteoProvider(WeatherProvider):
+    """Open-Meteo 현재 날씨 API (여러 좌표를 한 요청으로 조회)"""
+
+    def __init__(self, base_url=None, timeout=WEATHER_TIMEOUT):
+        import httpx
+
+        self.base_url = (base_url or os.environ.get("TALKTALK_WEATHER_URL") or OPEN_METEO_BASE_URL).rstrip("/")
+        self._client = httpx.Client(base_url=self.base_url, timeout=timeout)
+
+    def forecasts(self, cells):
+        cells = list(cells)
+        response = self._client.get("/v1/forecast", params={
+            "latitude": ",".join(f"{lat:.2f}" for lat, _ in cells),
+            "longitude": ",".join(f"{lon:.2f}" for _, lon in cells),
+            "current": "temperature_2m,apparent_temperature,relative_humidity_2m,"
+                       "precipitation,weather_code,wind_speed_10m",
+            "wind_speed_unit": "ms",
+            "timezone": "auto",
+        })
+        response.raise_for_status()
+        payload = response.json()
+        # 좌표가 하나면 객체, 여러 개면 목록으로 옴
+        items = payload if isinstance(payload, list) else [payload]
+        results = {}
+        for cell, item in zip(cells, items):
+            current = item.get("current") or {}
+            if current.get("temperature_2m") is None:
+                continue
+            results[cell] = {
+                "temperature": current["temperature_2m"],
+                "apparent_temperature": current.get("apparent_temperature"),
+                "humidity": current.get("relative_humidity_2m"),
+                "wind_speed": current.get("wind_speed_10m"),
+                "precipitation": current.get("precipitation", 0.0),
+                "condition": WEATHER_CODES.get(current.get("weather_code"), "알 수 없음"),
+            }
+        return results
+
+def create_weather_provider():
+    """TALKTALK_WEATHER_PROVIDER 에 맞는 제공자 (오프라인 검색 모드에서는 고정 날씨)"""
+    name = os.environ.get("TALKTALK_WEATHER_PROVIDER")
+    if name is None and os.environ.get("TALKTALK_SEARCH_BACKEND") == "stub":
+        name = "fake"
+    if name == "fake":
+        return FakeWeatherProvider()
+    return OpenMeteoProvider()
+
+# 🌤️ 날씨 조회
+class WeatherService:
+    """(격자 칸, 시각) 캐시 + 묶음 조회"""
+
+    def __init__(self, provider=None, cache=None, ttl=FORECAST_TTL):
+        self.provider = provider if provider is not None else create_weather_provider()
+        self.cache = cache if cache is not None else TTLCache(max_bytes=1024 * 1024, max_entries=5000)
+        self.ttl = ttl
+        self.requests = 0
+
+    def get_weather(self, places):
+        """{지명: 날씨 dict}, 캐시에 없는 칸만 제공자에게 한 번에 요청"""
+        hour = time.strftime("%Y%m%d%H")
+        cells, missing = {}, []
+        for place in places:
+            cell = grid_cell(place)
+            if cell in cells:
+                continue
+            forecast = cache_lookup(self.cache, (cell, hour), "weather_forecast")
+            cells[cell] = forecast
+            if forecast is None:
+                missing.append(cell)
+        if missing:
+            self.requests += 1
+            record_upstream()
+            for cell, forecast in self.provider.forecasts(missing).items():
+                self.cache.set((cell, hour), forecast, self.ttl)
+                cells[cell] = forecast
+        return {
+            place["name"]: cells[grid_cell(place)]
+            for place in places
+            if cells.get(grid_cell(place)) is not None
+        }
+
+def format_weather(name, forecast):
+    """한 줄 날씨 ("☀️ 서울: 맑음, 21.3°C (체감 20.1°C) · 습도 45% · 바람 2.1m/s")"""
+    icon = WEATHER_ICONS.get(forecast["condition"], "🌦️")
+    parts = [f"{icon} {name}: {forecast['condition']}, {forecast['temperature']:.1f}°C"]
+    if forecast.get("apparent_temperature") is not None:
+        parts[0] += f" (체감 {forecast['apparent_temperature']:.1f}°C)"
+    if forecast.get("humidity") is not None:
+        parts.append(f"습도 {forecast['humidity']:.0f}%")
+    if forecast.get("wind_speed") is not None:
+        parts.append(f"바람 {forecast['wind_speed']:.1f}m/s")
+    if forecast.get("precipitation"):
+        parts.append(f"강수 {forecast['precipitation']:.1f}mm")
+    return " · ".join(parts)
+
+# 프로세스 전역 날씨 서비스 (처음 쓸 때 생성)
+_weather_service = None
+_weather_service_lock = threading.Lock()
+
+def get_weather_service():
+    global _weather_service
+    with _weather_service_lock:
+        if _weather_service is None:
+            _weather_service = WeatherService()
+        return _weather_service